@@ -0,0 +1,90 @@
+# Benchmark: per-call latency of Bitbucket comment posting with and without
+# the pooled keep-alive session, against a local stub server.
+#
+#   python -m benchmarks.bench_http_pool [calls]
+#
+# The stub speaks plain HTTP on localhost, so the saving shown is the TCP
+# handshake only; against api.bitbucket.org the TLS handshake is saved too.
+import json
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import requests
+from bot.config import Config
+from bot.core.bitbucket_api import BitbucketAPI
+from bot.core.logger import ReviewLogger
+from bot.core.rate_limiter import TokenBucket
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive
+    disable_nagle_algorithm = True  # headers and body go out as separate writes
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        body = json.dumps({"id": 1}).encode()
+        self.send_response(201)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _start_stub():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _timed(fn, calls):
+    samples = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def _report(label, samples):
+    samples = sorted(samples)
+    p95 = samples[int(len(samples) * 0.95) - 1]
+    print(f"{label:<28} mean {statistics.mean(samples):7.3f} ms   "
+          f"median {statistics.median(samples):7.3f} ms   p95 {p95:7.3f} ms")
+
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    ReviewLogger.setup(verbose=False).setLevel('WARNING')
+    Config.DRY_RUN = False
+    Config.ENABLE_QA_INLINE_COMMENTS = True
+    Config.SHARED_RATE_LIMIT = False
+
+    server = _start_stub()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    api = BitbucketAPI()
+    api.pr_id = '1'
+    api.base = f"{base}/repositories/bench/repo"
+    api.bucket = TokenBucket(1e9, 1e9)  # measure connection reuse, not the Bitbucket rate limit
+    url = f"{api.base}/pullrequests/1/comments"
+    payload = {"content": {"raw": "benchmark"}, "inline": {"to": 1, "path": "a.py"}}
+
+    def unpooled():
+        requests.post(url, headers=api.headers, json=payload, timeout=api.timeout)
+
+    def pooled():
+        api.post_inline_comment('a.py', 1, 'benchmark')
+
+    _timed(pooled, 10)  # warm up the pool
+    print(f"{calls} inline comment POSTs against {base}")
+    _report("requests.post (new conn)", _timed(unpooled, calls))
+    _report("BitbucketAPI (pooled)", _timed(pooled, calls))
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
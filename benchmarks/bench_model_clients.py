@@ -0,0 +1,84 @@
+# Benchmark: per-call client overhead of the Gemini and Groq clients against a
+# local stub that answers both APIs instantly.
+#
+#   python -m benchmarks.bench_model_clients [calls]
+#
+# Gemini compares building a GenerativeModel per call (the old behaviour) with
+# the client's long-lived handle; Groq compares a bare requests.post with the
+# client's pooled session. The stub is plain HTTP on localhost, so only the TCP
+# handshake is saved; against the real APIs the TLS handshake is saved too.
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import google.generativeai as genai
+import requests
+from benchmarks.bench_http_pool import _report, _timed
+from bot.config import Config
+from bot.core.logger import ReviewLogger
+from bot.core.rate_limiter import TokenBucket
+from bot.models.gemini_client import GeminiClient
+from bot.models.groq_client import GroqClient
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if ':generateContent' in self.path:
+            reply = {"candidates": [{"content": {"role": "model", "parts": [{"text": "ok"}]},
+                                     "finishReason": "STOP"}]}
+        else:
+            reply = {"choices": [{"message": {"role": "assistant", "content": "ok"}}]}
+        body = json.dumps(reply).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _unthrottled(client):
+    # the benchmark measures client overhead, not the configured quotas
+    client.bucket = TokenBucket(1e9, 1e9)
+    return client
+
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    ReviewLogger.setup(verbose=False).setLevel('WARNING')
+    Config.SHARED_RATE_LIMIT = False
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+
+    gemini = _unthrottled(GeminiClient(api_key='bench'))
+    genai.configure(api_key='bench', transport='rest', client_options={'api_endpoint': base})
+
+    def gemini_fresh():
+        genai.GenerativeModel(gemini.model_name, generation_config=gemini.generation_config).generate_content('x')
+
+    groq = _unthrottled(GroqClient(api_key='bench'))
+    groq.url = f"{base}/openai/v1/chat/completions"
+
+    def groq_bare():
+        requests.post(groq.url, headers=groq.headers, json=groq._request('x'), timeout=Config.LLM_TIMEOUT).json()
+
+    gemini.review('x')  # warm up both pools
+    groq.review('x')
+    print(f"{calls} review calls per variant against {base}")
+    _report("Gemini (model per call)", _timed(gemini_fresh, calls))
+    _report("GeminiClient (reused model)", _timed(lambda: gemini.review('x'), calls))
+    _report("requests.post (new conn)", _timed(groq_bare, calls))
+    _report("GroqClient (pooled)", _timed(lambda: groq.review('x'), calls))
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
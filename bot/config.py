@@ -5,9 +5,31 @@ class Config:
     """Centralized configuration with validation and defaults"""
     
     # API Configuration
-    MODEL_PROVIDER = os.getenv('MODEL_PROVIDER', 'auto')  # 'auto', 'gemini', 'groq'
+    MODEL_PROVIDER = os.getenv('MODEL_PROVIDER', 'auto')  # 'auto', 'gemini', 'groq', 'stub'
     GEMINI_MODEL_NAME = os.getenv('GEMINI_MODEL_NAME', 'gemini-2.0-flash')
     GROQ_MODEL_NAME = os.getenv('GROQ_MODEL_NAME', 'mixtral-8x7b-32768')
+    LLM_MAX_OUTPUT_TOKENS = int(os.getenv('LLM_MAX_OUTPUT_TOKENS', '4096'))  # Cap on review length
+    LLM_TEMPERATURE = float(os.getenv('LLM_TEMPERATURE', '0.2'))  # Low = more consistent reviews
+    HEDGE_REQUESTS = os.getenv('HEDGE_REQUESTS', 'false').lower() == 'true'  # Race the other provider when one stalls
+    HEDGE_PERCENTILE = float(os.getenv('HEDGE_PERCENTILE', '0.95'))  # Hedge after the primary's p95 latency
+    HEDGE_MIN_SAMPLES = int(os.getenv('HEDGE_MIN_SAMPLES', '20'))
+    HEDGE_DELAY = float(os.getenv('HEDGE_DELAY', '30'))  # Hedge delay until enough latency samples exist
+    GEMINI_PROMPT_TOKENS = int(os.getenv('GEMINI_PROMPT_TOKENS', '32000'))  # Prompt budget (instructions + diff)
+    GROQ_PROMPT_TOKENS = int(os.getenv('GROQ_PROMPT_TOKENS', '6000'))  # Auto mode prefers Groq for prompts within this
+    MAX_DIFF_CHARS = int(os.getenv('MAX_DIFF_CHARS', '0'))  # Deprecated: when set, replaces both budgets above (chars -> tokens)
+    ADAPTIVE_ROUTING = os.getenv('ADAPTIVE_ROUTING', 'true').lower() == 'true'  # Auto mode: route by live latency/errors
+    ROUTING_EWMA_ALPHA = float(os.getenv('ROUTING_EWMA_ALPHA', '0.2'))  # Weight of the newest sample
+    ROUTING_MIN_SAMPLES = int(os.getenv('ROUTING_MIN_SAMPLES', '5'))  # Calls before a provider's stats are trusted
+    ROUTING_MAX_ERROR_RATE = float(os.getenv('ROUTING_MAX_ERROR_RATE', '0.5'))  # Unhealthy above this
+    ROUTING_ERROR_HALF_LIFE = float(os.getenv('ROUTING_ERROR_HALF_LIFE', '120'))  # Seconds for an idle error rate to halve
+    LLM_FAILOVER = os.getenv('LLM_FAILOVER', 'true').lower() == 'true'  # Retry a failed review on the other provider
+    STUB_LATENCY = float(os.getenv('STUB_LATENCY', '0.5'))  # Stub provider: mean seconds per review
+    STUB_JITTER = float(os.getenv('STUB_JITTER', '0.2'))  # Stub provider: latency standard deviation
+    STUB_SECONDS_PER_1K_TOKENS = float(os.getenv('STUB_SECONDS_PER_1K_TOKENS', '0'))  # Stub: size-dependent latency
+    STUB_ERROR_RATE = float(os.getenv('STUB_ERROR_RATE', '0'))  # Stub provider: share of reviews that fail
+    STUB_OUTPUT_CHARS = int(os.getenv('STUB_OUTPUT_CHARS', '3000'))  # Stub provider: mean review length
+    STUB_SEED = os.getenv('STUB_SEED', '0')  # Same seed + same prompt = same review, latency and errors
+    STREAM_REVIEWS = os.getenv('STREAM_REVIEWS', 'true').lower() == 'true'  # Server: post inline comments per finished section
     
     # Bitbucket Configuration
     BITBUCKET_WORKSPACE = os.getenv('BITBUCKET_WORKSPACE', '')
@@ -17,11 +39,57 @@ class Config:
     BITBUCKET_BASE_URL = os.getenv('BITBUCKET_BASE_URL', 'https://api.bitbucket.org/2.0')
     
     # Review Configuration
-    MAX_DIFF_CHARS = int(os.getenv('MAX_DIFF_CHARS', '14000'))
     MIN_DIFF_CHARS = int(os.getenv('MIN_DIFF_CHARS', '10'))
+    CHUNKED_REVIEW = os.getenv('CHUNKED_REVIEW', 'true').lower() == 'true'  # Review diffs over the prompt budget in parts instead of truncating
+    REVIEW_CHUNK_CONCURRENCY = int(os.getenv('REVIEW_CHUNK_CONCURRENCY', '3'))  # Parts reviewed at once
+    REVIEW_MAX_CHUNKS = int(os.getenv('REVIEW_MAX_CHUNKS', '16'))  # Parts beyond this are left out of the review
+    DIFF_MEMORY_LIMIT = int(os.getenv('DIFF_MEMORY_LIMIT', str(8 * 1024 * 1024)))  # Bytes kept in RAM before spilling to disk
+    DIFF_MAX_BYTES = int(os.getenv('DIFF_MAX_BYTES', str(100 * 1024 * 1024)))  # Abort downloads beyond this
+    DIFF_CHUNK_SIZE = int(os.getenv('DIFF_CHUNK_SIZE', '65536'))
+    
+    # Selective Diff Fetch (diffstat first, then only the files worth reviewing)
+    SELECTIVE_DIFF = os.getenv('SELECTIVE_DIFF', 'true').lower() == 'true'
+    DIFF_INCLUDE_GLOBS = os.getenv('DIFF_INCLUDE_GLOBS', '')  # Comma-separated; empty = all files
+    DIFF_EXCLUDE_GLOBS = os.getenv('DIFF_EXCLUDE_GLOBS', ','.join([
+        '*.lock', 'package-lock.json', 'yarn.lock', 'pnpm-lock.yaml', 'go.sum',
+        '*.min.js', '*.min.css', '*.map', '*_pb2.py', '*_pb2_grpc.py', '*.pb.go',
+        'vendor/*', '*/vendor/*', 'node_modules/*', '*/node_modules/*', 'dist/*', '*/dist/*',
+    ]))
+    MINIMIZE_PROMPT = os.getenv('MINIMIZE_PROMPT', 'true').lower() == 'true'  # Shrink diff and rules before prompting
+    MINIMIZE_CONTEXT_LINES = int(os.getenv('MINIMIZE_CONTEXT_LINES', '1'))  # Context lines kept around each change
+    MINIMIZE_GENERATED_GLOBS = os.getenv('MINIMIZE_GENERATED_GLOBS', DIFF_EXCLUDE_GLOBS)  # Collapsed to a one-line note
+    DIFF_MAX_FILE_LINES = int(os.getenv('DIFF_MAX_FILE_LINES', '2000'))  # Skip files with more changed lines
+    DIFF_PATHS_PER_REQUEST = int(os.getenv('DIFF_PATHS_PER_REQUEST', '40'))
     REQUEST_TIMEOUT = int(os.getenv('REQUEST_TIMEOUT', '30'))
     MAX_RETRIES = int(os.getenv('MAX_RETRIES', '3'))
-    RETRY_DELAY = int(os.getenv('RETRY_DELAY', '2'))
+    RETRY_DELAY = int(os.getenv('RETRY_DELAY', '2'))  # Backoff base: delays grow 2x per attempt, jittered
+    RETRY_MAX_DELAY = float(os.getenv('RETRY_MAX_DELAY', '20'))  # Cap on a single backoff sleep
+    LLM_TIMEOUT = int(os.getenv('LLM_TIMEOUT', '120'))  # Per-call timeout for Gemini / Groq
+    BREAKER_FAILURE_THRESHOLD = int(os.getenv('BREAKER_FAILURE_THRESHOLD', '5'))  # Consecutive failures to open
+    BREAKER_RESET_TIMEOUT = float(os.getenv('BREAKER_RESET_TIMEOUT', '30'))  # Seconds before a trial call
+    
+    # HTTP Connection Pool Configuration
+    HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', '20'))  # Keep-alive connections per host
+    HTTP_POOL_CONNECTIONS = int(os.getenv('HTTP_POOL_CONNECTIONS', '4'))  # Hosts with cached pools
+    HTTP_KEEP_ALIVE = os.getenv('HTTP_KEEP_ALIVE', 'true').lower() == 'true'
+    
+    # Rate Limits / Comment Posting
+    BITBUCKET_HOURLY_LIMIT = int(os.getenv('BITBUCKET_HOURLY_LIMIT', '1000'))  # Bitbucket API requests/hour quota
+    BITBUCKET_RATE_PER_SEC = float(os.getenv('BITBUCKET_RATE_PER_SEC', str(BITBUCKET_HOURLY_LIMIT / 3600)))  # Sustained rate
+    BITBUCKET_RATE_BURST = int(os.getenv('BITBUCKET_RATE_BURST', '10'))
+    GEMINI_RATE_PER_SEC = float(os.getenv('GEMINI_RATE_PER_SEC', '1'))
+    GEMINI_RATE_BURST = int(os.getenv('GEMINI_RATE_BURST', '5'))
+    GROQ_RATE_PER_SEC = float(os.getenv('GROQ_RATE_PER_SEC', '0.5'))  # 30 requests/minute
+    GROQ_RATE_BURST = int(os.getenv('GROQ_RATE_BURST', '5'))
+    SHARED_RATE_LIMIT = os.getenv('SHARED_RATE_LIMIT', 'true').lower() == 'true'  # One budget for all workers on the host
+    COMMENT_CONCURRENCY = int(os.getenv('COMMENT_CONCURRENCY', '4'))  # Parallel inline comment POSTs
+    UPDATE_SUMMARY_IN_PLACE = os.getenv('UPDATE_SUMMARY_IN_PLACE', 'true').lower() == 'true'
+    RESOLVE_FIXED_COMMENTS = os.getenv('RESOLVE_FIXED_COMMENTS', 'false').lower() == 'true'
+    
+    # Bitbucket Read Caching / Pagination
+    HTTP_CACHE = os.getenv('HTTP_CACHE', 'true').lower() == 'true'  # Conditional GETs with ETag / Last-Modified
+    HTTP_CACHE_MAX_ENTRIES = int(os.getenv('HTTP_CACHE_MAX_ENTRIES', '2000'))
+    BITBUCKET_PAGELEN = int(os.getenv('BITBUCKET_PAGELEN', '100'))  # Page size for collection reads
     
     # Feature Flags
     DRY_RUN = os.getenv('DRY_RUN', 'false').lower() == 'true'
@@ -36,16 +104,53 @@ class Config:
     # Cache Configuration
     CACHE_TTL = int(os.getenv('CACHE_TTL', '3600'))  # 1 hour
     CACHE_DIR = os.getenv('CACHE_DIR', '.review_cache')
+    HTTP_CACHE_DB = os.getenv('HTTP_CACHE_DB', os.path.join(CACHE_DIR, 'http_cache.db'))
+    RATE_LIMIT_DB = os.getenv('RATE_LIMIT_DB', os.path.join(CACHE_DIR, 'rate_limits.db'))
+    
+    # Incremental Review (only the commits pushed since the last reviewed head)
+    INCREMENTAL_REVIEW = os.getenv('INCREMENTAL_REVIEW', 'true').lower() == 'true'
+    REVIEW_STATE_DB = os.getenv('REVIEW_STATE_DB', os.path.join(CACHE_DIR, 'review_state.db'))
+    REVIEW_STATE_TTL = int(os.getenv('REVIEW_STATE_TTL', str(30 * 86400)))  # Forget PRs idle for 30 days
+    
+    # Webhook Job Queue Configuration
+    REVIEW_WORKERS = int(os.getenv('REVIEW_WORKERS', '2'))
+    JOB_RETENTION = int(os.getenv('JOB_RETENTION', '3600'))  # Keep finished job status for 1 hour
+    COALESCE_WINDOW = float(os.getenv('COALESCE_WINDOW', '5'))  # Quiet period before a PR review starts
+    COALESCE_CANCEL_RUNNING = os.getenv('COALESCE_CANCEL_RUNNING', 'true').lower() == 'true'
+    
+    # Admission Control (0 = unlimited)
+    MAX_QUEUE_DEPTH = int(os.getenv('MAX_QUEUE_DEPTH', '200'))
+    WORKSPACE_MAX_QUEUE_DEPTH = int(os.getenv('WORKSPACE_MAX_QUEUE_DEPTH', '50'))
+    WORKSPACE_MAX_CONCURRENCY = int(os.getenv('WORKSPACE_MAX_CONCURRENCY', '0'))
+    ADMISSION_RETRY_AFTER = int(os.getenv('ADMISSION_RETRY_AFTER', '30'))  # Seconds, sent with 429
+    
+    # Durable Job Store Configuration
+    JOB_DB = os.getenv('JOB_DB', os.path.join(CACHE_DIR, 'jobs.db'))
+    JOB_POLL_INTERVAL = float(os.getenv('JOB_POLL_INTERVAL', '1'))  # Seconds between claim attempts when idle
+    JOB_LEASE_TIMEOUT = int(os.getenv('JOB_LEASE_TIMEOUT', '120'))  # Requeue running jobs without a heartbeat
+    JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', '3'))
+    SHUTDOWN_GRACE = float(os.getenv('SHUTDOWN_GRACE', '25'))  # Drain time on shutdown (< gunicorn graceful timeout)
+    
+    # Webhook Delivery Dedup Configuration
+    DEDUP_DB = os.getenv('DEDUP_DB', os.path.join(CACHE_DIR, 'deliveries.db'))
+    DEDUP_TTL = int(os.getenv('DEDUP_TTL', '86400'))  # Remember deliveries for 24 hours
+    DEDUP_MAX_ENTRIES = int(os.getenv('DEDUP_MAX_ENTRIES', '10000'))
     
     @classmethod
     def validate(cls) -> Optional[str]:
         """Validate configuration and return error message if invalid"""
-        if cls.MODEL_PROVIDER not in ['auto', 'gemini', 'groq']:
+        if cls.MODEL_PROVIDER not in ['auto', 'gemini', 'groq', 'stub']:
             return f"Invalid MODEL_PROVIDER: {cls.MODEL_PROVIDER}"
-        if cls.MAX_DIFF_CHARS < 100:
+        if cls.MAX_DIFF_CHARS and cls.MAX_DIFF_CHARS < 100:
             return "MAX_DIFF_CHARS must be at least 100"
+        if min(cls.GEMINI_PROMPT_TOKENS, cls.GROQ_PROMPT_TOKENS) < 1000:
+            return "GEMINI_PROMPT_TOKENS and GROQ_PROMPT_TOKENS must be at least 1000"
+        if min(cls.BITBUCKET_RATE_PER_SEC, cls.GEMINI_RATE_PER_SEC, cls.GROQ_RATE_PER_SEC) <= 0:
+            return "BITBUCKET_RATE_PER_SEC, GEMINI_RATE_PER_SEC and GROQ_RATE_PER_SEC must be positive"
         if cls.REQUEST_TIMEOUT < 5:
             return "REQUEST_TIMEOUT must be at least 5 seconds"
+        if cls.REVIEW_WORKERS < 1:
+            return "REVIEW_WORKERS must be at least 1"
         return None
     
     @classmethod
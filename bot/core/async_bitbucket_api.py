@@ -0,0 +1,368 @@
+import asyncio
+import json
+import os
+from typing import Tuple, Optional, Dict, List, AsyncIterator
+import httpx
+from bot.config import Config
+from bot.core.logger import ReviewLogger
+from bot.core.http_pool import get_async_client
+from bot.core.rate_limiter import get_bucket, parse_retry_after
+from bot.core.diff_buffer import DiffBuffer, DiffTooLargeError, check_content_length, load_diff_file
+from bot.core.diff_filter import DiffPathFilter
+from bot.core.telemetry import DIFF_FETCH_LATENCY, COMMENT_LATENCY, COMMENTS_POSTED, HTTP_CACHE_REQUESTS
+from bot.core.http_cache import get_response_cache
+from bot.core.bitbucket_api import IDEMPOTENT_METHODS, BitbucketAPI, BitbucketAPIError
+from bot.core.resilience import CircuitOpenError, backoff_delay, get_breaker
+
+
+class AsyncBitbucketAPI:
+    """Async counterpart of BitbucketAPI for the webhook server
+
+    Requests go through the shared httpx.AsyncClient pool, so many reviews can
+    run concurrently on one event loop, and cancelling the calling task
+    aborts the in-flight request.
+    """
+
+    def __init__(self):
+        self.workspace = Config.BITBUCKET_WORKSPACE
+        self.repo_slug = Config.BITBUCKET_REPO_SLUG
+        self.pr_id = Config.BITBUCKET_PR_ID
+        self.access_token = Config.BITBUCKET_TOKEN
+        self.base_url = Config.BITBUCKET_BASE_URL
+        self.timeout = Config.REQUEST_TIMEOUT
+        self.max_retries = Config.MAX_RETRIES
+        self.retry_delay = Config.RETRY_DELAY
+
+        self.base = None
+        if self.workspace and self.repo_slug:
+            self.base = f"{self.base_url}/repositories/{self.workspace}/{self.repo_slug}"
+
+        self.headers = {
+            "Authorization": f"Bearer {self.access_token}",
+            "Content-Type": "application/json"
+        }
+        self.logger = ReviewLogger.get()
+        self.bucket = get_bucket('bitbucket')
+        self.breaker = get_breaker('bitbucket')
+
+    async def _make_request(self, method: str, url: str, **kwargs) -> Optional[Dict]:
+        """Make HTTP request with retry logic, error handling and conditional GETs
+
+        Transient failures back off exponentially; an open circuit fails
+        fast. Returns the decoded body for GETs, {} for other successful
+        methods and None on failure. The SQLite response cache is read and
+        written in a worker thread.
+        """
+        cache = get_response_cache() if method.upper() == 'GET' else None
+        cache_key = cached = None
+        headers = None
+        if cache:
+            cache_key = cache.cache_key(self.access_token, url, kwargs.get('params'))
+            cached = await asyncio.to_thread(cache.lookup, cache_key)
+            headers = cached.conditional_headers() if cached else None
+
+        for attempt in range(self.max_retries):
+            if not self.breaker.allow():
+                self.logger.warning(f"Bitbucket circuit open - skipping {method} {url}")
+                return None
+            try:
+                resp = await self._execute_request(method, url, headers=headers, **kwargs)
+                if resp.status_code < 500:
+                    self.breaker.record_success()
+
+                if resp.status_code == 429:  # Rate limited
+                    await self._handle_rate_limit(resp)
+                    continue
+
+                if resp.status_code == 304 and cached:
+                    await asyncio.to_thread(cache.touch, cache_key)
+                    HTTP_CACHE_REQUESTS.inc(result='hit')
+                    return json.loads(cached.body)
+
+                resp.raise_for_status()
+                if method.upper() != 'GET':
+                    return {}
+                if cache:
+                    await asyncio.to_thread(BitbucketAPI._store_response, cache, cache_key, resp)
+                return resp.json()
+
+            except (httpx.TimeoutException, httpx.TransportError) as e:
+                self.breaker.record_failure()
+                if method.upper() == 'POST' and not isinstance(e, (httpx.ConnectError, httpx.ConnectTimeout)):
+                    # The POST may have been applied; retrying could create a duplicate
+                    self.logger.warning(f"{type(e).__name__} on POST - not retried")
+                    return None
+                self.logger.warning(f"{type(e).__name__} (attempt {attempt + 1}/{self.max_retries})")
+                if attempt < self.max_retries - 1:
+                    await asyncio.sleep(backoff_delay(attempt, self.retry_delay))
+            except httpx.HTTPStatusError as e:
+                if 400 <= e.response.status_code < 500:
+                    self.logger.error(f"HTTP {e.response.status_code}: {e.response.text}")
+                    return None
+                self.breaker.record_failure()
+                if method.upper() not in IDEMPOTENT_METHODS:
+                    # A 5xx does not say whether the POST was applied; retrying could duplicate it
+                    self.logger.warning(f"HTTP {e.response.status_code} on {method.upper()} - not retried")
+                    return None
+                self.logger.warning(f"HTTP {e.response.status_code} (attempt {attempt + 1}/{self.max_retries})")
+                if attempt < self.max_retries - 1:
+                    await asyncio.sleep(backoff_delay(attempt, self.retry_delay))
+            except Exception as e:
+                self.logger.error(f"Unexpected error: {e}")
+                return None
+
+        self.logger.error(f"Failed after {self.max_retries} retries")
+        return None
+
+    async def _execute_request(self, method: str, url: str, headers: Optional[Dict] = None,
+                               **kwargs) -> httpx.Response:
+        """Execute the actual HTTP request
+
+        Redirects are followed (as requests does): Bitbucket answers some
+        endpoints, e.g. the PR diffstat, with a 302 to the repository resource.
+        """
+        if method.upper() not in ('GET', 'POST', 'PUT'):
+            raise ValueError(f"Unsupported method: {method}")
+        await self.bucket.acquire_async()
+        return await get_async_client().request(method.upper(), url, headers={**self.headers, **(headers or {})},
+                                                timeout=self.timeout, follow_redirects=True, **kwargs)
+
+    async def paginate(self, url: str, params: Optional[Dict] = None) -> AsyncIterator[Dict]:
+        """Yield every item of a paginated collection, following ``next`` links"""
+        while url:
+            page = await self._make_request('GET', url, params=params)
+            if page is None:
+                raise BitbucketAPIError(f"Failed to fetch page {url}")
+            for item in page.get('values', []):
+                yield item
+            url, params = page.get('next'), None  # next links already carry the query
+
+    async def _handle_rate_limit(self, resp: httpx.Response) -> None:
+        """Pause the shared bucket; the next request waits it out in every worker"""
+        wait_time = parse_retry_after(resp.headers.get('Retry-After'))
+        wait_time = self.retry_delay if wait_time is None else wait_time
+        self.logger.warning(f"Rate limited. Pausing Bitbucket requests for {wait_time} seconds...")
+        await self.bucket.pause_async(wait_time)
+
+    async def get_pr_metadata(self) -> Tuple[str, str]:
+        """Get PR title and description with fallback"""
+        if not self.base or not self.pr_id:
+            self.logger.debug("No Bitbucket context - using fallback metadata")
+            return ("Local Simulation PR", "No description (simulation)")
+
+        data = await self._make_request('GET', f"{self.base}/pullrequests/{self.pr_id}")
+        if data:
+            return (data.get('title', ''), data.get('description', ''))
+        return ("PR Review", "Unable to fetch description")
+
+    async def get_merge_base(self, source: str, destination: str) -> Optional[str]:
+        """Hash of the best common ancestor of two commits; None if it cannot be fetched"""
+        if not self.base or not source or not destination:
+            return None
+
+        data = await self._make_request('GET', f"{self.base}/merge-base/{source}..{destination}")
+        return (data or {}).get('hash')
+
+    async def get_pr_diff(self) -> DiffBuffer:
+        """Stream PR diff into a size-capped buffer, with fallback to sample"""
+        if not self.base or not self.pr_id:
+            self.logger.debug("No Bitbucket context - using sample diff")
+            sample = os.path.join(os.getcwd(), 'sample_data', 'sample_diff.txt')
+            if os.path.exists(sample):
+                return await asyncio.to_thread(load_diff_file, sample)
+            return DiffBuffer()
+
+        try:
+            return await self._fetch_diff(f"{self.base}/pullrequests/{self.pr_id}/diff",
+                                          f"{self.base}/pullrequests/{self.pr_id}/diffstat")
+        except (httpx.HTTPError, DiffTooLargeError, CircuitOpenError) as e:
+            self.logger.error(f"Error fetching PR diff: {e}")
+            return DiffBuffer()
+
+    async def get_interdiff(self, old_head: str, new_head: str) -> Optional[DiffBuffer]:
+        """Diff of the commits pushed since ``old_head``; None if it cannot be fetched"""
+        if not self.base:
+            return None
+
+        # Bitbucket ranges read source..destination (reversed from git)
+        spec = f"{new_head}..{old_head}"
+        try:
+            return await self._fetch_diff(f"{self.base}/diff/{spec}", f"{self.base}/diffstat/{spec}")
+        except (httpx.HTTPError, DiffTooLargeError, CircuitOpenError) as e:
+            self.logger.warning(f"Error fetching interdiff {spec}: {e}")
+            return None
+
+    async def _fetch_diff(self, diff_url: str, diffstat_url: str) -> DiffBuffer:
+        buf = DiffBuffer()
+        try:
+            with DIFF_FETCH_LATENCY.time():
+                for params in await self._diff_request_params(diffstat_url):
+                    await self._stream_diff(diff_url, params, buf)
+        except BaseException:
+            buf.close()
+            raise
+        self.logger.info(f"Successfully fetched PR diff ({len(buf)} bytes"
+                         f"{', spilled to disk' if buf.spilled else ''})")
+        return buf
+
+    async def _stream_diff(self, url: str, params, buf: DiffBuffer) -> None:
+        # the diff endpoint redirects to the repository diff resource
+        self.breaker.check()
+        await self.bucket.acquire_async()
+        try:
+            async with get_async_client().stream('GET', url, headers=self.headers, params=params,
+                                                 timeout=self.timeout, follow_redirects=True) as resp:
+                self.breaker.record_status(resp.status_code)
+                resp.raise_for_status()
+                check_content_length(resp.headers.get('Content-Length'), buf.max_bytes - len(buf))
+                async for chunk in resp.aiter_bytes(Config.DIFF_CHUNK_SIZE):
+                    buf.write(chunk)
+        except httpx.TransportError:
+            self.breaker.record_failure()
+            raise
+
+    async def _diff_request_params(self, diffstat_url: str) -> List[Optional[List]]:
+        """One entry per diff request; selective fetch uses the diffstat first"""
+        if not Config.SELECTIVE_DIFF:
+            return [None]
+        entries = await self.get_diffstat(diffstat_url)
+        if entries is None:
+            self.logger.warning("Diffstat unavailable - fetching full diff")
+            return [None]
+        return DiffPathFilter().request_batches(entries)
+
+    async def get_diffstat(self, url: Optional[str] = None) -> Optional[List[Dict]]:
+        """Get per-file change stats (all pages) for the PR or a diffstat URL; None on failure"""
+        if not url and not (self.base and self.pr_id):
+            return None
+
+        url = url or f"{self.base}/pullrequests/{self.pr_id}/diffstat"
+        try:
+            return [entry async for entry in self.paginate(url, params={'pagelen': Config.BITBUCKET_PAGELEN})]
+        except BitbucketAPIError as e:
+            self.logger.warning(str(e))
+            return None
+
+    async def post_comment(self, comment_text: str) -> bool:
+        """Post comment to PR with error handling"""
+        if Config.DRY_RUN:
+            self.logger.info("DRY_RUN enabled - would post comment")
+            print(comment_text)
+            return True
+
+        if not self.base or not self.pr_id:
+            self.logger.warning("No Bitbucket context - comment not posted")
+            return False
+
+        payload = {"content": {"raw": comment_text}}
+        status, _ = await self._post_comment(payload, 'summary')
+        return status in (200, 201)
+
+    async def update_comment(self, comment_id: int, comment_text: str) -> bool:
+        """Replace the text of an existing PR comment"""
+        if Config.DRY_RUN:
+            self.logger.info(f"DRY_RUN enabled - would update comment {comment_id}")
+            return True
+
+        if not self.base or not self.pr_id:
+            return False
+
+        url = f"{self.base}/pullrequests/{self.pr_id}/comments/{comment_id}"
+        with COMMENT_LATENCY.time(kind='update'):
+            ok = await self._make_request('PUT', url, json={"content": {"raw": comment_text}}) is not None
+        COMMENTS_POSTED.inc(kind='update', outcome='posted' if ok else 'failed')
+        if ok:
+            self.logger.info(f"Comment {comment_id} updated in place")
+        return ok
+
+    async def resolve_comment(self, comment_id: int) -> bool:
+        """Mark a PR comment thread as resolved"""
+        if Config.DRY_RUN:
+            self.logger.info(f"DRY_RUN enabled - would resolve comment {comment_id}")
+            return True
+
+        if not self.base or not self.pr_id:
+            return False
+
+        url = f"{self.base}/pullrequests/{self.pr_id}/comments/{comment_id}/resolve"
+        return await self._make_request('POST', url) is not None
+
+    async def list_comments(self) -> List[Dict]:
+        """All comments on the PR (every page); empty if they cannot be read
+
+        Empty under DRY_RUN: nothing was posted, so there is nothing to update or skip.
+        """
+        if Config.DRY_RUN or not self.base or not self.pr_id:
+            return []
+
+        url = f"{self.base}/pullrequests/{self.pr_id}/comments"
+        try:
+            return [c async for c in self.paginate(url, params={'pagelen': Config.BITBUCKET_PAGELEN})]
+        except BitbucketAPIError as e:
+            self.logger.warning(f"Error listing comments: {e}")
+            return []
+
+    async def post_inline_comment(self, file_path: str, line_number: int, comment_text: str) -> bool:
+        """Post inline comment on specific file/line for QA issues"""
+        status, _ = await self.submit_inline_comment(file_path, line_number, comment_text)
+        return status in (200, 201)
+
+    async def submit_inline_comment(self, file_path: str, line_number: int,
+                                    comment_text: str) -> Tuple[int, Optional[float]]:
+        """Single inline comment POST; returns (status code or 0, Retry-After seconds)"""
+        if not Config.ENABLE_QA_INLINE_COMMENTS:
+            return 0, None
+
+        if Config.DRY_RUN:
+            self.logger.info(f"DRY_RUN enabled - would post inline comment on {file_path}:{line_number}")
+            return 201, None
+
+        if not self.base or not self.pr_id:
+            self.logger.warning("No Bitbucket context for inline comment")
+            return 0, None
+
+        payload = {
+            "content": {"raw": comment_text},
+            "inline": {
+                "to": line_number,
+                "path": file_path
+            }
+        }
+        return await self._post_comment(payload, 'inline')
+
+    async def _post_comment(self, payload: Dict, kind: str) -> Tuple[int, Optional[float]]:
+        url = f"{self.base}/pullrequests/{self.pr_id}/comments"
+        if not self.breaker.allow():
+            self.logger.warning(f"Bitbucket circuit open - {kind} comment not posted")
+            COMMENTS_POSTED.inc(kind=kind, outcome='failed')
+            return 0, None
+        try:
+            await self.bucket.acquire_async()
+            with COMMENT_LATENCY.time(kind=kind):
+                resp = await get_async_client().post(url, headers=self.headers, json=payload,
+                                                     timeout=self.timeout)
+            self.breaker.record_status(resp.status_code)
+            if resp.status_code in (200, 201):
+                self.logger.debug(f"{kind.capitalize()} comment posted")
+                COMMENTS_POSTED.inc(kind=kind, outcome='posted')
+                return resp.status_code, None
+            self.logger.warning(f"Failed to post {kind} comment: {resp.status_code}")
+            COMMENTS_POSTED.inc(kind=kind, outcome='failed')
+            return resp.status_code, parse_retry_after(resp.headers.get('Retry-After'))
+        except httpx.HTTPError as e:
+            self.breaker.record_failure()
+            self.logger.error(f"Error posting {kind} comment: {e}")
+        COMMENTS_POSTED.inc(kind=kind, outcome='failed')
+        return 0, None
+
+    async def get_reviewers(self) -> List[str]:
+        """Get list of PR reviewers"""
+        if not self.base or not self.pr_id:
+            return []
+
+        url = f"{self.base}/pullrequests/{self.pr_id}/reviewers"
+        try:
+            return [r.get('username') async for r in self.paginate(url) if r.get('username')]
+        except BitbucketAPIError as e:
+            self.logger.warning(f"Error fetching reviewers: {e}")
+            return []
@@ -2,9 +2,24 @@ import os
 import requests
 import json
 import time
-from typing import Tuple, Optional, Dict, List
+from typing import Tuple, Optional, Dict, List, Iterator
 from bot.config import Config
 from bot.core.logger import ReviewLogger
+from bot.core.http_pool import get_session
+from bot.core.rate_limiter import get_bucket, parse_retry_after
+from bot.core.diff_buffer import DiffBuffer, check_content_length, load_diff_file
+from bot.core.diff_filter import DiffPathFilter
+from bot.core.telemetry import DIFF_FETCH_LATENCY, COMMENT_LATENCY, COMMENTS_POSTED, HTTP_CACHE_REQUESTS
+from bot.core.http_cache import HttpResponseCache, get_response_cache
+from bot.core.resilience import backoff_delay, get_breaker
+
+# Methods retried after a 5xx: repeating them cannot create a duplicate
+IDEMPOTENT_METHODS = ('GET', 'PUT')
+
+
+class BitbucketAPIError(Exception):
+    """Raised when a Bitbucket read cannot be completed"""
+
 
 # Enhanced Bitbucket API helper with error handling and inline comments support.
 class BitbucketAPI:
@@ -27,24 +42,66 @@ class BitbucketAPI:
             "Content-Type": "application/json"
         }
         self.logger = ReviewLogger.get()
+        self.bucket = get_bucket('bitbucket')
+        self.breaker = get_breaker('bitbucket')
+
+    @property
+    def session(self) -> requests.Session:
+        """Process-wide keep-alive session for this token (shared across instances)"""
+        return get_session(self.access_token)
 
     def _make_request(self, method: str, url: str, **kwargs) -> Optional[Dict]:
-        """Make HTTP request with retry logic and error handling"""
+        """Make HTTP request with retry logic and error handling
+
+        GETs are conditional when an earlier response carried an ETag or
+        Last-Modified; a 304 is answered from the HTTP response cache.
+        Transient failures back off exponentially; an open circuit fails
+        fast. Returns the decoded body for GETs, {} for other successful
+        methods and None on failure.
+        """
+        cache = get_response_cache() if method.upper() == 'GET' else None
+        cache_key = cached = None
+        headers = None
+        if cache:
+            cache_key = cache.cache_key(self.access_token, url, kwargs.get('params'))
+            cached = cache.lookup(cache_key)
+            headers = cached.conditional_headers() if cached else None
+        
         for attempt in range(self.max_retries):
+            if not self.breaker.allow():
+                self.logger.warning(f"Bitbucket circuit open - skipping {method} {url}")
+                return None
             try:
-                resp = self._execute_request(method, url, **kwargs)
+                resp = self._execute_request(method, url, headers=headers, **kwargs)
+                if resp.status_code < 500:
+                    self.breaker.record_success()
                 
                 if resp.status_code == 429:  # Rate limited
                     self._handle_rate_limit(resp)
                     continue
                 
+                if resp.status_code == 304 and cached:
+                    cache.touch(cache_key)
+                    HTTP_CACHE_REQUESTS.inc(result='hit')
+                    return json.loads(cached.body)
+                
                 resp.raise_for_status()
-                return resp.json() if method.upper() == 'GET' else None
+                if method.upper() != 'GET':
+                    return {}
+                if cache:
+                    self._store_response(cache, cache_key, resp)
+                return resp.json()
             
             except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
+                if method.upper() == 'POST' and not isinstance(e, requests.exceptions.ConnectTimeout):
+                    # The POST may have been applied; retrying could create a duplicate
+                    self.breaker.record_failure()
+                    self.logger.warning(f"{type(e).__name__} on POST - not retried")
+                    return None
                 self._handle_retry(e, attempt)
             except requests.exceptions.HTTPError as e:
-                return self._handle_http_error(e, resp, attempt)
+                if not self._handle_http_error(e, resp, attempt, method):
+                    return None
             except Exception as e:
                 self.logger.error(f"Unexpected error: {e}")
                 return None
@@ -52,37 +109,62 @@ class BitbucketAPI:
         self.logger.error(f"Failed after {self.max_retries} retries")
         return None
 
-    def _execute_request(self, method: str, url: str, **kwargs):
+    def _execute_request(self, method: str, url: str, headers: Optional[Dict] = None, **kwargs):
         """Execute the actual HTTP request"""
-        if method.upper() == 'GET':
-            return requests.get(url, headers=self.headers, timeout=self.timeout, verify=True, **kwargs)
-        elif method.upper() == 'POST':
-            return requests.post(url, headers=self.headers, timeout=self.timeout, verify=True, **kwargs)
-        else:
+        headers = {**self.headers, **(headers or {})}
+        if method.upper() not in ('GET', 'POST', 'PUT'):
             raise ValueError(f"Unsupported method: {method}")
+        self.bucket.acquire()
+        if method.upper() == 'GET':
+            return self.session.get(url, headers=headers, timeout=self.timeout, verify=True, **kwargs)
+        if method.upper() == 'POST':
+            return self.session.post(url, headers=headers, timeout=self.timeout, verify=True, **kwargs)
+        return self.session.put(url, headers=headers, timeout=self.timeout, verify=True, **kwargs)
+
+    @staticmethod
+    def _store_response(cache: HttpResponseCache, cache_key: str, resp) -> None:
+        """Remember a GET response that carries validators"""
+        etag, last_modified = resp.headers.get('ETag'), resp.headers.get('Last-Modified')
+        HTTP_CACHE_REQUESTS.inc(result='miss')
+        if etag or last_modified:
+            cache.store(cache_key, etag, last_modified, resp.text)
+
+    def paginate(self, url: str, params: Optional[Dict] = None) -> Iterator[Dict]:
+        """Yield every item of a paginated collection, following ``next`` links"""
+        while url:
+            page = self._make_request('GET', url, params=params)
+            if page is None:
+                raise BitbucketAPIError(f"Failed to fetch page {url}")
+            yield from page.get('values', [])
+            url, params = page.get('next'), None  # next links already carry the query
 
     def _handle_rate_limit(self, resp) -> None:
-        """Handle rate limit response"""
-        wait_time = int(resp.headers.get('Retry-After', self.retry_delay))
-        self.logger.warning(f"Rate limited. Waiting {wait_time} seconds...")
-        time.sleep(wait_time)
+        """Pause the shared bucket; the next request waits it out in every worker"""
+        wait_time = parse_retry_after(resp.headers.get('Retry-After'))
+        wait_time = self.retry_delay if wait_time is None else wait_time
+        self.logger.warning(f"Rate limited. Pausing Bitbucket requests for {wait_time} seconds...")
+        self.bucket.pause(wait_time)
 
     def _handle_retry(self, error, attempt: int) -> None:
-        """Handle retry logic for transient errors"""
+        """Record a transient failure and back off before the next attempt"""
+        self.breaker.record_failure()
         self.logger.warning(f"{type(error).__name__} (attempt {attempt + 1}/{self.max_retries})")
         if attempt < self.max_retries - 1:
-            time.sleep(self.retry_delay)
+            time.sleep(backoff_delay(attempt, self.retry_delay))
 
-    def _handle_http_error(self, error, resp, attempt: int) -> Optional[Dict]:
-        """Handle HTTP errors"""
+    def _handle_http_error(self, error, resp, attempt: int, method: str) -> bool:
+        """Handle HTTP errors; True when the request should be retried"""
         if 400 <= resp.status_code < 500:
             self.logger.error(f"HTTP {resp.status_code}: {resp.text}")
-            return None
+            return False
+        if method.upper() not in IDEMPOTENT_METHODS:
+            # A 5xx does not say whether the POST was applied; retrying could duplicate it
+            self.breaker.record_failure()
+            self.logger.warning(f"HTTP {resp.status_code} on {method.upper()} - not retried")
+            return False
         # Server error - retry
-        self.logger.warning(f"HTTP {resp.status_code} (attempt {attempt + 1}/{self.max_retries})")
-        if attempt < self.max_retries - 1:
-            time.sleep(self.retry_delay)
-        return None
+        self._handle_retry(error, attempt)
+        return True
 
     def get_pr_metadata(self) -> Tuple[str, str]:
         """Get PR title and description with fallback"""
@@ -100,25 +182,102 @@ class BitbucketAPI:
         
         return ("PR Review", "Unable to fetch description")
 
-    def get_pr_diff(self) -> str:
-        """Get PR diff with fallback to sample"""
+    def get_pr_commits(self) -> Tuple[Optional[str], Optional[str]]:
+        """Hashes of the PR's current source and destination commits"""
+        if not self.base or not self.pr_id:
+            return None, None
+        
+        data = self._make_request('GET', f"{self.base}/pullrequests/{self.pr_id}") or {}
+        return (data.get('source', {}).get('commit', {}).get('hash'),
+                data.get('destination', {}).get('commit', {}).get('hash'))
+
+    def get_merge_base(self, source: str, destination: str) -> Optional[str]:
+        """Hash of the best common ancestor of two commits; None if it cannot be fetched"""
+        if not self.base or not source or not destination:
+            return None
+        
+        data = self._make_request('GET', f"{self.base}/merge-base/{source}..{destination}")
+        return (data or {}).get('hash')
+
+    def get_pr_diff(self) -> DiffBuffer:
+        """Stream PR diff into a size-capped buffer, with fallback to sample"""
         if not self.base or not self.pr_id:
             self.logger.debug("No Bitbucket context - using sample diff")
             sample = os.path.join(os.getcwd(), 'sample_data', 'sample_diff.txt')
             if os.path.exists(sample):
-                with open(sample, 'r', encoding='utf-8') as f:
-                    return f.read()
-            return ''
+                return load_diff_file(sample)
+            return DiffBuffer()
         
-        url = f"{self.base}/pullrequests/{self.pr_id}/diff"
         try:
-            resp = requests.get(url, headers=self.headers, timeout=self.timeout, verify=True)
-            resp.raise_for_status()
-            self.logger.info("Successfully fetched PR diff")
-            return resp.text
+            return self._fetch_diff(f"{self.base}/pullrequests/{self.pr_id}/diff",
+                                    f"{self.base}/pullrequests/{self.pr_id}/diffstat")
         except Exception as e:
             self.logger.error(f"Error fetching PR diff: {e}")
-            return ''
+            return DiffBuffer()
+
+    def get_interdiff(self, old_head: str, new_head: str) -> Optional[DiffBuffer]:
+        """Diff of the commits pushed since ``old_head``; None if it cannot be fetched"""
+        if not self.base:
+            return None
+        
+        # Bitbucket ranges read source..destination (reversed from git)
+        spec = f"{new_head}..{old_head}"
+        try:
+            return self._fetch_diff(f"{self.base}/diff/{spec}", f"{self.base}/diffstat/{spec}")
+        except Exception as e:
+            self.logger.warning(f"Error fetching interdiff {spec}: {e}")
+            return None
+
+    def _fetch_diff(self, diff_url: str, diffstat_url: str) -> DiffBuffer:
+        buf = DiffBuffer()
+        try:
+            with DIFF_FETCH_LATENCY.time():
+                for params in self._diff_request_params(diffstat_url):
+                    self._stream_diff(diff_url, params, buf)
+        except BaseException:
+            buf.close()
+            raise
+        self.logger.info(f"Successfully fetched PR diff ({len(buf)} bytes"
+                         f"{', spilled to disk' if buf.spilled else ''})")
+        return buf
+
+    def _stream_diff(self, url: str, params, buf: DiffBuffer) -> None:
+        self.breaker.check()
+        self.bucket.acquire()
+        try:
+            resp = self.session.get(url, headers=self.headers, params=params, timeout=self.timeout,
+                                    verify=True, stream=True)
+        except requests.exceptions.RequestException:
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_status(resp.status_code)
+        with resp:
+            resp.raise_for_status()
+            check_content_length(resp.headers.get('Content-Length'), buf.max_bytes - len(buf))
+            for chunk in resp.iter_content(Config.DIFF_CHUNK_SIZE):
+                buf.write(chunk)
+
+    def _diff_request_params(self, diffstat_url: str) -> List[Optional[List]]:
+        """One entry per diff request; selective fetch uses the diffstat first"""
+        if not Config.SELECTIVE_DIFF:
+            return [None]
+        entries = self.get_diffstat(diffstat_url)
+        if entries is None:
+            self.logger.warning("Diffstat unavailable - fetching full diff")
+            return [None]
+        return DiffPathFilter().request_batches(entries)
+
+    def get_diffstat(self, url: Optional[str] = None) -> Optional[List[Dict]]:
+        """Get per-file change stats (all pages) for the PR or a diffstat URL; None on failure"""
+        if not url and not (self.base and self.pr_id):
+            return None
+        
+        url = url or f"{self.base}/pullrequests/{self.pr_id}/diffstat"
+        try:
+            return list(self.paginate(url, params={'pagelen': Config.BITBUCKET_PAGELEN}))
+        except BitbucketAPIError as e:
+            self.logger.warning(str(e))
+            return None
 
     def post_comment(self, comment_text: str) -> bool:
         """Post comment to PR with error handling"""
@@ -134,28 +293,94 @@ class BitbucketAPI:
         url = f"{self.base}/pullrequests/{self.pr_id}/comments"
         payload = {"content": {"raw": comment_text}}
         
+        if not self.breaker.allow():
+            self.logger.error("Bitbucket circuit open - comment not posted")
+            COMMENTS_POSTED.inc(kind='summary', outcome='failed')
+            return False
+        
         try:
-            resp = requests.post(url, headers=self.headers, json=payload, 
-                               timeout=self.timeout, verify=True)
+            self.bucket.acquire()
+            with COMMENT_LATENCY.time(kind='summary'):
+                resp = self.session.post(url, headers=self.headers, json=payload, 
+                                         timeout=self.timeout, verify=True)
+            self.breaker.record_status(resp.status_code)
             
             if resp.status_code in (200, 201):
                 self.logger.info("Comment posted successfully")
+                COMMENTS_POSTED.inc(kind='summary', outcome='posted')
                 return True
             else:
                 self.logger.error(f"Failed to post comment: {resp.status_code} - {resp.text}")
+                COMMENTS_POSTED.inc(kind='summary', outcome='failed')
                 return False
         except Exception as e:
+            self.breaker.record_failure()
             self.logger.error(f"Error posting comment: {e}")
+            COMMENTS_POSTED.inc(kind='summary', outcome='failed')
+            return False
+
+    def update_comment(self, comment_id: int, comment_text: str) -> bool:
+        """Replace the text of an existing PR comment"""
+        if Config.DRY_RUN:
+            self.logger.info(f"DRY_RUN enabled - would update comment {comment_id}")
+            return True
+        
+        if not self.base or not self.pr_id:
+            return False
+        
+        url = f"{self.base}/pullrequests/{self.pr_id}/comments/{comment_id}"
+        with COMMENT_LATENCY.time(kind='update'):
+            ok = self._make_request('PUT', url, json={"content": {"raw": comment_text}}) is not None
+        COMMENTS_POSTED.inc(kind='update', outcome='posted' if ok else 'failed')
+        if ok:
+            self.logger.info(f"Comment {comment_id} updated in place")
+        return ok
+
+    def resolve_comment(self, comment_id: int) -> bool:
+        """Mark a PR comment thread as resolved"""
+        if Config.DRY_RUN:
+            self.logger.info(f"DRY_RUN enabled - would resolve comment {comment_id}")
+            return True
+        
+        if not self.base or not self.pr_id:
             return False
+        
+        url = f"{self.base}/pullrequests/{self.pr_id}/comments/{comment_id}/resolve"
+        return self._make_request('POST', url) is not None
+
+    def list_comments(self) -> List[Dict]:
+        """All comments on the PR (every page); empty if they cannot be read
+
+        Empty under DRY_RUN: nothing was posted, so there is nothing to update or skip.
+        """
+        if Config.DRY_RUN or not self.base or not self.pr_id:
+            return []
+        
+        url = f"{self.base}/pullrequests/{self.pr_id}/comments"
+        try:
+            return list(self.paginate(url, params={'pagelen': Config.BITBUCKET_PAGELEN}))
+        except BitbucketAPIError as e:
+            self.logger.warning(f"Error listing comments: {e}")
+            return []
 
     def post_inline_comment(self, file_path: str, line_number: int, comment_text: str) -> bool:
         """Post inline comment on specific file/line for QA issues"""
+        status, _ = self.submit_inline_comment(file_path, line_number, comment_text)
+        return status in (200, 201)
+
+    def submit_inline_comment(self, file_path: str, line_number: int,
+                              comment_text: str) -> Tuple[int, Optional[float]]:
+        """Single inline comment POST; returns (status code or 0, Retry-After seconds)"""
         if not Config.ENABLE_QA_INLINE_COMMENTS:
-            return False
+            return 0, None
+        
+        if Config.DRY_RUN:
+            self.logger.info(f"DRY_RUN enabled - would post inline comment on {file_path}:{line_number}")
+            return 201, None
         
         if not self.base or not self.pr_id:
             self.logger.warning("No Bitbucket context for inline comment")
-            return False
+            return 0, None
         
         # Bitbucket inline comments require specific payload structure
         url = f"{self.base}/pullrequests/{self.pr_id}/comments"
@@ -167,19 +392,30 @@ class BitbucketAPI:
             }
         }
         
+        if not self.breaker.allow():
+            self.logger.warning("Bitbucket circuit open - inline comment not posted")
+            COMMENTS_POSTED.inc(kind='inline', outcome='failed')
+            return 0, None
+        
         try:
-            resp = requests.post(url, headers=self.headers, json=payload,
-                               timeout=self.timeout, verify=True)
+            self.bucket.acquire()
+            with COMMENT_LATENCY.time(kind='inline'):
+                resp = self.session.post(url, headers=self.headers, json=payload,
+                                         timeout=self.timeout, verify=True)
+            self.breaker.record_status(resp.status_code)
             
             if resp.status_code in (200, 201):
                 self.logger.debug(f"Inline comment posted on {file_path}:{line_number}")
-                return True
-            else:
-                self.logger.warning(f"Failed to post inline comment: {resp.status_code}")
-                return False
+                COMMENTS_POSTED.inc(kind='inline', outcome='posted')
+                return resp.status_code, None
+            self.logger.warning(f"Failed to post inline comment: {resp.status_code}")
+            COMMENTS_POSTED.inc(kind='inline', outcome='failed')
+            return resp.status_code, parse_retry_after(resp.headers.get('Retry-After'))
         except Exception as e:
+            self.breaker.record_failure()
             self.logger.error(f"Error posting inline comment: {e}")
-            return False
+            COMMENTS_POSTED.inc(kind='inline', outcome='failed')
+            return 0, None
 
     def get_reviewers(self) -> List[str]:
         """Get list of PR reviewers"""
@@ -188,9 +424,7 @@ class BitbucketAPI:
         
         url = f"{self.base}/pullrequests/{self.pr_id}/reviewers"
         try:
-            data = self._make_request('GET', url)
-            if data and 'values' in data:
-                return [r.get('username') for r in data['values'] if r.get('username')]
+            return [r.get('username') for r in self.paginate(url) if r.get('username')]
         except Exception as e:
             self.logger.warning(f"Error fetching reviewers: {e}")
         
@@ -0,0 +1,174 @@
+import re
+from typing import Iterable, Iterator, List, Optional, Tuple
+from bot.core.comment_fingerprint import finding_fingerprint, normalize_title
+from bot.core.qa_issue_extractor import SECTIONS, QAIssueExtractor
+from bot.core.utils import extract_file_path_from_diff_line
+from bot.models.hedged_client import is_good_review
+
+_ITEM_RE = re.compile(r'^\s*(?:[-*]|\d+\.)\s+')
+
+
+def file_hunks(lines: Iterable[str]) -> Iterator[Tuple[str, List[str]]]:
+    """(header, hunks) for each file of a unified diff"""
+    header: Optional[List[str]] = None
+    hunks: List[List[str]] = []
+    for line in lines:
+        if line.startswith('diff --git'):
+            if header is not None or hunks:
+                yield ''.join(header or []), [''.join(h) for h in hunks]
+            header, hunks = [line], []
+        elif hunks or line.startswith('@@'):
+            if line.startswith('@@'):
+                hunks.append([])
+            hunks[-1].append(line)
+        else:
+            header = (header or []) + [line]
+    if header is not None or hunks:
+        yield ''.join(header or []), [''.join(h) for h in hunks]
+
+
+def _split_hunk(hunk: str, budget: int) -> List[str]:
+    if len(hunk) <= budget:
+        return [hunk]
+    parts, current = [], ''
+    for line in hunk.splitlines(keepends=True):
+        if current and len(current) + len(line) > budget:
+            parts.append(current)
+            current = ''
+        current += line
+    if current:
+        parts.append(current)
+    return parts
+
+
+def _pieces(lines: Iterable[str], max_chars: int) -> Iterator[str]:
+    """Files of a unified diff; a file over ``max_chars`` is cut at hunk boundaries
+
+    Every piece of a cut file repeats the file header, so each one is a
+    valid diff on its own. A single hunk over the limit is cut by lines.
+    """
+    for header, hunks in file_hunks(lines):
+        if not hunks or len(header) + sum(len(h) for h in hunks) <= max_chars:
+            yield header + ''.join(hunks)
+            continue
+        budget = max(1, max_chars - len(header))
+        current = ''
+        for hunk in hunks:
+            for part in _split_hunk(hunk, budget):
+                if current and len(current) + len(part) > budget:
+                    yield header + current
+                    current = ''
+                current += part
+        if current:
+            yield header + current
+
+
+def split_diff(lines: Iterable[str], max_chars: int) -> Iterator[str]:
+    """Pack a unified diff into chunks of at most ~``max_chars``, split at file/hunk boundaries
+
+    Chunks are yielded as soon as they are full, so only one is held at a time.
+    """
+    current: List[str] = []
+    size = 0
+    for piece in _pieces(lines, max_chars):
+        if current and size + len(piece) > max_chars:
+            yield ''.join(current)
+            current, size = [], 0
+        current.append(piece)
+        size += len(piece)
+    if current:
+        yield ''.join(current)
+
+
+def chunk_files(chunk: str) -> List[str]:
+    """Paths changed in a diff chunk, in order"""
+    files = []
+    for line in chunk.splitlines():
+        if line.startswith('diff --git'):
+            path = extract_file_path_from_diff_line(line)
+            if path and path not in files:
+                files.append(path)
+    return files
+
+
+def _section(text: str, name: str) -> Optional[str]:
+    """Body of a review section (same boundaries QAIssueExtractor uses)"""
+    match = re.search(rf'###?\s*{re.escape(name)}[^\n]*\n?(.*?)(?=^#{{2,3}}\s|\Z)', text,
+                      re.IGNORECASE | re.DOTALL | re.MULTILINE)
+    return match.group(1) if match else None
+
+
+def _items(body: str) -> List[str]:
+    """Split a section body into findings: a bullet line plus its continuation lines"""
+    items: List[List[str]] = []
+    in_code = False
+    for line in body.splitlines():
+        if line.strip().startswith('```'):
+            in_code = not in_code
+        elif not in_code and _ITEM_RE.match(line):
+            items.append([])
+        if not items:
+            items.append([])
+        items[-1].append(line)
+    return ['\n'.join(lines).strip() for lines in items if '\n'.join(lines).strip()]
+
+
+class ReviewReducer:
+    """Merge per-chunk QA reviews into one report without another LLM call
+
+    Findings are deduplicated by the fingerprint used for inline comments;
+    "no issues" placeholders are dropped unless a section is empty overall.
+    """
+
+    def __init__(self):
+        self.extractor = QAIssueExtractor()
+
+    def merge(self, reviews: List[str], files: List[List[str]]) -> str:
+        """One report from the part ``reviews``; ``files`` are the paths of each part"""
+        failed = [(i, r) for i, r in enumerate(reviews) if not is_good_review(r)]
+        if len(failed) == len(reviews):
+            return reviews[0]
+
+        ok = [(i, r) for i, r in enumerate(reviews) if (i, r) not in failed]
+        parts = ["### QA Summary",
+                 f"Large PR reviewed in {len(reviews)} parts at file/hunk boundaries."]
+        for i, review in ok:
+            summary = (_section(review, 'QA Summary') or '').strip()
+            paths = ', '.join(f"`{f}`" for f in files[i][:5])
+            parts.append(f"- **Part {i + 1}** ({paths}): {' '.join(summary.split())}")
+        for i, error in failed:
+            parts.append(f"- **Part {i + 1}** could not be reviewed: {error.strip()[:200]}")
+
+        seen = set()
+        for section_name, category in SECTIONS:
+            found = []
+            for _, review in ok:
+                for item in _items(_section(review, section_name) or ''):
+                    if 'No issues' in item.split('\n', 1)[0]:
+                        continue
+                    key = self._fingerprint(item, section_name, category)
+                    if key not in seen:
+                        seen.add(key)
+                        found.append(item)
+            parts.append(f"\n### {section_name}")
+            parts.append('\n'.join(found) if found else "No issues found in this category.")
+
+        parts.append("\n### Final Recommendation")
+        parts.append(self._recommendation(ok))
+        return '\n'.join(parts) + '\n'
+
+    def _fingerprint(self, item: str, section_name: str, category: str) -> str:
+        first = item.split('\n', 1)[0]
+        issues = self.extractor._extract_section_issues(f"### {section_name}\n{first}", section_name, category)
+        if issues:
+            return finding_fingerprint(issues[0])
+        return f"{category}|{normalize_title(item)}"
+
+    @staticmethod
+    def _recommendation(reviews: List[Tuple[int, str]]) -> str:
+        texts = [(i, ' '.join((_section(r, 'Final Recommendation') or '').split())) for i, r in reviews]
+        if any('request changes' in t.lower() for _, t in texts):
+            verdict = "**Request Changes**"
+        else:
+            verdict = "**Approve**"
+        return '\n'.join([verdict] + [f"- Part {i + 1}: {t}" for i, t in texts if t])
@@ -1,4 +1,13 @@
 # Helper to format comments with structured markdown sections
+
+class FailedReview(str):
+    """Review text reporting a generation that failed, wholly or in part
+
+    It is posted like any review, but never cached and never recorded as
+    the PR's reviewed state, so the next run reviews the changes again.
+    """
+
+
 def build_markdown_comment(text: str) -> str:
     """Build formatted markdown comment with header"""
     header = """## Automated AI Code Review
@@ -0,0 +1,79 @@
+import hashlib
+import re
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Set
+from bot.core.qa_formatter import QAIssue
+
+# Hidden markers the bot embeds in its own comments (HTML comments do not render)
+SUMMARY_MARKER = '<!-- ai-pr-reviewer:summary -->'
+_FINDING_MARKER = '<!-- ai-pr-reviewer:finding:{} -->'
+_FINDING_RE = re.compile(r'<!-- ai-pr-reviewer:finding:([0-9a-f]+) -->')
+
+
+def normalize_title(title: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace so rewordings match"""
+    return ' '.join(re.sub(r'[^a-z0-9]+', ' ', title.lower()).split())
+
+
+def finding_fingerprint(issue: QAIssue) -> str:
+    raw = f"{issue.file_path}|{issue.line_number}|{issue.category}|{normalize_title(issue.title)}"
+    return hashlib.sha1(raw.encode()).hexdigest()[:16]
+
+
+def tag_finding(text: str, fingerprint: str) -> str:
+    return f"{text}\n\n{_FINDING_MARKER.format(fingerprint)}"
+
+
+def tag_summary(text: str) -> str:
+    return f"{text}\n\n{SUMMARY_MARKER}"
+
+
+def fingerprint_of(text: str) -> Optional[str]:
+    match = _FINDING_RE.search(text or '')
+    return match.group(1) if match else None
+
+
+@dataclass
+class BotComments:
+    """The bot's own comments on a PR, found by their hidden markers"""
+    summary_id: Optional[int] = None
+    findings: Dict[str, int] = field(default_factory=dict)  # fingerprint -> comment id
+    paths: Dict[str, str] = field(default_factory=dict)  # fingerprint -> file path
+    lines: Dict[str, Optional[int]] = field(default_factory=dict)  # fingerprint -> anchored line
+    resolved: Set[str] = field(default_factory=set)
+
+    @classmethod
+    def from_comments(cls, comments: Iterable[Dict]) -> 'BotComments':
+        found = cls()
+        for comment in comments:
+            if comment.get('deleted'):
+                continue
+            raw = (comment.get('content') or {}).get('raw') or ''
+            if SUMMARY_MARKER in raw:
+                # keep the newest summary if several exist
+                if found.summary_id is None or comment['id'] > found.summary_id:
+                    found.summary_id = comment['id']
+                continue
+            fingerprint = fingerprint_of(raw)
+            if fingerprint:
+                found.findings[fingerprint] = comment['id']
+                inline = comment.get('inline') or {}
+                found.paths[fingerprint] = inline.get('path', '')
+                found.lines[fingerprint] = inline.get('to')
+                if comment.get('resolution'):
+                    found.resolved.add(fingerprint)
+        return found
+
+    def is_posted(self, text: str) -> bool:
+        return fingerprint_of(text) in self.findings
+
+    def fixed(self, current: Set[str],
+              in_scope: Optional[Callable[[str, Optional[int]], bool]] = None) -> List[int]:
+        """Open finding comments no longer reported where this review looked
+
+        ``in_scope(path, line)`` limits this to what an incremental review
+        re-examined (ReviewScope.covers); None means the whole PR was reviewed.
+        """
+        return [cid for fp, cid in self.findings.items()
+                if fp not in current and fp not in self.resolved
+                and (in_scope is None or in_scope(self.paths.get(fp), self.lines.get(fp)))]
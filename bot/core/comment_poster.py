@@ -0,0 +1,284 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple
+from bot.config import Config
+from bot.core.logger import ReviewLogger
+from bot.core.rate_limiter import TokenBucket, get_bucket
+from bot.core.resilience import CircuitBreaker, backoff_delay, get_breaker
+from bot.core.qa_formatter import QAFormatter, QAIssue
+from bot.core.qa_issue_extractor import QAIssueExtractor
+from bot.core.comment_fingerprint import (BotComments, finding_fingerprint, fingerprint_of,
+                                          tag_finding, tag_summary)
+from bot.core.incremental_review import ReviewScope
+
+# (file_path, line_number, comment_text)
+InlineComment = Tuple[str, int, str]
+
+
+@dataclass
+class CommentResult:
+    """Outcome of posting one inline comment"""
+    file_path: str
+    line_number: int
+    posted: bool
+    status_code: int = 0  # 0 = no HTTP response
+    attempts: int = 0
+
+
+class InlineCommentPoster:
+    """Post inline comments concurrently under a shared token-bucket rate limit
+
+    Works with either BitbucketAPI (``post_all``, thread pool) or
+    AsyncBitbucketAPI (``apost_all``, asyncio). The client takes a token
+    from the shared 'bitbucket' bucket for every POST; a 429 pauses that
+    bucket for the server's Retry-After before the comment is retried.
+    """
+
+    def __init__(self, bucket: Optional[TokenBucket] = None, concurrency: int = None,
+                 max_retries: int = None, retry_delay: float = None):
+        self.bucket = bucket or get_bucket('bitbucket')
+        self.breaker = get_breaker('bitbucket')
+        self.concurrency = max(1, concurrency or Config.COMMENT_CONCURRENCY)
+        self.max_retries = max_retries or Config.MAX_RETRIES
+        self.retry_delay = Config.RETRY_DELAY if retry_delay is None else retry_delay
+        self.logger = ReviewLogger.get()
+
+    def post_all(self, api, comments: List[InlineComment]) -> List[CommentResult]:
+        """Post with a blocking BitbucketAPI; results are in input order"""
+        if not comments:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.concurrency, len(comments))) as pool:
+            results = list(pool.map(lambda c: self._post_one(api, *c), comments))
+        self._log_summary(results)
+        return results
+
+    async def apost_all(self, api, comments: List[InlineComment]) -> List[CommentResult]:
+        """Post with an AsyncBitbucketAPI; results are in input order"""
+        if not comments:
+            return []
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def bounded(comment: InlineComment) -> CommentResult:
+            async with semaphore:
+                return await self._apost_one(api, *comment)
+
+        results = await asyncio.gather(*(bounded(c) for c in comments))
+        self._log_summary(results)
+        return list(results)
+
+    def _post_one(self, api, file_path: str, line_number: int, text: str) -> CommentResult:
+        result = CommentResult(file_path, line_number, posted=False)
+        while result.attempts < self.max_retries:
+            result.attempts += 1
+            result.status_code, retry_after = api.submit_inline_comment(file_path, line_number, text)
+            delay = self._next_delay(result, retry_after)
+            if delay is None:
+                break
+            if result.status_code == 429:
+                self.bucket.pause(self._rate_limit_wait(retry_after))
+            if self._ambiguous(result, text) and BotComments.from_comments(api.list_comments()).is_posted(text):
+                result.posted = True
+                break
+            time.sleep(delay)
+        return result
+
+    async def _apost_one(self, api, file_path: str, line_number: int, text: str) -> CommentResult:
+        result = CommentResult(file_path, line_number, posted=False)
+        while result.attempts < self.max_retries:
+            result.attempts += 1
+            result.status_code, retry_after = await api.submit_inline_comment(file_path, line_number, text)
+            delay = self._next_delay(result, retry_after)
+            if delay is None:
+                break
+            if result.status_code == 429:
+                await self.bucket.pause_async(self._rate_limit_wait(retry_after))
+            if self._ambiguous(result, text) and BotComments.from_comments(await api.list_comments()).is_posted(text):
+                result.posted = True
+                break
+            await asyncio.sleep(delay)
+        return result
+
+    @staticmethod
+    def _ambiguous(result: CommentResult, text: str) -> bool:
+        """A failed POST that may still have created the comment (timeout, reset, 5xx)"""
+        return fingerprint_of(text) is not None and (result.status_code == 0 or result.status_code >= 500)
+
+    def _next_delay(self, result: CommentResult, retry_after: Optional[float]) -> Optional[float]:
+        """Seconds to wait before retrying, or None when the outcome is final"""
+        status = result.status_code
+        if status in (200, 201):
+            result.posted = True
+            return None
+        if result.attempts >= self.max_retries:
+            return None
+        if status == 429:
+            return 0  # the caller pauses the bucket, which does the waiting
+        if status == 0 or status >= 500:
+            if self.breaker.state == CircuitBreaker.OPEN:
+                return None  # Bitbucket is down; do not sleep through the outage
+            return backoff_delay(result.attempts - 1, self.retry_delay)
+        return None  # other 4xx: retrying will not help
+
+    def _rate_limit_wait(self, retry_after: Optional[float]) -> float:
+        wait = retry_after if retry_after is not None else self.retry_delay
+        self.logger.warning(f"Rate limited posting inline comments. Pausing {wait} seconds...")
+        return wait
+
+    @staticmethod
+    def summarize(results: List[CommentResult]) -> Dict[str, int]:
+        posted = sum(1 for r in results if r.posted)
+        return {'total': len(results), 'posted': posted, 'failed': len(results) - posted}
+
+    def _log_summary(self, results: List[CommentResult]) -> None:
+        summary = self.summarize(results)
+        self.logger.info(f"Inline comments: {summary['posted']}/{summary['total']} posted")
+        for r in results:
+            if not r.posted:
+                self.logger.warning(f"Inline comment on {r.file_path}:{r.line_number} failed "
+                                    f"(HTTP {r.status_code or 'n/a'}, {r.attempts} attempts)")
+
+
+def build_inline_comments(review_text: str) -> Tuple[List[InlineComment], Set[str]]:
+    """Fingerprinted inline comments for the review's HIGH/MEDIUM located issues
+
+    Returns the comments and the set of all their fingerprints.
+    """
+    return inline_comments_for(QAIssueExtractor().extract_issues(review_text))
+
+
+def inline_comments_for(issues: List[QAIssue]) -> Tuple[List[InlineComment], Set[str]]:
+    """build_inline_comments for already extracted issues"""
+    extractor = QAIssueExtractor()
+    actionable = extractor.extract_high_medium_issues(issues)
+    comments, fingerprints = [], set()
+    for (file_path, line_num), issues in extractor.group_issues_by_location(actionable).items():
+        for issue in issues:
+            fingerprint = finding_fingerprint(issue)
+            if fingerprint in fingerprints:
+                continue
+            fingerprints.add(fingerprint)
+            comments.append((file_path, line_num, tag_finding(QAFormatter.format_inline_comment(issue), fingerprint)))
+    return comments, fingerprints
+
+
+class EarlyInlinePoster:
+    """Post a streaming review's inline comments section by section
+
+    ``on_issues`` is the ReviewerEngine callback; posting runs in background
+    tasks so the stream keeps flowing. The comments carry the same
+    fingerprints ReviewPublisher uses, so the final publish skips them.
+    Call ``drain`` before publishing, or ``cancel`` when the review is
+    abandoned so a superseded revision stops posting.
+    """
+
+    def __init__(self, api, poster: Optional[InlineCommentPoster] = None):
+        self.api = api
+        self.poster = poster or InlineCommentPoster()
+        self.logger = ReviewLogger.get()
+        self._seen: Set[str] = set()
+        self._existing: Optional[asyncio.Task] = None
+        self._tasks: List[asyncio.Task] = []
+
+    async def on_issues(self, issues: List[QAIssue]) -> None:
+        if not Config.ENABLE_QA_INLINE_COMMENTS:
+            return
+        comments, fingerprints = inline_comments_for(issues)
+        comments = [c for c in comments if fingerprint_of(c[2]) not in self._seen]
+        self._seen |= fingerprints
+        if comments:
+            self._tasks.append(asyncio.create_task(self._post(comments)))
+
+    async def _post(self, comments: List[InlineComment]) -> None:
+        if self._existing is None:  # one listing shared by every section
+            self._existing = asyncio.create_task(self.api.list_comments())
+        existing = BotComments.from_comments(await self._existing)
+        new = [c for c in comments if not existing.is_posted(c[2])]
+        if new:
+            self.logger.info(f"Posting {len(new)} inline comments before the review is finished")
+            await self.poster.apost_all(self.api, new)
+
+    async def drain(self) -> None:
+        """Wait for every early post to finish"""
+        results = await asyncio.gather(*self._tasks, return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                self.logger.warning(f"Early inline comments failed: {result}")
+        self._tasks = []
+
+    async def cancel(self) -> None:
+        """Stop every early post that has not finished and wait for it to unwind"""
+        tasks = self._tasks + ([self._existing] if self._existing else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks = []
+
+
+class ReviewPublisher:
+    """Publish a review without piling up comments on the PR
+
+    The bot's existing comments are read once: the summary is edited in
+    place, only findings with a new fingerprint are posted, and comments for
+    findings no longer reported can be resolved (RESOLVE_FIXED_COMMENTS).
+    """
+
+    def __init__(self, poster: Optional[InlineCommentPoster] = None):
+        self.poster = poster or InlineCommentPoster()
+        self.logger = ReviewLogger.get()
+
+    def publish(self, api, summary: str, review_text: str,
+                scope: Optional[ReviewScope] = None) -> bool:
+        """Post or update the summary and sync inline comments; True if the summary landed"""
+        existing = BotComments.from_comments(api.list_comments())
+        summary_id = self._summary_target(existing)
+        if summary_id:
+            posted = api.update_comment(summary_id, tag_summary(summary))
+        else:
+            posted = api.post_comment(tag_summary(summary))
+
+        if Config.ENABLE_QA_INLINE_COMMENTS:
+            comments, current = build_inline_comments(review_text)
+            self.poster.post_all(api, self._new_comments(existing, comments))
+            for comment_id in self._fixed(existing, current, scope):
+                api.resolve_comment(comment_id)
+        return posted
+
+    async def apublish(self, api, summary: str, review_text: str,
+                       scope: Optional[ReviewScope] = None) -> bool:
+        """Async variant of publish for AsyncBitbucketAPI"""
+        existing = BotComments.from_comments(await api.list_comments())
+        summary_id = self._summary_target(existing)
+        if summary_id:
+            posted = await api.update_comment(summary_id, tag_summary(summary))
+        else:
+            posted = await api.post_comment(tag_summary(summary))
+
+        if Config.ENABLE_QA_INLINE_COMMENTS:
+            comments, current = build_inline_comments(review_text)
+            await self.poster.apost_all(api, self._new_comments(existing, comments))
+            for comment_id in self._fixed(existing, current, scope):
+                await api.resolve_comment(comment_id)
+        return posted
+
+    @staticmethod
+    def _summary_target(existing: BotComments) -> Optional[int]:
+        if Config.UPDATE_SUMMARY_IN_PLACE and not Config.DRY_RUN:
+            return existing.summary_id
+        return None
+
+    def _new_comments(self, existing: BotComments, comments: List[InlineComment]) -> List[InlineComment]:
+        new = [c for c in comments if not existing.is_posted(c[2])]
+        if len(new) < len(comments):
+            self.logger.info(f"Skipping {len(comments) - len(new)} inline comments already on the PR")
+        return new
+
+    def _fixed(self, existing: BotComments, current: Set[str],
+               scope: Optional[ReviewScope]) -> List[int]:
+        if not Config.RESOLVE_FIXED_COMMENTS:
+            return []
+        fixed = existing.fixed(current, scope.covers if scope else None)
+        if fixed:
+            self.logger.info(f"Resolving {len(fixed)} comments for findings no longer reported")
+        return fixed
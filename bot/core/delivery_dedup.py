@@ -0,0 +1,80 @@
+import sqlite3
+import time
+from contextlib import closing
+from pathlib import Path
+from typing import Optional
+from bot.core.logger import ReviewLogger
+
+
+class DeliveryDeduplicator:
+    """Bounded TTL/LRU set of seen webhook deliveries
+
+    Backed by a small SQLite file so every server worker on the host shares
+    the same view - a retried delivery is recognised no matter which worker
+    receives it.
+    """
+
+    def __init__(self, db_path: str, ttl: int = 86400, max_entries: int = 10000):
+        self.db_path = db_path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.logger = ReviewLogger.get()
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS deliveries ("
+                "key TEXT PRIMARY KEY, seen_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_deliveries_seen_at ON deliveries (seen_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=5)
+
+    @staticmethod
+    def delivery_key(request_uuid: Optional[str], workspace: str, repo_slug: str, pr_id,
+                     payload: dict, event_key: Optional[str]) -> Optional[str]:
+        """Dedup key: the delivery UUID header, else PR + head commit + event"""
+        if request_uuid:
+            return f"uuid:{request_uuid}"
+        head = payload.get('pullrequest', {}).get('source', {}).get('commit', {}).get('hash')
+        if not head:
+            return None
+        return f"pr:{workspace}/{repo_slug}/{pr_id}:{head}:{event_key or ''}"
+
+    def check_and_mark(self, key: str) -> bool:
+        """Record ``key`` as seen; return True if it was already seen within the TTL
+
+        The insert itself decides: of two workers racing on one delivery,
+        only the one whose INSERT OR IGNORE adds the row processes it.
+        """
+        now = time.time()
+        try:
+            with closing(self._connect()) as conn, conn:
+                conn.execute("DELETE FROM deliveries WHERE key = ? AND seen_at < ?", (key, now - self.ttl))
+                inserted = conn.execute("INSERT OR IGNORE INTO deliveries (key, seen_at) VALUES (?, ?)",
+                                        (key, now)).rowcount == 1
+                if not inserted:
+                    conn.execute("UPDATE deliveries SET seen_at = ? WHERE key = ?", (now, key))
+                self._evict(conn, now)
+                return not inserted
+        except sqlite3.Error as e:
+            # Never drop a delivery because the dedup store is unavailable
+            self.logger.warning(f"Delivery dedup store unavailable: {e}")
+            return False
+
+    def forget(self, key: str) -> None:
+        """Drop ``key`` so a redelivery is processed (e.g. after we rejected it)"""
+        try:
+            with closing(self._connect()) as conn, conn:
+                conn.execute("DELETE FROM deliveries WHERE key = ?", (key,))
+        except sqlite3.Error as e:
+            self.logger.warning(f"Delivery dedup store unavailable: {e}")
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        """Expire entries past the TTL, then trim the least recently seen beyond the cap"""
+        conn.execute("DELETE FROM deliveries WHERE seen_at < ?", (now - self.ttl,))
+        conn.execute(
+            "DELETE FROM deliveries WHERE key IN ("
+            "SELECT key FROM deliveries ORDER BY seen_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
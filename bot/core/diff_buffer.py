@@ -0,0 +1,93 @@
+import tempfile
+from typing import Iterator, Optional
+from bot.config import Config
+
+
+class DiffTooLargeError(Exception):
+    """Raised when a diff grows past DIFF_MAX_BYTES"""
+
+
+class DiffBuffer:
+    """Size-capped diff storage that spills to a temp file past a memory ceiling
+
+    Downloads are written chunk by chunk; consumers read the diff back as
+    lines or as a head/tail slice, so the full text never has to exist as one
+    Python string. ``len()`` is the size in bytes.
+    """
+
+    def __init__(self, memory_limit: int = None, max_bytes: int = None):
+        self.memory_limit = Config.DIFF_MEMORY_LIMIT if memory_limit is None else memory_limit
+        self.max_bytes = Config.DIFF_MAX_BYTES if max_bytes is None else max_bytes
+        self._file = tempfile.SpooledTemporaryFile(max_size=self.memory_limit, mode='w+b',
+                                                   prefix='pr-diff-')
+        self._size = 0
+
+    @classmethod
+    def from_text(cls, text: str) -> 'DiffBuffer':
+        buf = cls()
+        if text:
+            buf.write(text.encode('utf-8'))
+        return buf
+
+    def write(self, chunk: bytes) -> None:
+        if self._size + len(chunk) > self.max_bytes:
+            raise DiffTooLargeError(f"Diff exceeds {self.max_bytes} bytes")
+        self._file.seek(0, 2)
+        self._file.write(chunk)
+        self._size += len(chunk)
+
+    @property
+    def spilled(self) -> bool:
+        """True once the diff has been moved from memory to a temp file"""
+        return self._file._rolled
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self) -> Iterator[str]:
+        """Iterate decoded lines (with line endings), reading from the start"""
+        self._file.seek(0)
+        for raw in self._file:
+            yield raw.decode('utf-8', errors='replace')
+
+    def head(self, size: int) -> str:
+        """First ``size`` bytes, decoded"""
+        self._file.seek(0)
+        return self._file.read(size).decode('utf-8', errors='replace')
+
+    def tail(self, size: int) -> str:
+        """Last ``size`` bytes, decoded"""
+        self._file.seek(max(0, self._size - size))
+        return self._file.read(size).decode('utf-8', errors='replace')
+
+    def text(self) -> str:
+        """The whole diff as a string; only for callers that genuinely need it"""
+        return self.head(self._size)
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self) -> 'DiffBuffer':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def check_content_length(value: Optional[str], max_bytes: int) -> None:
+    """Fail fast when the server announces a diff larger than ``max_bytes``"""
+    if value and value.isdigit() and int(value) > max_bytes:
+        raise DiffTooLargeError(f"Diff of {value} bytes exceeds {max_bytes} bytes")
+
+
+def load_diff_file(path: str) -> DiffBuffer:
+    """Copy a diff file into a DiffBuffer in chunks"""
+    buf = DiffBuffer()
+    try:
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(Config.DIFF_CHUNK_SIZE), b''):
+                buf.write(chunk)
+    except Exception:
+        buf.close()
+        raise
+    return buf
@@ -0,0 +1,87 @@
+import fnmatch
+import posixpath
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+from bot.config import Config
+from bot.core.logger import ReviewLogger
+
+
+def parse_globs(value: str) -> List[str]:
+    """Split a comma-separated glob list from the environment"""
+    return [g.strip() for g in (value or '').split(',') if g.strip()]
+
+
+def matches_globs(path: str, globs: List[str]) -> bool:
+    name = posixpath.basename(path)
+    return any(fnmatch.fnmatch(path, g) or fnmatch.fnmatch(name, g) for g in globs)
+
+
+@dataclass
+class DiffSelection:
+    """Result of filtering a PR diffstat"""
+    paths: List[str] = field(default_factory=list)
+    skipped: List[Tuple[str, str]] = field(default_factory=list)  # (path, reason)
+
+    @property
+    def filtered(self) -> bool:
+        """True when at least one changed file was dropped"""
+        return bool(self.skipped)
+
+
+class DiffPathFilter:
+    """Pick the files worth reviewing from Bitbucket diffstat entries
+
+    A glob matches against the full path or the file name. Include globs
+    (when given) whitelist paths, exclude globs drop them, and files with
+    more than ``max_file_lines`` changed lines are skipped as generated or
+    bulk changes.
+    """
+
+    def __init__(self, include: List[str] = None, exclude: List[str] = None,
+                 max_file_lines: int = None):
+        self.include = parse_globs(Config.DIFF_INCLUDE_GLOBS) if include is None else include
+        self.exclude = parse_globs(Config.DIFF_EXCLUDE_GLOBS) if exclude is None else exclude
+        self.max_file_lines = Config.DIFF_MAX_FILE_LINES if max_file_lines is None else max_file_lines
+
+    @staticmethod
+    def entry_path(entry: Dict) -> str:
+        """Path of a diffstat entry (the old path for deleted files)"""
+        side = entry.get('new') or entry.get('old') or {}
+        return side.get('path', '')
+
+    def reject_reason(self, entry: Dict) -> Optional[str]:
+        path = self.entry_path(entry)
+        if not path:
+            return 'no path'
+        if self.include and not matches_globs(path, self.include):
+            return 'not included'
+        if matches_globs(path, self.exclude):
+            return 'excluded'
+        changed = (entry.get('lines_added') or 0) + (entry.get('lines_removed') or 0)
+        if self.max_file_lines and changed > self.max_file_lines:
+            return f'{changed} lines changed'
+        return None
+
+    def request_batches(self, entries: List[Dict], batch_size: int = None) -> List[Optional[List[Tuple[str, str]]]]:
+        """Query params for each diff request: [None] means fetch the full diff"""
+        batch_size = batch_size or Config.DIFF_PATHS_PER_REQUEST
+        selection = self.select(entries)
+        if not selection.filtered:
+            return [None]
+        logger = ReviewLogger.get()
+        logger.info(f"Reviewing {len(selection.paths)} of {len(entries)} changed files")
+        for path, reason in selection.skipped:
+            logger.debug(f"Skipping {path}: {reason}")
+        paths = selection.paths
+        return [[('path', p) for p in paths[i:i + batch_size]] for i in range(0, len(paths), batch_size)]
+
+    def select(self, entries: List[Dict]) -> DiffSelection:
+        selection = DiffSelection()
+        for entry in entries:
+            reason = self.reject_reason(entry)
+            path = self.entry_path(entry)
+            if reason:
+                selection.skipped.append((path, reason))
+            elif path not in selection.paths:
+                selection.paths.append(path)
+        return selection
@@ -0,0 +1,180 @@
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from bot.config import Config
+from bot.core.diff_buffer import DiffBuffer
+from bot.core.chunked_review import file_hunks
+from bot.core.diff_filter import matches_globs, parse_globs
+from bot.core.utils import extract_file_path_from_diff_line
+
+_HUNK_HEADER = re.compile(r'^@@ -(\d+)(?:,\d+)? \+(\d+)(?:,\d+)? @@(.*)$')
+# header lines that carry no review value
+_NOISE_HEADERS = ('index ', 'old mode ', 'new mode ', 'similarity index ', 'dissimilarity index ')
+# indentation is syntax here, so only re-indentation that keeps the depth counts as whitespace-only
+_INDENT_SENSITIVE = ('*.py', '*.pyx', '*.yml', '*.yaml', 'Makefile', '*.mk', '*.coffee', '*.haml', '*.pug')
+_GENERATED_MARKERS = ('@generated', 'DO NOT EDIT', 'Code generated by', 'autogenerated', 'auto-generated')
+
+
+@dataclass
+class MinimizeStats:
+    """What a minimization pass removed"""
+    chars_before: int = 0
+    chars_after: int = 0
+    dropped: Dict[str, int] = field(default_factory=Counter)  # reason -> count
+
+    @property
+    def saved_chars(self) -> int:
+        return self.chars_before - self.chars_after
+
+    def describe(self) -> str:
+        pct = 100 * self.saved_chars / self.chars_before if self.chars_before else 0
+        reasons = ', '.join(f"{n} {reason}" for reason, n in sorted(self.dropped.items()))
+        return (f"diff {self.chars_before} -> {self.chars_after} chars (-{pct:.0f}%)"
+                + (f"; dropped {reasons}" if reasons else ''))
+
+
+class DiffMinimizer:
+    """Shrink a unified diff before it goes into a prompt
+
+    Trims context to ``context_lines`` around each change (re-numbering the
+    hunks), drops ``index``/mode headers, whitespace-only hunks and
+    rename-only files, and collapses binary and generated files to a
+    one-line note. Omitted files are summed up in a closing note.
+    """
+
+    def __init__(self, context_lines: int = None, generated_globs: List[str] = None):
+        self.context_lines = Config.MINIMIZE_CONTEXT_LINES if context_lines is None else context_lines
+        self.generated_globs = (parse_globs(Config.MINIMIZE_GENERATED_GLOBS)
+                                if generated_globs is None else generated_globs)
+
+    def minimize(self, diff) -> Tuple[Union[str, DiffBuffer], MinimizeStats]:
+        """Minimized ``diff`` and what was saved
+
+        A str gives a str. A DiffBuffer is read line by line and the result
+        is written, one file at a time, into a new DiffBuffer that the caller
+        closes. Both sizes in the stats are counted in decoded characters.
+        """
+        stats = MinimizeStats()
+        if isinstance(diff, str):
+            text = ''.join(self._minimized(diff.splitlines(keepends=True), stats))
+            stats.chars_after = len(text)
+            return text, stats
+        out = DiffBuffer(memory_limit=diff.memory_limit, max_bytes=diff.max_bytes)
+        try:
+            for part in self._minimized(diff, stats):
+                out.write(part.encode('utf-8'))
+                stats.chars_after += len(part)
+        except Exception:
+            out.close()
+            raise
+        return out, stats
+
+    def _minimized(self, lines: Iterable[str], stats: MinimizeStats) -> Iterator[str]:
+        """Minimized text of each file of ``lines``, then the note on omitted files"""
+        def counted():
+            for line in lines:
+                stats.chars_before += len(line)
+                yield line
+
+        omitted: List[str] = []
+        for header, hunks in file_hunks(counted()):
+            path = self._path(header)
+            reason = self._skip_reason(path, header, hunks)
+            if reason in ('binary', 'generated'):
+                stats.dropped[reason] += 1
+                yield header.split('\n', 1)[0] + f"\n# {reason} file changed; contents omitted\n"
+                continue
+            if reason:
+                stats.dropped[reason] += 1
+                renamed = re.findall(r'^rename (?:from|to) (.+)$', header, re.MULTILINE)
+                omitted.append(f"{' -> '.join(renamed) or path} ({reason})")
+                continue
+
+            kept = []
+            for hunk in hunks:
+                if self._whitespace_only(hunk, matches_globs(path, _INDENT_SENSITIVE)):
+                    stats.dropped['whitespace-only hunks'] += 1
+                else:
+                    kept.extend(self._trim(hunk))
+            if hunks and not kept:
+                omitted.append(f"{path} (whitespace-only)")
+                continue
+            yield self._header(header) + ''.join(kept)
+
+        if omitted:
+            yield f"# omitted: {', '.join(omitted[:20])}{', ...' if len(omitted) > 20 else ''}\n"
+
+    @staticmethod
+    def _path(header: str) -> str:
+        first = header.split('\n', 1)[0]
+        return extract_file_path_from_diff_line(first) if first.startswith('diff --git') else ''
+
+    def _skip_reason(self, path: str, header: str, hunks: List[str]) -> Optional[str]:
+        if 'Binary files ' in header or 'GIT binary patch' in header:
+            return 'binary'
+        if path and matches_globs(path, self.generated_globs):
+            return 'generated'
+        if hunks and any(marker in hunks[0][:1000] for marker in _GENERATED_MARKERS):
+            return 'generated'
+        if not hunks and 'rename from ' in header:
+            return 'rename-only'
+        return None
+
+    @staticmethod
+    def _header(header: str) -> str:
+        return ''.join(line for line in header.splitlines(keepends=True)
+                       if not line.startswith(_NOISE_HEADERS))
+
+    @staticmethod
+    def _whitespace_only(hunk: str, keep_indent: bool = False) -> bool:
+        def key(text: str) -> str:
+            text = text.expandtabs(4)
+            indent = len(text) - len(text.lstrip()) if keep_indent else 0
+            return f"{indent}|{''.join(text.split())}"
+
+        removed, added = Counter(), Counter()
+        for line in hunk.splitlines()[1:]:
+            if line.startswith('-'):
+                removed[key(line[1:])] += 1
+            elif line.startswith('+'):
+                added[key(line[1:])] += 1
+        return bool(removed or added) and removed == added
+
+    def _trim(self, hunk: str) -> List[str]:
+        """Split ``hunk`` into hunks keeping ``context_lines`` of context around each change"""
+        lines = hunk.splitlines(keepends=True)
+        match = _HUNK_HEADER.match(lines[0]) if lines else None
+        if not match:
+            return [hunk]
+        old, new = int(match.group(1)), int(match.group(2))
+        body = lines[1:]
+        changed = [i for i, line in enumerate(body) if line[:1] in ('+', '-')]
+        keep = set()
+        for i in changed:
+            keep.update(range(max(0, i - self.context_lines), i + self.context_lines + 1))
+
+        hunks, current = [], None
+        for i, line in enumerate(body):
+            is_context = line[:1] not in ('+', '-', '\\')
+            if i in keep or (line.startswith('\\') and current):
+                if current is None:
+                    current = {'old': old, 'new': new, 'old_len': 0, 'new_len': 0, 'lines': []}
+                current['lines'].append(line)
+                if is_context or line.startswith('-'):
+                    current['old_len'] += 1
+                if is_context or line.startswith('+'):
+                    current['new_len'] += 1
+            elif current is not None:
+                hunks.append(current)
+                current = None
+            if is_context or line.startswith('-'):
+                old += 1
+            if is_context or line.startswith('+'):
+                new += 1
+        if current is not None:
+            hunks.append(current)
+
+        section = match.group(3)
+        return [f"@@ -{h['old']},{h['old_len']} +{h['new']},{h['new_len']} @@{section if n == 0 else ''}\n"
+                + ''.join(h['lines']) for n, h in enumerate(hunks)]
@@ -0,0 +1,104 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional
+from urllib.parse import urlencode
+from bot.config import Config
+from bot.core.logger import ReviewLogger
+
+
+@dataclass
+class CachedResponse:
+    """Validators and body of a previously seen GET response"""
+    etag: Optional[str]
+    last_modified: Optional[str]
+    body: str
+
+    def conditional_headers(self) -> Dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class HttpResponseCache:
+    """ETag / Last-Modified store for Bitbucket GETs, bounded by LRU
+
+    SQLite-backed so validators survive between CLI runs and are shared by
+    every server worker. Keys include a hash of the access token, so one
+    token's responses are never served to another.
+    """
+
+    def __init__(self, db_path: str, max_entries: int = 2000):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.logger = ReviewLogger.get()
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, "
+                "body TEXT NOT NULL, used_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_used_at ON responses (used_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=5)
+
+    @staticmethod
+    def cache_key(token: str, url: str, params: Optional[Dict] = None) -> str:
+        query = urlencode(sorted(params.items()), doseq=True) if params else ''
+        return hashlib.sha256(f"{token or ''}\n{url}\n{query}".encode()).hexdigest()
+
+    def lookup(self, key: str) -> Optional[CachedResponse]:
+        try:
+            with closing(self._connect()) as conn:
+                row = conn.execute("SELECT etag, last_modified, body FROM responses WHERE key = ?",
+                                   (key,)).fetchone()
+        except sqlite3.Error as e:
+            self.logger.warning(f"HTTP cache unavailable: {e}")
+            return None
+        return CachedResponse(*row) if row else None
+
+    def store(self, key: str, etag: Optional[str], last_modified: Optional[str], body: str) -> None:
+        try:
+            with closing(self._connect()) as conn, conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, etag, last_modified, body, used_at) "
+                    "VALUES (?, ?, ?, ?, ?)", (key, etag, last_modified, body, time.time()))
+                conn.execute(
+                    "DELETE FROM responses WHERE key IN ("
+                    "SELECT key FROM responses ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+        except sqlite3.Error as e:
+            self.logger.warning(f"HTTP cache unavailable: {e}")
+
+    def touch(self, key: str) -> None:
+        """Mark ``key`` as recently used (after a 304)"""
+        try:
+            with closing(self._connect()) as conn, conn:
+                conn.execute("UPDATE responses SET used_at = ? WHERE key = ?", (time.time(), key))
+        except sqlite3.Error as e:
+            self.logger.warning(f"HTTP cache unavailable: {e}")
+
+
+_cache: Optional[HttpResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> Optional[HttpResponseCache]:
+    """Shared cache for this process, or None when HTTP_CACHE is disabled"""
+    global _cache
+    if not Config.HTTP_CACHE:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = HttpResponseCache(Config.HTTP_CACHE_DB, Config.HTTP_CACHE_MAX_ENTRIES)
+        return _cache
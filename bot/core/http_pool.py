@@ -0,0 +1,77 @@
+import asyncio
+import hashlib
+import os
+import threading
+import weakref
+from typing import Dict, Tuple
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from bot.config import Config
+
+# Shared keep-alive sessions, one per (process, token). Keying on the pid means
+# a forked gunicorn worker never reuses sockets inherited from the master.
+_sessions: Dict[Tuple[int, str], requests.Session] = {}
+_lock = threading.Lock()
+
+
+def _token_key(token: str) -> str:
+    return hashlib.sha256((token or '').encode()).hexdigest()
+
+
+def get_session(token: str) -> requests.Session:
+    """Return the pooled session for ``token``, creating it on first use"""
+    key = (os.getpid(), _token_key(token))
+    session = _sessions.get(key)
+    if session is not None:
+        return session
+    with _lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = _build_session()
+            _sessions[key] = session
+        return session
+
+
+def _build_session() -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=Config.HTTP_POOL_CONNECTIONS,
+                          pool_maxsize=Config.HTTP_POOL_SIZE)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    if not Config.HTTP_KEEP_ALIVE:
+        session.headers['Connection'] = 'close'
+    return session
+
+
+def close_all() -> None:
+    """Close every pooled session owned by this process"""
+    with _lock:
+        pid = os.getpid()
+        for key in [k for k in _sessions if k[0] == pid]:
+            _sessions.pop(key).close()
+
+
+# Async clients are bound to the event loop that created them, so keep one per loop.
+_async_clients: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]' = weakref.WeakKeyDictionary()
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """Return the pooled AsyncClient for the running event loop"""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None or client.is_closed:
+        limits = httpx.Limits(
+            max_connections=Config.HTTP_POOL_SIZE * Config.HTTP_POOL_CONNECTIONS,
+            max_keepalive_connections=Config.HTTP_POOL_SIZE if Config.HTTP_KEEP_ALIVE else 0,
+        )
+        client = httpx.AsyncClient(limits=limits, timeout=Config.REQUEST_TIMEOUT)
+        _async_clients[loop] = client
+    return client
+
+
+async def aclose_all() -> None:
+    """Close the running loop's AsyncClient"""
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
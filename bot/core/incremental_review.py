@@ -0,0 +1,206 @@
+import json
+import re
+import sqlite3
+import time
+from contextlib import closing
+from dataclasses import asdict, dataclass, field, replace
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from bot.config import Config
+from bot.core.comment_builder import FailedReview
+from bot.core.logger import ReviewLogger
+from bot.core.qa_formatter import QAIssue
+from bot.core.qa_issue_extractor import QAIssueExtractor
+from bot.core.utils import extract_file_path_from_diff_line
+
+
+@dataclass
+class ReviewState:
+    """Last reviewed source commit of a PR and the findings open at that point"""
+    head: str
+    issues: List[QAIssue] = field(default_factory=list)
+    reviewed_at: float = field(default_factory=time.time)
+    merge_base: Optional[str] = None  # of the head and the destination branch
+
+
+class ReviewStateStore:
+    """Per-PR review state in SQLite, shared by the CLI and every server worker"""
+
+    def __init__(self, db_path: str, ttl: int = 30 * 86400):
+        self.db_path = db_path
+        self.ttl = ttl
+        self.logger = ReviewLogger.get()
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS review_state ("
+                "pr_key TEXT PRIMARY KEY, head TEXT NOT NULL, issues TEXT NOT NULL, "
+                "reviewed_at REAL NOT NULL, merge_base TEXT)"
+            )
+            if 'merge_base' not in {row[1] for row in conn.execute("PRAGMA table_info(review_state)")}:
+                conn.execute("ALTER TABLE review_state ADD COLUMN merge_base TEXT")
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=5)
+
+    def get(self, pr_key: str) -> Optional[ReviewState]:
+        try:
+            with closing(self._connect()) as conn:
+                row = conn.execute("SELECT head, issues, reviewed_at, merge_base FROM review_state "
+                                   "WHERE pr_key = ?", (pr_key,)).fetchone()
+        except sqlite3.Error as e:
+            self.logger.warning(f"Review state store unavailable: {e}")
+            return None
+        if not row or time.time() - row[2] > self.ttl:
+            return None
+        return ReviewState(head=row[0], issues=[QAIssue(**i) for i in json.loads(row[1])],
+                           reviewed_at=row[2], merge_base=row[3])
+
+    def save(self, pr_key: str, state: ReviewState) -> None:
+        try:
+            with closing(self._connect()) as conn, conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO review_state (pr_key, head, issues, reviewed_at, merge_base) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (pr_key, state.head, json.dumps([asdict(i) for i in state.issues]), state.reviewed_at,
+                     state.merge_base))
+                conn.execute("DELETE FROM review_state WHERE reviewed_at < ?", (time.time() - self.ttl,))
+        except sqlite3.Error as e:
+            self.logger.warning(f"Review state store unavailable: {e}")
+
+
+_HUNK_HEADER = re.compile(r'^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@')
+
+
+@dataclass
+class ReviewScope:
+    """What an incremental review re-examined
+
+    ``hunks`` holds, per file (both sides of renames), the old-side line
+    span of every hunk of the delta and how far the lines after it moved.
+    ``reported`` are the locations the new review has findings on. An
+    earlier finding is in scope when its line was changed or reported again;
+    anything else was not looked at and stays open.
+    """
+    files: Set[str] = field(default_factory=set)
+    hunks: Dict[str, List[Tuple[int, int, int]]] = field(default_factory=dict)  # path -> (first, last, shift)
+    reported: Set[Tuple[str, int]] = field(default_factory=set)
+
+    @classmethod
+    def from_diff(cls, diff_lines: Iterable[str], issues: Iterable[QAIssue] = ()) -> 'ReviewScope':
+        scope = cls(reported={(i.file_path, i.line_number) for i in issues if i.file_path and i.line_number})
+        paths: List[str] = []
+        for line in diff_lines:
+            if line.startswith('diff --git'):
+                paths = list(dict.fromkeys(p for p in (extract_file_path_from_diff_line(line),
+                                                        line.rstrip('\n').split(' b/', 1)[-1]) if p))
+                scope.files.update(paths)
+                continue
+            match = _HUNK_HEADER.match(line)
+            if match and paths:
+                old, old_len, new, new_len = (int(g) if g is not None else 1 for g in match.groups())
+                # a zero-length side names the line before the change
+                old, new = (old if old_len else old + 1), (new if new_len else new + 1)
+                span = (old, old + old_len - 1) if old_len else (old - 1, old)
+                for path in paths:
+                    scope.hunks.setdefault(path, []).append((*span, (new + new_len) - (old + old_len)))
+        return scope
+
+    def covers(self, path: Optional[str], line: Optional[int]) -> bool:
+        """The finding at ``path:line`` (a line of the previous head) was re-examined"""
+        if not line:
+            return path in self.files
+        hunks = self.hunks.get(path, [])
+        if any(first <= line <= last for first, last, _ in hunks):
+            return True
+        return (path, self.moved(path, line)) in self.reported
+
+    def moved(self, path: Optional[str], line: int) -> int:
+        """Where ``line`` of an unchanged stretch of ``path`` is after the delta"""
+        shift = 0
+        for first, last, after in self.hunks.get(path, []):
+            if last < line:
+                shift = after
+        return line + shift
+
+
+class IncrementalReview:
+    """Review only the commits pushed since the last reviewed head
+
+    ``base`` is the previously reviewed commit when an interdiff review is
+    possible: not when the merge base with the destination branch moved
+    (e.g. the destination was merged in), since the interdiff would then
+    show the destination's changes as the PR's. ``merge`` carries forward
+    earlier findings the delta did not re-examine (see ReviewScope);
+    ``save`` records the new head once the review is posted.
+    """
+
+    def __init__(self, store: ReviewStateStore, pr_key: str, head: Optional[str],
+                 merge_base: Optional[str] = None):
+        self.store = store
+        self.pr_key = pr_key
+        self.head = head
+        self.merge_base = merge_base
+        self.previous = store.get(pr_key) if Config.INCREMENTAL_REVIEW and head else None
+        self._pending: Optional[ReviewState] = None
+        self.scope: Optional[ReviewScope] = None  # what was re-examined; None = whole PR
+        self.logger = ReviewLogger.get()
+        if self.previous and not self.unchanged and not self._same_merge_base:
+            self.logger.info(f"Merge base changed since {self.previous.head[:12]} (or is unknown) "
+                             f"- reviewing the full PR")
+
+    @property
+    def unchanged(self) -> bool:
+        """The head was already reviewed (e.g. a title or description edit)"""
+        return bool(self.previous and self.previous.head == self.head)
+
+    @property
+    def base(self) -> Optional[str]:
+        if self.previous and not self.unchanged and self._same_merge_base:
+            return self.previous.head
+        return None
+
+    @property
+    def _same_merge_base(self) -> bool:
+        return bool(self.merge_base and self.previous and self.previous.merge_base == self.merge_base)
+
+    def merge(self, review_text: str, diff: Optional[Iterable[str]], incremental: bool) -> str:
+        """Return the summary with carried-forward findings appended; stage the new state
+
+        A FailedReview stages nothing, so ``save`` keeps the previous state.
+        """
+        if not self.head or isinstance(review_text, FailedReview):
+            return review_text
+
+        issues = QAIssueExtractor().extract_issues(review_text)
+        if not (incremental and self.previous):
+            self._pending = ReviewState(head=self.head, issues=issues, merge_base=self.merge_base)
+            return review_text
+
+        scope = self.scope = ReviewScope.from_diff(diff or [], issues)
+        carried = [replace(i, line_number=i.line_number and scope.moved(i.file_path, i.line_number))
+                   for i in self.previous.issues if i.file_path and not scope.covers(i.file_path, i.line_number)]
+        self._pending = ReviewState(head=self.head, issues=issues + carried, merge_base=self.merge_base)
+        self.logger.info(f"Incremental review {self.previous.head[:12]}..{self.head[:12]}, "
+                         f"{len(carried)} earlier findings carried forward")
+        return review_text + self._format_carried(carried)
+
+    def advance(self) -> None:
+        """Nothing reviewable was pushed: move to the new head, keeping every finding"""
+        if self.head and self.previous:
+            self._pending = ReviewState(head=self.head, issues=self.previous.issues, merge_base=self.merge_base)
+
+    def save(self) -> None:
+        if self._pending:
+            self.store.save(self.pr_key, self._pending)
+            self._pending = None
+
+    def _format_carried(self, carried: List[QAIssue]) -> str:
+        lines = ["\n---\n## Review Scope",
+                 f"Incremental review of commits `{self.previous.head[:12]}..{self.head[:12]}`."]
+        if carried:
+            lines.append("\n### Earlier Findings (code unchanged since last review)")
+            for issue in carried:
+                location = f"`{issue.file_path}:{issue.line_number}`" if issue.line_number else f"`{issue.file_path}`"
+                lines.append(f"- ({issue.severity}) {location} {issue.title}")
+        return "\n".join(lines)
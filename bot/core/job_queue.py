@@ -0,0 +1,194 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+from bot.core.job_store import JobStore, ReviewJob, process_owner_id
+from bot.core.logger import ReviewLogger
+from bot.core.telemetry import REVIEW_JOBS, REVIEW_JOB_LATENCY
+
+
+JobHandler = Callable[[ReviewJob], Awaitable[Optional[str]]]
+
+
+class QueueFullError(Exception):
+    """Raised when admission control rejects a job"""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class JobQueue:
+    """Review queue backed by a durable JobStore, drained by a pool of async workers
+
+    Every server process runs ``workers`` claim loops against the shared job
+    table, so a job survives a worker restart: a crashed owner's jobs are
+    requeued once its process is gone or its lease expires.
+
+    Jobs for the same PR are coalesced: a job only becomes runnable after
+    ``coalesce_window`` seconds without a newer event for its PR, and a newer
+    event supersedes any pending job (and optionally cancels a running one).
+
+    Admission is bounded by a global and a per-workspace queue depth, and
+    workers prefer the workspaces with the fewest running reviews (subject to
+    a per-workspace concurrency cap) so one busy workspace cannot starve
+    the others.
+    """
+
+    def __init__(self, store: JobStore, workers: int = 2, retention: int = 3600,
+                 coalesce_window: float = 0, cancel_running: bool = True,
+                 max_queue_depth: int = 0, workspace_queue_depth: int = 0,
+                 workspace_concurrency: int = 0, retry_after: int = 30,
+                 poll_interval: float = 1.0, lease_timeout: float = 60,
+                 max_attempts: int = 3):
+        self.store = store
+        self.workers = max(1, workers)
+        self.retention = retention
+        self.coalesce_window = coalesce_window
+        self.cancel_running = cancel_running
+        self.max_queue_depth = max_queue_depth  # 0 = unlimited
+        self.workspace_queue_depth = workspace_queue_depth  # 0 = unlimited
+        self.workspace_concurrency = workspace_concurrency  # 0 = bounded only by workers
+        self.retry_after = retry_after
+        self.poll_interval = poll_interval
+        self.lease_timeout = lease_timeout
+        self.max_attempts = max_attempts
+        self.owner = process_owner_id()
+        self._active: Dict[str, asyncio.Task] = {}  # job id -> running handler task
+        self._running_jobs: Dict[str, ReviewJob] = {}
+        self._superseded: set = set()  # running job ids cancelled for a newer event
+        self._wakeup: Optional[asyncio.Event] = None
+        self._handler: Optional[JobHandler] = None
+        self._tasks: List[asyncio.Task] = []
+        self._stopping = False
+        self.logger = ReviewLogger.get()
+
+    async def start(self, handler: JobHandler) -> None:
+        """Recover orphaned jobs and start the worker pool"""
+        self._handler = handler
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self.owner = process_owner_id()  # refresh after a fork
+        recovered = await asyncio.to_thread(self.store.recover, self.lease_timeout, self.max_attempts)
+        if recovered:
+            self.logger.warning(f"Requeued {len(recovered)} interrupted review jobs")
+        self._tasks = [asyncio.create_task(self._worker(n)) for n in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._maintain()))
+        self.logger.info(f"Review job queue started with {self.workers} workers")
+
+    async def stop(self, grace: float = 0) -> None:
+        """Stop claiming, let running reviews drain for ``grace`` seconds, requeue the rest"""
+        self._stopping = True
+        if self._wakeup:
+            self._wakeup.set()
+        if self._active and grace > 0:
+            self.logger.info(f"Draining {len(self._active)} running review jobs")
+            await asyncio.wait(list(self._active.values()), timeout=grace)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        released = await asyncio.to_thread(self.store.release, self.owner)
+        if released:
+            self.logger.warning(f"Requeued {released} unfinished review jobs on shutdown")
+
+    async def submit(self, job: ReviewJob) -> ReviewJob:
+        """Persist a job; it becomes runnable once its PR goes quiet
+
+        Raises QueueFullError when the global or workspace queue is full.
+        """
+        if self._wakeup is None:
+            raise RuntimeError("JobQueue has not been started")
+        job.available_at = time.time() + self.coalesce_window
+        rejection = await asyncio.to_thread(
+            self.store.enqueue, job, self.cancel_running, self.max_queue_depth, self.workspace_queue_depth
+        )
+        if rejection:
+            raise QueueFullError(rejection, self.retry_after)
+
+        if self.cancel_running:
+            # Same-process reviews of this PR stop now; other processes notice on their next heartbeat
+            for running in list(self._running_jobs.values()):
+                if running.key == job.key:
+                    self._cancel_superseded(running.id)
+        if self.coalesce_window > 0:
+            asyncio.get_running_loop().call_later(self.coalesce_window, self._wakeup.set)
+        else:
+            self._wakeup.set()
+        return job
+
+    def _cancel_superseded(self, job_id: str) -> None:
+        task = self._active.get(job_id)
+        if task and not task.done():
+            self._superseded.add(job_id)
+            task.cancel()
+            self.logger.info(f"Cancelling running review job {job_id} in favour of a newer event")
+
+    async def get(self, job_id: str) -> Optional[ReviewJob]:
+        return await asyncio.to_thread(self.store.get, job_id)
+
+    async def set_stage(self, job: ReviewJob, stage: str) -> None:
+        """Record progress of a running job"""
+        job.stage = stage
+        await asyncio.to_thread(self.store.set_stage, self.owner, job.id, stage)
+
+    def depth(self, workspace: Optional[str] = None) -> int:
+        """Number of jobs waiting for a worker (including those still debouncing)"""
+        return self.store.depth(workspace)
+
+    def in_flight(self) -> int:
+        """Number of reviews currently running in this process"""
+        return len(self._active)
+
+    async def _worker(self, n: int) -> None:
+        while not self._stopping:
+            job = await asyncio.to_thread(self.store.claim, self.owner, self.workspace_concurrency)
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._run(job)
+
+    async def _run(self, job: ReviewJob) -> None:
+        task = asyncio.create_task(self._handler(job))
+        self._active[job.id] = task
+        self._running_jobs[job.id] = job
+        status, result, error = 'failed', None, None
+        try:
+            result = await task
+            status = 'done'
+        except asyncio.CancelledError:
+            if job.id not in self._superseded:
+                raise  # shutting down - stop() requeues the job
+            status = 'superseded'
+        except Exception as e:
+            self.logger.error(f"Review job {job.id} failed: {e}", exc_info=True)
+            error = str(e)
+        finally:
+            self._superseded.discard(job.id)
+            self._active.pop(job.id, None)
+            self._running_jobs.pop(job.id, None)
+        REVIEW_JOBS.inc(status=status)
+        REVIEW_JOB_LATENCY.observe(time.time() - job.started_at)
+        await asyncio.to_thread(self.store.finish, self.owner, job.id, status, result, error)
+        self._wakeup.set()  # a workspace may have been held back by its concurrency cap
+
+    async def _maintain(self) -> None:
+        """Heartbeat running jobs, honour cross-process cancellation, recover and prune"""
+        interval = max(self.poll_interval, self.lease_timeout / 4)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                to_cancel = await asyncio.to_thread(self.store.heartbeat, self.owner, list(self._active))
+                if self.cancel_running:
+                    for job_id in to_cancel:
+                        self._cancel_superseded(job_id)
+                recovered = await asyncio.to_thread(self.store.recover, self.lease_timeout, self.max_attempts)
+                if recovered:
+                    self.logger.warning(f"Requeued {len(recovered)} review jobs from dead workers")
+                    self._wakeup.set()
+                await asyncio.to_thread(self.store.prune, self.retention)
+            except Exception as e:
+                self.logger.warning(f"Job queue maintenance failed: {e}")
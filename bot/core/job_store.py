@@ -0,0 +1,300 @@
+import json
+import os
+import socket
+import sqlite3
+import time
+import uuid
+from contextlib import closing, contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+
+@dataclass
+class ReviewJob:
+    """A queued PR review and its progress"""
+    workspace: str
+    repo_slug: str
+    pr_id: str
+    payload: dict
+    event_key: Optional[str] = None
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    status: str = 'pending'  # pending, running, done, failed, superseded
+    stage: str = 'queued'
+    attempts: int = 0
+    result: Optional[str] = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    available_at: float = 0.0  # not runnable before this time (coalescing window)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    superseded_by: Optional[str] = None
+
+    @property
+    def key(self) -> str:
+        """Coalescing key - one effective review per PR"""
+        return f"{self.workspace}/{self.repo_slug}/{self.pr_id}"
+
+    def to_dict(self) -> Dict:
+        return {
+            'id': self.id,
+            'workspace': self.workspace,
+            'repo_slug': self.repo_slug,
+            'pr_id': self.pr_id,
+            'event_key': self.event_key,
+            'status': self.status,
+            'stage': self.stage,
+            'attempts': self.attempts,
+            'result': self.result,
+            'error': self.error,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'superseded_by': self.superseded_by,
+        }
+
+    @classmethod
+    def from_row(cls, row: sqlite3.Row) -> 'ReviewJob':
+        return cls(
+            workspace=row['workspace'],
+            repo_slug=row['repo_slug'],
+            pr_id=row['pr_id'],
+            payload=json.loads(row['payload']),
+            event_key=row['event_key'],
+            id=row['id'],
+            status=row['status'],
+            stage=row['stage'],
+            attempts=row['attempts'],
+            result=row['result'],
+            error=row['error'],
+            created_at=row['created_at'],
+            available_at=row['available_at'],
+            started_at=row['started_at'],
+            finished_at=row['finished_at'],
+            superseded_by=row['superseded_by'],
+        )
+
+
+def process_owner_id() -> str:
+    """Identify this worker process as a job owner"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _owner_is_dead(owner: str) -> bool:
+    """True if ``owner`` is a process on this host that no longer exists"""
+    host, _, pid = owner.rpartition(':')
+    if host != socket.gethostname() or not pid.isdigit():
+        return False
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        return False
+    return False
+
+
+class JobStore:
+    """Durable SQLite table of review jobs shared by every worker on the host
+
+    All state transitions happen inside ``BEGIN IMMEDIATE`` transactions so
+    several gunicorn workers can enqueue and claim concurrently. Methods are
+    blocking; async callers should run them in a thread.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        with self._transaction() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, pr_key TEXT NOT NULL, workspace TEXT NOT NULL, "
+                "repo_slug TEXT NOT NULL, pr_id TEXT NOT NULL, event_key TEXT, payload TEXT NOT NULL, "
+                "status TEXT NOT NULL, stage TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, "
+                "result TEXT, error TEXT, superseded_by TEXT, cancel_requested INTEGER NOT NULL DEFAULT 0, "
+                "owner TEXT, created_at REAL NOT NULL, available_at REAL NOT NULL, "
+                "started_at REAL, finished_at REAL, heartbeat_at REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, available_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_pr_key ON jobs (pr_key, status)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def enqueue(self, job: ReviewJob, cancel_running: bool = True, max_depth: int = 0,
+                workspace_depth: int = 0) -> Optional[str]:
+        """Insert ``job``, superseding older jobs for the same PR
+
+        Returns a rejection reason if the queue-depth limits are exceeded
+        (a job that replaces a pending one is always admitted), else None.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            replaces_pending = conn.execute(
+                "SELECT 1 FROM jobs WHERE pr_key = ? AND status = 'pending' LIMIT 1", (job.key,)
+            ).fetchone()
+            if not replaces_pending:
+                if max_depth and self._depth(conn) >= max_depth:
+                    return "Review queue is full"
+                if workspace_depth and self._depth(conn, job.workspace) >= workspace_depth:
+                    return f"Review queue for workspace {job.workspace} is full"
+
+            conn.execute(
+                "UPDATE jobs SET status = 'superseded', stage = 'finished', superseded_by = ?, finished_at = ? "
+                "WHERE pr_key = ? AND status = 'pending'",
+                (job.id, now, job.key),
+            )
+            if cancel_running:
+                conn.execute(
+                    "UPDATE jobs SET cancel_requested = 1, superseded_by = ? "
+                    "WHERE pr_key = ? AND status = 'running'",
+                    (job.id, job.key),
+                )
+            conn.execute(
+                "INSERT INTO jobs (id, pr_key, workspace, repo_slug, pr_id, event_key, payload, status, stage, "
+                "attempts, created_at, available_at) VALUES (?, ?, ?, ?, ?, ?, ?, 'pending', 'queued', 0, ?, ?)",
+                (job.id, job.key, job.workspace, job.repo_slug, job.pr_id, job.event_key,
+                 json.dumps(job.payload), job.created_at, job.available_at),
+            )
+        return None
+
+    def claim(self, owner: str, workspace_concurrency: int = 0) -> Optional[ReviewJob]:
+        """Atomically claim the next runnable job
+
+        Workspaces with the fewest running reviews go first (then oldest job),
+        and workspaces at ``workspace_concurrency`` are skipped.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT j.* FROM jobs j WHERE j.status = 'pending' AND j.available_at <= ? "
+                "AND (? = 0 OR (SELECT COUNT(*) FROM jobs r WHERE r.status = 'running' "
+                "AND r.workspace = j.workspace) < ?) "
+                "ORDER BY (SELECT COUNT(*) FROM jobs r WHERE r.status = 'running' AND r.workspace = j.workspace), "
+                "j.available_at LIMIT 1",
+                (now, workspace_concurrency, workspace_concurrency),
+            ).fetchone()
+            if not row:
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'running', stage = 'starting', owner = ?, attempts = attempts + 1, "
+                "started_at = ?, heartbeat_at = ?, cancel_requested = 0 WHERE id = ?",
+                (owner, now, now, row['id']),
+            )
+            job = ReviewJob.from_row(row)
+        job.status, job.stage, job.attempts, job.started_at = 'running', 'starting', job.attempts + 1, now
+        return job
+
+    def set_stage(self, owner: str, job_id: str, stage: str) -> None:
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE jobs SET stage = ?, heartbeat_at = ? WHERE id = ? AND owner = ?",
+                (stage, time.time(), job_id, owner),
+            )
+
+    def finish(self, owner: str, job_id: str, status: str, result: Optional[str] = None,
+               error: Optional[str] = None) -> None:
+        """Record the outcome of a job this owner still holds"""
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, stage = 'finished', result = ?, error = ?, finished_at = ?, owner = NULL "
+                "WHERE id = ? AND owner = ?",
+                (status, result, error, time.time(), job_id, owner),
+            )
+
+    def heartbeat(self, owner: str, job_ids: List[str]) -> List[str]:
+        """Renew the lease on ``job_ids``; return those a newer event asked to cancel"""
+        if not job_ids:
+            return []
+        marks = ','.join('?' * len(job_ids))
+        with self._transaction() as conn:
+            conn.execute(
+                f"UPDATE jobs SET heartbeat_at = ? WHERE owner = ? AND id IN ({marks})",
+                (time.time(), owner, *job_ids),
+            )
+            rows = conn.execute(
+                f"SELECT id FROM jobs WHERE cancel_requested = 1 AND id IN ({marks})", job_ids
+            ).fetchall()
+        return [row['id'] for row in rows]
+
+    def release(self, owner: str) -> int:
+        """Hand every job still held by ``owner`` back to the queue (graceful shutdown)"""
+        with self._transaction() as conn:
+            cur = conn.execute(
+                "UPDATE jobs SET status = 'pending', stage = 'queued', owner = NULL, available_at = ?, "
+                "attempts = MAX(attempts - 1, 0) WHERE owner = ? AND status = 'running'",
+                (time.time(), owner),
+            )
+            return cur.rowcount
+
+    def recover(self, lease_timeout: float, max_attempts: int) -> List[str]:
+        """Requeue running jobs whose owner died or stopped heartbeating
+
+        Jobs that already used ``max_attempts`` are marked failed instead.
+        Returns the ids of recovered jobs.
+        """
+        now = time.time()
+        recovered = []
+        with self._transaction() as conn:
+            rows = conn.execute("SELECT id, owner, attempts, heartbeat_at FROM jobs WHERE status = 'running'").fetchall()
+            for row in rows:
+                stale = (row['heartbeat_at'] or 0) < now - lease_timeout
+                if not (stale or (row['owner'] and _owner_is_dead(row['owner']))):
+                    continue
+                if row['attempts'] >= max_attempts:
+                    conn.execute(
+                        "UPDATE jobs SET status = 'failed', stage = 'finished', owner = NULL, finished_at = ?, "
+                        "error = ? WHERE id = ?",
+                        (now, f"abandoned after {row['attempts']} attempts", row['id']),
+                    )
+                else:
+                    conn.execute(
+                        "UPDATE jobs SET status = 'pending', stage = 'queued', owner = NULL, available_at = ? "
+                        "WHERE id = ?",
+                        (now, row['id']),
+                    )
+                    recovered.append(row['id'])
+        return recovered
+
+    def prune(self, retention: float) -> int:
+        """Delete finished jobs older than ``retention`` seconds"""
+        with self._transaction() as conn:
+            cur = conn.execute(
+                "DELETE FROM jobs WHERE status NOT IN ('pending', 'running') AND finished_at < ?",
+                (time.time() - retention,),
+            )
+            return cur.rowcount
+
+    def get(self, job_id: str) -> Optional[ReviewJob]:
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return ReviewJob.from_row(row) if row else None
+
+    def depth(self, workspace: Optional[str] = None) -> int:
+        with closing(self._connect()) as conn:
+            return self._depth(conn, workspace)
+
+    def running(self) -> int:
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT COUNT(*) FROM jobs WHERE status = 'running'").fetchone()[0]
+
+    @staticmethod
+    def _depth(conn: sqlite3.Connection, workspace: Optional[str] = None) -> int:
+        if workspace is None:
+            return conn.execute("SELECT COUNT(*) FROM jobs WHERE status = 'pending'").fetchone()[0]
+        return conn.execute(
+            "SELECT COUNT(*) FROM jobs WHERE status = 'pending' AND workspace = ?", (workspace,)
+        ).fetchone()[0]
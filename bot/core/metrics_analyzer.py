@@ -1,5 +1,5 @@
 import re
-from typing import Dict, List, Tuple
+from typing import Dict, Iterable, List, Tuple, Union
 from dataclasses import dataclass
 
 @dataclass
@@ -43,21 +43,25 @@ class MetricsAnalyzer:
     }
     
     @staticmethod
-    def analyze(diff: str) -> PRMetrics:
-        """Analyze diff and return metrics"""
-        lines = diff.splitlines()
-        added_lines = len([l for l in lines if l.startswith('+')])
-        removed_lines = len([l for l in lines if l.startswith('-')])
+    def analyze(diff: Union[str, Iterable[str]]) -> PRMetrics:
+        """Analyze diff (a string or an iterable of lines, e.g. DiffBuffer) in one pass"""
+        lines = diff.splitlines() if isinstance(diff, str) else diff
+        added_lines = removed_lines = files_changed = 0
+        found = set()
+        for line in lines:
+            if line.startswith('+'):
+                added_lines += 1
+            elif line.startswith('-'):
+                removed_lines += 1
+            elif line.startswith('diff --git'):
+                files_changed += 1
+            
+            # Find security keywords
+            for keyword in MetricsAnalyzer.SECURITY_KEYWORDS:
+                if keyword in line:
+                    found.add(keyword)
         changed_lines = added_lines + removed_lines
-        
-        # Count files changed
-        files_changed = len([l for l in lines if l.startswith('diff --git')])
-        
-        # Find security keywords
-        security_found = []
-        for keyword, severity in MetricsAnalyzer.SECURITY_KEYWORDS.items():
-            if keyword in diff:
-                security_found.append(keyword)
+        security_found = [k for k in MetricsAnalyzer.SECURITY_KEYWORDS if k in found]
         
         # Calculate complexity score based on various factors
         complexity_score = MetricsAnalyzer._calculate_complexity(
@@ -1,13 +1,24 @@
 import os
 from bot.models.gemini_client import GeminiClient
 from bot.models.groq_client import GroqClient
+from bot.models.failover_client import FailoverClient
+from bot.models.hedged_client import HedgedClient
+from bot.models.stub_client import StubClient
+from bot.config import Config
 from bot.core.logger import ReviewLogger
+from bot.core.provider_stats import PROVIDER_STATS
+from bot.core.resilience import CircuitBreaker, get_breaker
+from bot.core.telemetry import LLM_ROUTES
+from bot.core.token_budget import char_budget, estimate_tokens, prompt_budget
 
 class ModelRouter:
     def __init__(self):
         self.provider = os.getenv('MODEL_PROVIDER', 'auto')
         self.logger = ReviewLogger.get()
         
+        # offline provider for load and regression tests; never picked in auto mode
+        self.stub = StubClient() if self.provider == 'stub' else None
+        
         try:
             self.gemini = GeminiClient(api_key=os.getenv('GEMINI_API_KEY'))
             self.logger.debug("Gemini client initialized")
@@ -22,8 +33,85 @@ class ModelRouter:
             self.logger.warning(f"Groq client init failed: {e}")
             self.groq = None
 
-    def choose_model(self, diff_text: str):
-        """Choose model based on provider and diff size"""
+    def choose_model(self, diff_text: str, overhead_chars: int = 0):
+        """Choose model based on provider and estimated prompt tokens, hedged with the other one if enabled
+
+        ``overhead_chars`` is the size of the prompt around the diff. In auto
+        mode with ADAPTIVE_ROUTING the live provider stats pick the model and
+        the remaining providers are kept as failover (LLM_FAILOVER).
+        """
+        if self.stub:
+            return self.stub
+        if self.provider == 'auto' and Config.ADAPTIVE_ROUTING:
+            ranked = self._rank(diff_text, overhead_chars)
+            model = ranked[0]
+        else:
+            model = self._choose(diff_text, overhead_chars)
+            ranked = [model]
+        if Config.HEDGE_REQUESTS and self.gemini and self.groq and self.groq.api_key:
+            other = self.groq if model is self.gemini else self.gemini
+            # the prompt is packed to the primary's budget; hedge only where it also fits
+            prompt_chars = min(len(diff_text) + overhead_chars, char_budget(model.provider))
+            if estimate_tokens(prompt_chars, other.provider) <= prompt_budget(other.provider):
+                model = HedgedClient(model, other)
+                # the hedge already tried the other provider; failing over to it again doubles its load
+                ranked = [c for c in ranked if c is not other]
+        if Config.LLM_FAILOVER and len(ranked) > 1:
+            model = FailoverClient([model] + ranked[1:])
+        return model
+
+    def diff_capacity(self, overhead_chars: int = 0) -> int:
+        """Largest diff (in characters) any usable provider takes in one prompt"""
+        providers = [self.provider] if self.provider in ('gemini', 'groq', 'stub') else \
+            [name for name, client in (('gemini', self.gemini), ('groq', self.groq)) if client]
+        return max((char_budget(p, overhead_chars) for p in providers), default=0)
+
+    def _rank(self, diff_text: str, overhead_chars: int = 0):
+        """Usable providers, best first, logging and counting why the first was chosen
+
+        Providers whose budget fits the prompt come first; among them, those
+        with a closed circuit and an error rate within ROUTING_MAX_ERROR_RATE.
+        Once every such provider has ROUTING_MIN_SAMPLES calls, the one with
+        the lowest predicted latency for this many tokens wins; before that
+        the size rule (Groq while it fits) decides.
+        """
+        clients = [c for c in (self.groq, self.gemini) if c and getattr(c, 'api_key', None)]
+        if not clients:
+            raise RuntimeError("No model providers available")
+        chars = len(diff_text) + overhead_chars
+        tokens = {c.provider: estimate_tokens(chars, c.provider) for c in clients}
+        fits = [c for c in clients if tokens[c.provider] <= prompt_budget(c.provider)]
+        healthy = [c for c in fits if self._healthy(c.provider)]
+
+        if healthy and all(PROVIDER_STATS.calls(c.provider) >= Config.ROUTING_MIN_SAMPLES for c in healthy):
+            pool, reason = sorted(healthy, key=lambda c: PROVIDER_STATS.predicted_seconds(
+                c.provider, tokens[c.provider]) or float('inf')), 'fastest'
+        elif healthy:
+            pool, reason = healthy, 'size'  # groq first while it fits
+        elif fits:
+            pool, reason = sorted(fits, key=lambda c: PROVIDER_STATS.error_rate(c.provider)), 'all_unhealthy'
+        else:
+            pool, reason = sorted(clients, key=lambda c: prompt_budget(c.provider), reverse=True), 'oversize'
+        ranked = pool + [c for c in fits if c not in pool]
+
+        chosen = ranked[0].provider
+        LLM_ROUTES.inc(provider=chosen, reason=reason)
+        stats = PROVIDER_STATS.snapshot()
+        detail = '; '.join(
+            f"{c.provider}: ~{tokens[c.provider]} tokens, "
+            f"{'fits' if c in fits else 'over budget'}, breaker {get_breaker(c.provider).state}, "
+            f"ewma {stats.get(c.provider, {}).get('latency_ewma') or '-'}s, "
+            f"errors {stats.get(c.provider, {}).get('error_rate', 0.0):.0%}"
+            for c in clients)
+        self.logger.info(f"Routing review to {chosen} ({reason}) - {detail}")
+        return ranked
+
+    @staticmethod
+    def _healthy(provider: str) -> bool:
+        return (get_breaker(provider).state != CircuitBreaker.OPEN
+                and PROVIDER_STATS.error_rate(provider) <= Config.ROUTING_MAX_ERROR_RATE)
+
+    def _choose(self, diff_text: str, overhead_chars: int = 0):
         if self.provider == 'gemini':
             if not self.gemini:
                 raise RuntimeError("Gemini model requested but not available")
@@ -34,17 +122,18 @@ class ModelRouter:
                 raise RuntimeError("Groq model requested but not available")
             return self.groq
         
-        # auto - choose based on diff size
-        if len(diff_text) < 15000:
+        # auto - Groq while the prompt fits its budget, Gemini's larger window beyond
+        tokens = estimate_tokens(len(diff_text) + overhead_chars, 'groq')
+        if tokens <= prompt_budget('groq'):
             if self.groq:
-                self.logger.debug("Selected Groq for smaller diff")
+                self.logger.debug(f"Selected Groq for ~{tokens} token prompt")
                 return self.groq
             elif self.gemini:
                 self.logger.debug("Groq not available, falling back to Gemini")
                 return self.gemini
         else:
             if self.gemini:
-                self.logger.debug("Selected Gemini for larger diff")
+                self.logger.debug(f"Selected Gemini: ~{tokens} token prompt exceeds the Groq budget")
                 return self.gemini
             elif self.groq:
                 self.logger.debug("Gemini not available, falling back to Groq")
@@ -0,0 +1,112 @@
+import math
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict, Optional
+from bot.config import Config
+from bot.core.telemetry import PROVIDER_ERROR_RATE, PROVIDER_LATENCY_EWMA, PROVIDER_TOKEN_SECONDS
+
+
+@dataclass
+class _Health:
+    latency: Optional[float] = None  # EWMA seconds per successful review
+    token_seconds: Optional[float] = None  # EWMA seconds per 1000 tokens
+    error_rate: float = 0.0
+    calls: int = 0
+    updated: float = 0.0  # monotonic time of the last outcome
+
+
+class ProviderStats:
+    """Recent review outcomes per LLM provider (this process only)
+
+    Keeps the last ``window`` successful call durations for percentile
+    queries, plus exponentially weighted averages of latency, seconds per
+    token and error rate for routing. An idle provider's error rate decays
+    with ROUTING_ERROR_HALF_LIFE, so a provider that was avoided gets tried
+    again.
+    """
+
+    def __init__(self, window: int = 200, alpha: float = None):
+        self.window = window
+        self.alpha = Config.ROUTING_EWMA_ALPHA if alpha is None else alpha
+        self._latencies: Dict[str, Deque[float]] = {}
+        self._health: Dict[str, _Health] = {}
+        self._lock = threading.Lock()
+
+    def record(self, provider: str, seconds: float, tokens: int = None) -> None:
+        """A successful review that took ``seconds`` for ``tokens`` prompt + output tokens"""
+        with self._lock:
+            self._latencies.setdefault(provider, deque(maxlen=self.window)).append(seconds)
+            health = self._outcome(provider, error=False)
+            health.latency = self._ewma(health.latency, seconds)
+            if tokens:
+                health.token_seconds = self._ewma(health.token_seconds, seconds * 1000 / tokens)
+        PROVIDER_LATENCY_EWMA.set(health.latency, provider=provider)
+        if health.token_seconds is not None:
+            PROVIDER_TOKEN_SECONDS.set(health.token_seconds, provider=provider)
+
+    def record_error(self, provider: str) -> None:
+        """A review that failed after its retries"""
+        with self._lock:
+            self._outcome(provider, error=True)
+
+    def samples(self, provider: str) -> int:
+        with self._lock:
+            return len(self._latencies.get(provider, ()))
+
+    def calls(self, provider: str) -> int:
+        with self._lock:
+            return self._health.get(provider, _Health()).calls
+
+    def percentile(self, provider: str, q: float, min_samples: int = 1) -> Optional[float]:
+        """Nearest-rank ``q`` percentile (0-1) of recent latencies; None below ``min_samples``"""
+        with self._lock:
+            values = sorted(self._latencies.get(provider, ()))
+        if not values or len(values) < min_samples:
+            return None
+        rank = max(1, math.ceil(q * len(values)))
+        return values[min(rank, len(values)) - 1]
+
+    def error_rate(self, provider: str) -> float:
+        with self._lock:
+            return self._decayed_error_rate(self._health.get(provider, _Health()))
+
+    def predicted_seconds(self, provider: str, tokens: int = None) -> Optional[float]:
+        """Expected duration of a review of ``tokens`` tokens; None until a call succeeded"""
+        with self._lock:
+            health = self._health.get(provider, _Health())
+            if tokens and health.token_seconds is not None:
+                return health.token_seconds * tokens / 1000
+            return health.latency
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """Routing view of every provider, for /health and decision logs"""
+        with self._lock:
+            return {name: {'calls': h.calls,
+                           'latency_ewma': None if h.latency is None else round(h.latency, 2),
+                           'seconds_per_1k_tokens': None if h.token_seconds is None else round(h.token_seconds, 3),
+                           'error_rate': round(self._decayed_error_rate(h), 3)}
+                    for name, h in self._health.items()}
+
+    def _outcome(self, provider: str, error: bool) -> _Health:
+        health = self._health.setdefault(provider, _Health())
+        health.error_rate = self._ewma(self._decayed_error_rate(health), 1.0 if error else 0.0)
+        health.calls += 1
+        health.updated = time.monotonic()
+        PROVIDER_ERROR_RATE.set(health.error_rate, provider=provider)
+        return health
+
+    def _decayed_error_rate(self, health: _Health) -> float:
+        if not health.calls or Config.ROUTING_ERROR_HALF_LIFE <= 0:
+            return health.error_rate
+        idle = time.monotonic() - health.updated
+        return health.error_rate * 0.5 ** (idle / Config.ROUTING_ERROR_HALF_LIFE)
+
+    def _ewma(self, current: Optional[float], value: float) -> float:
+        if current is None:
+            return value
+        return self.alpha * value + (1 - self.alpha) * current
+
+
+PROVIDER_STATS = ProviderStats()
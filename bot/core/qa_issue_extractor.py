@@ -3,6 +3,19 @@ from typing import List, Dict, Optional, Tuple
 from bot.core.logger import ReviewLogger
 from bot.core.qa_formatter import QAIssue
 
+# Review sections in the order the prompt asks for them, with their issue category
+SECTIONS = [
+    ('Bugs Detected', 'bug'),
+    ('Missing Validations', 'validation'),
+    ('Logical Issues', 'logical'),
+    ('Security Concerns', 'security'),
+    ('Edge Cases Not Handled', 'edge_case'),
+    ('Unit Test Gaps', 'test_gap'),
+    ('Code Improvements', 'refactor'),
+]
+# a section runs until the next ## or ### header line
+_SECTION_END = re.compile(r'^#{2,3}\s', re.MULTILINE)
+
 class QAIssueExtractor:
     """Extract QA issues from review text and map them to file locations"""
     
@@ -14,13 +27,8 @@ class QAIssueExtractor:
         issues = []
         
         # Parse each major section
-        issues.extend(self._extract_section_issues(review_text, 'Bugs Detected', 'bug'))
-        issues.extend(self._extract_section_issues(review_text, 'Missing Validations', 'validation'))
-        issues.extend(self._extract_section_issues(review_text, 'Logical Issues', 'logical'))
-        issues.extend(self._extract_section_issues(review_text, 'Security Concerns', 'security'))
-        issues.extend(self._extract_section_issues(review_text, 'Edge Cases Not Handled', 'edge_case'))
-        issues.extend(self._extract_section_issues(review_text, 'Unit Test Gaps', 'test_gap'))
-        issues.extend(self._extract_section_issues(review_text, 'Code Improvements', 'refactor'))
+        for section_name, category in SECTIONS:
+            issues.extend(self._extract_section_issues(review_text, section_name, category))
         
         return issues
     
@@ -29,8 +37,8 @@ class QAIssueExtractor:
         issues = []
         
         # Find section
-        pattern = rf'###?\s*{re.escape(section_name)}.*?(?=###|\Z)'
-        match = re.search(pattern, text, re.IGNORECASE | re.DOTALL)
+        pattern = rf'###?\s*{re.escape(section_name)}.*?(?=^#{{2,3}}\s|\Z)'
+        match = re.search(pattern, text, re.IGNORECASE | re.DOTALL | re.MULTILINE)
         
         if not match:
             return issues
@@ -99,3 +107,41 @@ class QAIssueExtractor:
                     grouped[key] = []
                 grouped[key].append(issue)
         return grouped
+
+
+class StreamingIssueExtractor:
+    """Emit QAIssues section by section while a review is still being generated
+
+    A section is complete once the next ``##``/``###`` header arrives (or the stream
+    ends), and yields exactly the issues ``extract_issues`` would find in it.
+    """
+    
+    def __init__(self):
+        self.extractor = QAIssueExtractor()
+        self.text = ''
+        self._emitted = set()
+    
+    def feed(self, chunk: str) -> List[QAIssue]:
+        """Add streamed text; return issues of sections completed by it"""
+        self.text += chunk
+        if '#' not in chunk:
+            return []  # no header arrived, so no section can have closed
+        return self._emit(final=False)
+    
+    def close(self) -> List[QAIssue]:
+        """The stream ended: return issues of every section not yet emitted"""
+        return self._emit(final=True)
+    
+    def _emit(self, final: bool) -> List[QAIssue]:
+        issues = []
+        for section_name, category in SECTIONS:
+            if section_name in self._emitted or not (final or self._closed(section_name)):
+                continue
+            self._emitted.add(section_name)
+            issues.extend(self.extractor._extract_section_issues(self.text, section_name, category))
+        return issues
+    
+    def _closed(self, section_name: str) -> bool:
+        match = re.search(rf'###?\s*{re.escape(section_name)}', self.text, re.IGNORECASE)
+        return bool(match) and bool(_SECTION_END.search(self.text, match.end()))
+
@@ -0,0 +1,188 @@
+import asyncio
+import sqlite3
+import threading
+import time
+from contextlib import closing, contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+from bot.config import Config
+from bot.core.logger import ReviewLogger
+
+
+class TokenBucket:
+    """Thread-safe token bucket: ``rate`` tokens/second, bursts up to ``capacity``
+
+    ``pause`` empties the bucket until a deadline, which is how a server's
+    Retry-After is honoured by every caller sharing the bucket.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        if rate <= 0:
+            raise ValueError(f"Token bucket rate must be positive, got {rate}")
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """Take a token if one is available, else return the seconds to wait"""
+        with self._lock:
+            now = time.monotonic()
+            if now < self._paused_until:
+                return self._paused_until - now
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self) -> None:
+        """Block until a token is available"""
+        while True:
+            wait = self._reserve()
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+    async def acquire_async(self) -> None:
+        """Wait (without blocking the event loop) until a token is available"""
+        while True:
+            wait = await self._reserve_async()
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+    async def _reserve_async(self) -> float:
+        return self._reserve()
+
+    def pause(self, seconds: float) -> None:
+        """Hand out no tokens for ``seconds`` (e.g. after a 429 with Retry-After)"""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._tokens = 0.0
+            self._updated = self._paused_until
+
+    async def pause_async(self, seconds: float) -> None:
+        """``pause`` for callers on an event loop"""
+        self.pause(seconds)
+
+
+class SharedTokenBucket(TokenBucket):
+    """TokenBucket whose state lives in SQLite, so every process on the host shares one budget
+
+    Each reservation is a short BEGIN IMMEDIATE transaction; wall-clock time
+    is used because the state is compared across processes. Async callers run
+    the transactions in a worker thread, since waiting on another process's
+    lock must not block the event loop. If the database cannot be used, the
+    bucket degrades to in-process limiting.
+    """
+
+    def __init__(self, db_path: str, name: str, rate: float, capacity: float):
+        super().__init__(rate, capacity)
+        self.db_path = db_path
+        self.name = name
+        self.logger = ReviewLogger.get()
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        with self._transaction() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS buckets ("
+                "name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL, "
+                "paused_until REAL NOT NULL DEFAULT 0)"
+            )
+            conn.execute("INSERT OR IGNORE INTO buckets (name, tokens, updated) VALUES (?, ?, ?)",
+                         (name, self.capacity, time.time()))
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=5, isolation_level=None)
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def _reserve(self) -> float:
+        try:
+            with self._transaction() as conn:
+                tokens, updated, paused_until = conn.execute(
+                    "SELECT tokens, updated, paused_until FROM buckets WHERE name = ?", (self.name,)).fetchone()
+                now = time.time()
+                if now < paused_until:
+                    return paused_until - now
+                tokens = min(self.capacity, tokens + max(0.0, now - updated) * self.rate)
+                wait = 0.0
+                if tokens >= 1:
+                    tokens -= 1
+                else:
+                    wait = (1 - tokens) / self.rate
+                conn.execute("UPDATE buckets SET tokens = ?, updated = ? WHERE name = ?",
+                             (tokens, now, self.name))
+                return wait
+        except (sqlite3.Error, TypeError) as e:
+            self.logger.warning(f"Shared rate limiter unavailable ({e}); limiting in-process")
+            return super()._reserve()
+
+    async def _reserve_async(self) -> float:
+        return await asyncio.to_thread(self._reserve)
+
+    def pause(self, seconds: float) -> None:
+        super().pause(seconds)
+        try:
+            with self._transaction() as conn:
+                until = time.time() + seconds
+                conn.execute(
+                    "UPDATE buckets SET tokens = 0, updated = MAX(updated, ?), "
+                    "paused_until = MAX(paused_until, ?) WHERE name = ?", (until, until, self.name))
+        except sqlite3.Error as e:
+            self.logger.warning(f"Shared rate limiter unavailable: {e}")
+
+    async def pause_async(self, seconds: float) -> None:
+        await asyncio.to_thread(self.pause, seconds)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds from a Retry-After header (delta-seconds form); None if absent or unparseable"""
+    try:
+        return max(0.0, float(value)) if value is not None else None
+    except ValueError:
+        return None
+
+
+_buckets: Dict[str, TokenBucket] = {}
+_buckets_lock = threading.Lock()
+
+
+def get_bucket(name: str) -> TokenBucket:
+    """Bucket for an upstream service: 'bitbucket', 'gemini' or 'groq'
+
+    Shared across every process on the host (RATE_LIMIT_DB) unless
+    SHARED_RATE_LIMIT is off, in which case it is per process.
+    """
+    with _buckets_lock:
+        bucket = _buckets.get(name)
+        if bucket is None:
+            rate, burst = _limits(name)
+            if Config.SHARED_RATE_LIMIT:
+                bucket = SharedTokenBucket(Config.RATE_LIMIT_DB, name, rate, burst)
+            else:
+                bucket = TokenBucket(rate, burst)
+            _buckets[name] = bucket
+        return bucket
+
+
+def _limits(name: str):
+    if name == 'bitbucket':
+        return Config.BITBUCKET_RATE_PER_SEC, Config.BITBUCKET_RATE_BURST
+    if name == 'gemini':
+        return Config.GEMINI_RATE_PER_SEC, Config.GEMINI_RATE_BURST
+    if name == 'groq':
+        return Config.GROQ_RATE_PER_SEC, Config.GROQ_RATE_BURST
+    raise ValueError(f"No rate limit configured for {name}")
@@ -0,0 +1,223 @@
+import asyncio
+import random
+import threading
+import time
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+import httpx
+import requests
+from bot.config import Config
+from bot.core.logger import ReviewLogger
+from bot.core.telemetry import BREAKER_STATE, BREAKER_REJECTIONS
+
+T = TypeVar('T')
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency whose circuit breaker is open"""
+
+    def __init__(self, breaker: 'CircuitBreaker'):
+        super().__init__(f"{breaker.name} circuit open - retry in {breaker.retry_in():.1f}s")
+        self.breaker = breaker
+
+
+def backoff_delay(attempt: int, base: float = None, cap: float = None) -> float:
+    """Capped exponential backoff with full jitter for retry ``attempt`` (0-based)"""
+    base = Config.RETRY_DELAY if base is None else base
+    cap = Config.RETRY_MAX_DELAY if cap is None else cap
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def status_of(error: BaseException) -> Optional[int]:
+    """HTTP status carried by a requests, httpx or google.api_core error"""
+    status = getattr(getattr(error, 'response', None), 'status_code', None)
+    if status is None:
+        status = getattr(error, 'code', None)
+    try:
+        return int(status)
+    except (TypeError, ValueError):
+        return None
+
+
+def is_transient(error: BaseException) -> bool:
+    """Timeouts, connection failures, 429 and 5xx: worth retrying"""
+    if isinstance(error, (requests.exceptions.Timeout, requests.exceptions.ConnectionError,
+                          httpx.TransportError, TimeoutError, ConnectionError)):
+        return True
+    status = status_of(error)
+    return status is not None and (status == 429 or status >= 500)
+
+
+class CircuitBreaker:
+    """Fail fast while a dependency is down
+
+    ``failure_threshold`` consecutive failures open the circuit; after
+    ``reset_timeout`` seconds one trial call is let through (half-open) and
+    its outcome closes or re-opens it. State is per process.
+    """
+
+    CLOSED, HALF_OPEN, OPEN = 'closed', 'half_open', 'open'
+    _GAUGE = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+    def __init__(self, name: str, failure_threshold: int = None, reset_timeout: float = None):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold or Config.BREAKER_FAILURE_THRESHOLD)
+        self.reset_timeout = Config.BREAKER_RESET_TIMEOUT if reset_timeout is None else reset_timeout
+        self.failures = 0
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._trial_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self.logger = ReviewLogger.get()
+        BREAKER_STATE.set(0, endpoint=name)
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._maybe_half_open()
+            return self._state
+
+    def retry_in(self) -> float:
+        """Seconds until an open circuit lets a trial call through"""
+        return max(0.0, self._opened_at + self.reset_timeout - time.monotonic())
+
+    def allow(self) -> bool:
+        with self._lock:
+            self._maybe_half_open()
+            if self._state == self.CLOSED:
+                return True
+            now = time.monotonic()
+            # one trial at a time; a trial that never reported back expires
+            if self._state == self.HALF_OPEN and (self._trial_at is None
+                                                  or now - self._trial_at > self.reset_timeout):
+                self._trial_at = now
+                return True
+        BREAKER_REJECTIONS.inc(endpoint=self.name)
+        return False
+
+    def check(self) -> None:
+        """Raise CircuitOpenError unless a call may proceed"""
+        if not self.allow():
+            raise CircuitOpenError(self)
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self._trial_at = None
+            if self._state != self.CLOSED:
+                self.logger.info(f"{self.name} circuit closed")
+                self._set(self.CLOSED)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._trial_at = None
+            if self._state == self.HALF_OPEN or (self._state == self.CLOSED
+                                                 and self.failures >= self.failure_threshold):
+                self.logger.warning(f"{self.name} circuit open after {self.failures} failures; "
+                                    f"failing fast for {self.reset_timeout:.0f}s")
+                self._opened_at = time.monotonic()
+                self._set(self.OPEN)
+
+    def record_status(self, status_code: int) -> None:
+        """A 5xx is a failure; any other response shows the dependency is up"""
+        if status_code >= 500:
+            self.record_failure()
+        else:
+            self.record_success()
+
+    def snapshot(self) -> Dict:
+        state = self.state
+        return {'state': state, 'failures': self.failures,
+                'retry_in': round(self.retry_in(), 1) if state == self.OPEN else 0}
+
+    def _maybe_half_open(self) -> None:
+        if self._state == self.OPEN and time.monotonic() >= self._opened_at + self.reset_timeout:
+            self._set(self.HALF_OPEN)
+
+    def _set(self, state: str) -> None:
+        self._state = state
+        BREAKER_STATE.set(self._GAUGE[state], endpoint=self.name)
+
+
+class RetryPolicy:
+    """Retry transient failures with jittered backoff, behind a circuit breaker
+
+    Stops as soon as the breaker opens, so no worker keeps sleeping through
+    a provider outage.
+    """
+
+    def __init__(self, breaker: CircuitBreaker, max_retries: int = None, base_delay: float = None,
+                 max_delay: float = None, transient: Callable[[BaseException], bool] = is_transient):
+        self.breaker = breaker
+        self.max_retries = max(1, max_retries or Config.MAX_RETRIES)
+        self.base_delay = Config.RETRY_DELAY if base_delay is None else base_delay
+        self.max_delay = Config.RETRY_MAX_DELAY if max_delay is None else max_delay
+        self.transient = transient
+        self.logger = ReviewLogger.get()
+
+    def call(self, fn: Callable[[], T]) -> T:
+        attempt = 0
+        while True:
+            self.breaker.check()
+            try:
+                result = fn()
+            except Exception as e:
+                delay = self._failed(e, attempt)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                attempt += 1
+                continue
+            self.breaker.record_success()
+            return result
+
+    async def acall(self, fn: Callable[[], Awaitable[T]]) -> T:
+        attempt = 0
+        while True:
+            self.breaker.check()
+            try:
+                result = await fn()
+            except Exception as e:
+                delay = self._failed(e, attempt)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            self.breaker.record_success()
+            return result
+
+    def _failed(self, error: Exception, attempt: int) -> Optional[float]:
+        """Record the failure; seconds to wait before retrying, or None to give up"""
+        if not self.transient(error):
+            self.breaker.record_success()  # the dependency answered; the request was bad
+            return None
+        if status_of(error) == 429:
+            self.breaker.record_success()  # throttled, not down; the rate limiter waits it out
+        else:
+            self.breaker.record_failure()
+        if attempt + 1 >= self.max_retries:
+            return None
+        self.logger.warning(f"{self.breaker.name}: {type(error).__name__} "
+                            f"(attempt {attempt + 1}/{self.max_retries})")
+        return backoff_delay(attempt, self.base_delay, self.max_delay)
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """Process-wide breaker for an outbound endpoint ('bitbucket', 'gemini', 'groq')"""
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = _breakers[name] = CircuitBreaker(name)
+        return breaker
+
+
+def breaker_states() -> Dict[str, Dict]:
+    """Snapshot of every breaker in this process, for /health"""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {b.name: b.snapshot() for b in breakers}
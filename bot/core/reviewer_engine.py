@@ -1,21 +1,32 @@
+import asyncio
 import json
 import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain, count
+from typing import Awaitable, Callable, Iterable, Iterator, List, Optional
 from bot.core.model_router import ModelRouter
 from bot.core.diff_fetcher import count_lines
+from bot.core.diff_buffer import DiffBuffer
 from bot.core.cache_manager import CacheManager
+from bot.core.chunked_review import ReviewReducer, chunk_files, split_diff
 from bot.core.metrics_analyzer import MetricsAnalyzer
 from bot.core.logger import ReviewLogger
-from bot.core.comment_builder import build_markdown_comment
+from bot.core.comment_builder import FailedReview, build_markdown_comment
 from bot.core.qa_formatter import QAFormatter, QAReport, QAIssue
+from bot.core.qa_issue_extractor import QAIssueExtractor, StreamingIssueExtractor
+from bot.core.diff_minimizer import DiffMinimizer
+from bot.core.token_budget import char_budget, estimate_tokens, pack_diff
+from bot.models.hedged_client import is_good_review
+from bot.core.telemetry import METRICS_ANALYSIS_LATENCY, CACHE_REQUESTS, PROMPT_CHARS_SAVED, PROMPT_TOKENS_SAVED
 from bot.config import Config
 
 def truncate_diff(diff, max_chars=14000):
+    """Deprecated: ``diff`` (a str or DiffBuffer) within ``max_chars``, packed by ``pack_diff``"""
+    ReviewLogger.get().warning("truncate_diff is deprecated; use bot.core.token_budget.pack_diff")
     if len(diff) <= max_chars:
-        return diff
-    # keep head and tail
-    head = diff[:7000]
-    tail = diff[-7000:]
-    return head + "\n\n...TRUNCATED...\n\n" + tail
+        return diff.text() if isinstance(diff, DiffBuffer) else diff
+    return pack_diff(diff, max_chars)
 
 class ReviewerEngine:
     def __init__(self):
@@ -30,16 +41,36 @@ class ReviewerEngine:
         except Exception as e:
             self.logger.warning(f"Could not load rules from {rules_path}: {e}")
             self.rules = {}
+        
+        # Prompt minimization: compact rules JSON, trimmed diff
+        self.minimizer = DiffMinimizer() if Config.MINIMIZE_PROMPT else None
+        pretty_rules = json.dumps(self.rules, indent=2)
+        self.rules_text = json.dumps(self.rules, separators=(',', ':')) if self.minimizer else pretty_rules
+        self.rules_saved = len(pretty_rules) - len(self.rules_text)
 
     def _get_cache_key(self, title: str, description: str, diff: str) -> str:
         """Generate cache key for review"""
-        content = f"{title}|{description}|{diff[:1000]}"  # Use first 1000 chars of diff
+        head = diff.head(1000) if isinstance(diff, DiffBuffer) else diff[:1000]
+        content = f"{title}|{description}|{head}"  # Use first 1000 chars of diff
         return hashlib.sha256(content.encode()).hexdigest()
 
-    def build_prompt(self, title, description, diff):
-        """Build QA-focused review prompt - QA Mode ALWAYS ACTIVE"""
-        truncated_diff = truncate_diff(diff, Config.MAX_DIFF_CHARS)
-        
+    def build_prompt(self, title, description, diff, provider=None):
+        """Build QA-focused review prompt - QA Mode ALWAYS ACTIVE
+
+        A diff over ``provider``'s token budget is packed hunk by hunk in
+        priority order (security hits, source before tests, larger changes).
+        """
+        overhead = len(self._render(title, description, ''))
+        max_chars = char_budget(provider, overhead)
+        if len(diff) > max_chars:
+            self.logger.info(f"Diff exceeds the {provider or 'default'} prompt budget; "
+                             f"packing hunks into {max_chars} chars")
+            diff_text = pack_diff(diff, max_chars)
+        else:
+            diff_text = diff.text() if isinstance(diff, DiffBuffer) else diff
+        return self._render(title, description, diff_text)
+
+    def _render(self, title, description, diff_text):
         qa_prompt = f"""You are an expert QA engineer and senior code reviewer.
 Your primary job is to identify ALL potential issues in code changes and ensure quality.
 
@@ -86,13 +117,13 @@ Description: {description}
 
 ### CODE CHANGES TO REVIEW
 ```diff
-{truncated_diff}
+{diff_text}
 ```
 
 ---
 
 ### REVIEW RULES (Apply These):
-{json.dumps(self.rules, indent=2)}
+{self.rules_text}
 
 ---
 
@@ -109,10 +140,95 @@ Generate your comprehensive QA review now:
 
     def generate_review(self, title, desc, diff):
         """Generate QA-focused review with caching and metrics"""
+        early = self._precheck(title, desc, diff)
+        if early:
+            return early
+        
+        reviewed = None
+        try:
+            metrics = self._metrics(diff)
+            reviewed = self._minimize(diff)  # metrics and cache key stay on the original diff
+            chunks = self._chunks(title, desc, reviewed)
+            if chunks:
+                qa_review = self._review_chunks(title, desc, chunks)
+            else:
+                model, prompt = self._prepare(title, desc, reviewed)
+                
+                # Generate QA review
+                self.logger.info("Generating QA review...")
+                qa_review = model.review(prompt)
+            
+            return self._finalize(title, desc, diff, qa_review, metrics)
+        
+        except Exception as e:
+            self.logger.error(f"Error generating review: {e}")
+            return FailedReview(f"Error generating review: {str(e)}")
+        finally:
+            self._release(diff, reviewed)
+
+    async def agenerate_review(self, title, desc, diff,
+                               on_issues: Optional[Callable[[List[QAIssue]], Awaitable[None]]] = None):
+        """Async variant of generate_review using the clients' non-blocking areview
+
+        With ``on_issues`` (and STREAM_REVIEWS) the review is streamed and
+        each section's issues are handed over as soon as the section is done.
+        Cache I/O, diff parsing and prompt building run in worker threads, so
+        only the model calls are awaited on the event loop.
+        """
+        early = await asyncio.to_thread(self._precheck, title, desc, diff)
+        if early:
+            return early
+        
+        reviewed = None
+        try:
+            metrics = await asyncio.to_thread(self._metrics, diff)
+            # metrics and cache key stay on the original diff
+            reviewed = await asyncio.to_thread(self._minimize, diff)
+            chunks = await asyncio.to_thread(self._chunks, title, desc, reviewed)
+            if chunks:
+                qa_review = await self._areview_chunks(title, desc, chunks, on_issues)
+                return await asyncio.to_thread(self._finalize, title, desc, diff, qa_review, metrics)
+            
+            model, prompt = await asyncio.to_thread(self._prepare, title, desc, reviewed)
+            self.logger.info("Generating QA review...")
+            if on_issues and Config.STREAM_REVIEWS and hasattr(model, 'astream'):
+                qa_review = await self._astream_review(model, prompt, on_issues)
+            else:
+                qa_review = await model.areview(prompt)
+            
+            return await asyncio.to_thread(self._finalize, title, desc, diff, qa_review, metrics)
+        
+        except Exception as e:
+            self.logger.error(f"Error generating review: {e}")
+            return FailedReview(f"Error generating review: {str(e)}")
+        finally:
+            self._release(diff, reviewed)
+
+    async def _astream_review(self, model, prompt: str,
+                              on_issues: Callable[[List[QAIssue]], Awaitable[None]]) -> str:
+        extractor = StreamingIssueExtractor()
+        try:
+            async for chunk in model.astream(prompt):
+                issues = extractor.feed(chunk)
+                if issues:
+                    await on_issues(issues)
+        except Exception as e:
+            # issues already handed over stay valid; their comments are fingerprinted
+            self.logger.warning(f"Streaming review failed ({e}); retrying without streaming")
+            return await model.areview(prompt)
+        if not extractor.text:
+            return await model.areview(prompt)
+        issues = extractor.close()
+        if issues:
+            await on_issues(issues)
+        return extractor.text
+
+    def _precheck(self, title, desc, diff):
+        """Return an error or cached review that short-circuits generation, else None"""
         # Validate diff size
         if len(diff) < Config.MIN_DIFF_CHARS:
             self.logger.warning("Diff size below minimum threshold")
-            return "Error: Diff appears to be empty or too small for review."
+            return FailedReview("Error: Diff appears to be empty or too small for review.")
         
         # Check cache
         if self.cache:
@@ -120,41 +236,176 @@ Generate your comprehensive QA review now:
             cached_review = self.cache.get(cache_key)
             if cached_review:
                 self.logger.info("Review retrieved from cache")
+                CACHE_REQUESTS.inc(result='hit')
                 return cached_review
-        
+            CACHE_REQUESTS.inc(result='miss')
+        return None
+
+    def _metrics(self, diff):
+        """Metrics over the whole diff, or None when disabled"""
+        if not Config.ENABLE_METRICS:
+            return None
+        with METRICS_ANALYSIS_LATENCY.time():
+            metrics = MetricsAnalyzer.analyze(diff)
+        self.logger.debug(f"PR Metrics: {metrics.to_dict()}")
+        return metrics
+
+    def _minimize(self, diff):
+        """Minimized diff for the prompt, logging and counting what was saved"""
+        if not self.minimizer:
+            return diff
+        minimized, stats = self.minimizer.minimize(diff)
+        saved = stats.saved_chars + self.rules_saved
+        tokens = estimate_tokens(saved)
+        self.logger.info(f"Prompt minimized: {stats.describe()}; rules -{self.rules_saved} chars; "
+                         f"~{tokens} tokens saved")
+        PROMPT_CHARS_SAVED.inc(max(0, saved))
+        PROMPT_TOKENS_SAVED.inc(max(0, tokens))
+        return minimized
+
+    @staticmethod
+    def _release(diff, reviewed):
+        """Close the minimized copy of a DiffBuffer; the caller owns the original"""
+        if isinstance(reviewed, DiffBuffer) and reviewed is not diff:
+            reviewed.close()
+
+    def _prepare(self, title, desc, diff):
+        """Choose the model by estimated prompt tokens and build the prompt for it"""
+        model = self.router.choose_model(diff, len(self._render(title, desc, '')))
+        prompt = self.build_prompt(title, desc, diff, provider=model.provider)
+        return model, prompt
+
+    def _chunks(self, title, desc, diff) -> Optional[Iterator[str]]:
+        """Parts of a diff too large for any provider's prompt, produced one at a time
+
+        None when the diff fits one prompt (or CHUNKED_REVIEW is off).
+        """
+        if not Config.CHUNKED_REVIEW:
+            return None
+        # the part title ("... (part 12)") makes the prompt a little longer
+        capacity = self.router.diff_capacity(len(self._render(title + " (part 999)", desc, '')))
+        if not capacity or len(diff) <= capacity:
+            return None
+        lines = diff if isinstance(diff, DiffBuffer) else diff.splitlines(keepends=True)
+        chunks = split_diff(lines, capacity)
+        first, second = next(chunks, None), next(chunks, None)
+        if second is None:
+            return None  # byte length overstated it; one prompt holds the diff
+        return self._capped(chain([first, second], chunks))
+
+    def _capped(self, chunks: Iterator[str]) -> Iterator[str]:
+        for index, chunk in enumerate(chunks):
+            if index == Config.REVIEW_MAX_CHUNKS:
+                self.logger.warning(f"Diff needs more than {Config.REVIEW_MAX_CHUNKS} parts; "
+                                    f"reviewing the first {Config.REVIEW_MAX_CHUNKS}, skipping the rest")
+                return
+            yield chunk
+
+    def _chunk_prompt(self, title, desc, chunk, index):
+        return self._prepare(f"{title} (part {index + 1})", desc, chunk)
+
+    def _review_chunks(self, title, desc, chunks: Iterable[str]) -> str:
+        """Review each part on a bounded thread pool as it is produced, then merge the reviews
+
+        A part is only split off once a worker is free, so at most
+        REVIEW_CHUNK_CONCURRENCY parts are held in memory.
+        """
+        self.logger.info("Generating QA review in parts...")
+        concurrency = max(1, Config.REVIEW_CHUNK_CONCURRENCY)
+        slots = threading.BoundedSemaphore(concurrency)
+
+        def review(index, chunk):
+            try:
+                model, prompt = self._chunk_prompt(title, desc, chunk, index)
+                try:
+                    return model.review(prompt)
+                except Exception as e:
+                    # one failed part must not lose the others; the reducer reports it
+                    self.logger.warning(f"Review of part {index + 1} failed: {e}")
+                    return f"[Review Error] {e}"
+            finally:
+                slots.release()
+
+        futures, files = [], []
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for index, chunk in enumerate(chunks):
+                slots.acquire()
+                files.append(chunk_files(chunk))
+                futures.append(pool.submit(review, index, chunk))
+        self.logger.info(f"Reviewed {len(futures)} parts")
+        return self._merge_parts([f.result() for f in futures], files)
+
+    async def _areview_chunks(self, title, desc, chunks: Iterable[str],
+                              on_issues: Optional[Callable[[List[QAIssue]], Awaitable[None]]] = None) -> str:
+        """Review parts concurrently as they are produced (at most REVIEW_CHUNK_CONCURRENCY at once), then merge
+
+        Each part's issues go to ``on_issues`` as soon as that part is reviewed.
+        Splitting off the next part and building its prompt run in worker threads.
+        """
+        self.logger.info("Generating QA review in parts...")
+        slots = asyncio.Semaphore(max(1, Config.REVIEW_CHUNK_CONCURRENCY))
+        extractor = QAIssueExtractor()
+
+        async def review(index, chunk):
+            try:
+                model, prompt = await asyncio.to_thread(self._chunk_prompt, title, desc, chunk, index)
+                try:
+                    text = await model.areview(prompt)
+                except Exception as e:
+                    self.logger.warning(f"Review of part {index + 1} failed: {e}")
+                    return f"[Review Error] {e}"
+            finally:
+                slots.release()
+            if on_issues:
+                issues = extractor.extract_issues(text)
+                if issues:
+                    await on_issues(issues)
+            return text
+
+        chunks = iter(chunks)
+        tasks, files = [], []
         try:
-            # Generate metrics for context
-            metrics = None
-            if Config.ENABLE_METRICS:
-                metrics = MetricsAnalyzer.analyze(diff)
-                self.logger.debug(f"PR Metrics: {metrics.to_dict()}")
-            
-            # Choose model
-            model = self.router.choose_model(diff)
-            prompt = self.build_prompt(title, desc, diff)
-            
-            # Generate QA review
-            self.logger.info("Generating QA review...")
-            qa_review = model.review(prompt)
-            
-            # Build formatted comment with QA sections and metrics
-            formatted = build_markdown_comment(qa_review)
-            
-            # Add metrics if enabled
-            if Config.ENABLE_METRICS and metrics:
-                metrics_section = self._format_metrics(metrics)
-                formatted += "\n" + metrics_section
-            
-            # Cache the result
-            if self.cache:
-                self.cache.set(cache_key, formatted)
-            
-            self.logger.info("QA review generated successfully")
-            return formatted
+            for index in count():
+                await slots.acquire()
+                chunk = await asyncio.to_thread(next, chunks, None)
+                if chunk is None:
+                    slots.release()
+                    break
+                files.append(chunk_files(chunk))
+                tasks.append(asyncio.create_task(review(index, chunk)))
+            reviews = await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+        self.logger.info(f"Reviewed {len(tasks)} parts")
+        return self._merge_parts(list(reviews), files)
+
+    @staticmethod
+    def _merge_parts(reviews: List[str], files: List[List[str]]) -> str:
+        merged = ReviewReducer().merge(reviews, files)
+        return merged if all(is_good_review(r) for r in reviews) else FailedReview(merged)
+
+    def _finalize(self, title, desc, diff, qa_review, metrics):
+        """Format the model output, append metrics and cache the result"""
+        if isinstance(qa_review, FailedReview) or not is_good_review(qa_review):
+            self.logger.warning("QA review generation failed; result not cached")
+            return FailedReview(build_markdown_comment(qa_review))
+
+        # Build formatted comment with QA sections and metrics
+        formatted = build_markdown_comment(qa_review)
         
-        except Exception as e:
-            self.logger.error(f"Error generating review: {e}")
-            return f"Error generating review: {str(e)}"
+        # Add metrics if enabled
+        if Config.ENABLE_METRICS and metrics:
+            metrics_section = self._format_metrics(metrics)
+            formatted += "\n" + metrics_section
+        
+        # Cache the result
+        if self.cache:
+            self.cache.set(self._get_cache_key(title, desc, diff), formatted)
+        
+        self.logger.info("QA review generated successfully")
+        return formatted
 
     def _format_metrics(self, metrics) -> str:
         """Format metrics as markdown"""
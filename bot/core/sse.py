@@ -0,0 +1,16 @@
+from typing import AsyncIterator
+import httpx
+
+
+async def aiter_sse_data(response: httpx.Response) -> AsyncIterator[str]:
+    """Yield the ``data`` payload of each server-sent event in a streamed response"""
+    data = []
+    async for line in response.aiter_lines():
+        if not line:
+            if data:
+                yield '\n'.join(data)
+                data = []
+        elif line.startswith('data:'):
+            data.append(line[5:].lstrip(' '))
+    if data:
+        yield '\n'.join(data)
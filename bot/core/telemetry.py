@@ -0,0 +1,227 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Minimal Prometheus text-format instrumentation (no client library needed).
+# Values are per process; scrape every worker or aggregate at the collector.
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+LabelKey = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ''
+    pairs = ','.join(f'{n}="{_escape(v)}"' for n, v in zip(names, values))
+    return '{' + pairs + '}'
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric:
+    kind = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, object]) -> LabelKey:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonically increasing count"""
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in items]
+
+
+class Gauge(_Metric):
+    """Point-in-time value, either set explicitly or read from a callback at scrape time"""
+    kind = 'gauge'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelKey, float] = {}
+        self._function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        """Compute the (unlabelled) value on every scrape"""
+        self._function = function
+
+    def _samples(self) -> List[str]:
+        if self._function is not None:
+            try:
+                return [f"{self.name} {_format_value(self._function())}"]
+            except Exception:
+                return []
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in items]
+
+
+class Histogram(_Metric):
+    """Distribution of observations in cumulative buckets"""
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        self._counts: Dict[LabelKey, List[int]] = {}
+        self._sums: Dict[LabelKey, float] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts = self._counts.setdefault(key, [0] * len(self.buckets))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self._sums[key] = self._sums.get(key, 0) + value
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """Observe the wall-clock duration of the ``with`` block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _samples(self) -> List[str]:
+        lines = []
+        with self._lock:
+            items = sorted((k, list(v), self._sums[k]) for k, v in self._counts.items())
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames + ('le',), key + (_format_value(bound),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered together for /metrics"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)"""
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+WEBHOOK_REQUESTS = REGISTRY.counter(
+    'ai_pr_reviewer_webhook_requests_total', 'Webhook deliveries by outcome', ['result'])
+WEBHOOK_LATENCY = REGISTRY.histogram(
+    'ai_pr_reviewer_webhook_intake_seconds', 'Time to validate and enqueue a webhook delivery')
+DIFF_FETCH_LATENCY = REGISTRY.histogram(
+    'ai_pr_reviewer_diff_fetch_seconds', 'Time to download a PR diff from Bitbucket')
+METRICS_ANALYSIS_LATENCY = REGISTRY.histogram(
+    'ai_pr_reviewer_metrics_analysis_seconds', 'Time spent in MetricsAnalyzer.analyze')
+LLM_LATENCY = REGISTRY.histogram(
+    'ai_pr_reviewer_llm_request_seconds', 'LLM review call latency by provider', ['provider'])
+LLM_REQUESTS = REGISTRY.counter(
+    'ai_pr_reviewer_llm_requests_total', 'LLM review calls by provider and outcome', ['provider', 'outcome'])
+COMMENT_LATENCY = REGISTRY.histogram(
+    'ai_pr_reviewer_comment_post_seconds', 'Time to post a PR comment', ['kind'])
+COMMENTS_POSTED = REGISTRY.counter(
+    'ai_pr_reviewer_comments_posted_total', 'PR comments posted by kind and outcome', ['kind', 'outcome'])
+CACHE_REQUESTS = REGISTRY.counter(
+    'ai_pr_reviewer_review_cache_requests_total', 'Review cache lookups', ['result'])
+HTTP_CACHE_REQUESTS = REGISTRY.counter(
+    'ai_pr_reviewer_bitbucket_conditional_requests_total',
+    'Bitbucket GETs by conditional cache result (hit = 304)', ['result'])
+REVIEW_JOBS = REGISTRY.counter(
+    'ai_pr_reviewer_review_jobs_total', 'Review jobs finished by this process, by status', ['status'])
+REVIEW_JOB_LATENCY = REGISTRY.histogram(
+    'ai_pr_reviewer_review_job_seconds', 'End-to-end review job duration')
+QUEUE_DEPTH = REGISTRY.gauge(
+    'ai_pr_reviewer_queue_depth', 'Review jobs waiting for a worker (host-wide)')
+IN_FLIGHT = REGISTRY.gauge(
+    'ai_pr_reviewer_reviews_in_flight', 'Reviews currently running in this process')
+BREAKER_STATE = REGISTRY.gauge(
+    'ai_pr_reviewer_circuit_breaker_state', 'Circuit breaker state (0 closed, 1 half-open, 2 open)', ['endpoint'])
+BREAKER_REJECTIONS = REGISTRY.counter(
+    'ai_pr_reviewer_circuit_breaker_rejections_total', 'Calls failed fast by an open circuit breaker', ['endpoint'])
+LLM_HEDGES = REGISTRY.counter(
+    'ai_pr_reviewer_llm_hedged_requests_total', 'Hedged LLM reviews by the provider that answered', ['winner'])
+LLM_ROUTES = REGISTRY.counter(
+    'ai_pr_reviewer_llm_routing_decisions_total', 'Provider chosen per review and why', ['provider', 'reason'])
+LLM_FAILOVERS = REGISTRY.counter(
+    'ai_pr_reviewer_llm_failovers_total', 'Reviews retried on another provider after an error', ['source', 'target'])
+PROVIDER_LATENCY_EWMA = REGISTRY.gauge(
+    'ai_pr_reviewer_llm_latency_ewma_seconds', 'Smoothed review latency by provider', ['provider'])
+PROVIDER_TOKEN_SECONDS = REGISTRY.gauge(
+    'ai_pr_reviewer_llm_seconds_per_1k_tokens', 'Smoothed review seconds per 1000 tokens by provider', ['provider'])
+PROVIDER_ERROR_RATE = REGISTRY.gauge(
+    'ai_pr_reviewer_llm_error_rate', 'Smoothed review error rate by provider (0-1)', ['provider'])
+PROMPT_CHARS_SAVED = REGISTRY.counter(
+    'ai_pr_reviewer_prompt_chars_saved_total', 'Prompt characters removed by minimization')
+PROMPT_TOKENS_SAVED = REGISTRY.counter(
+    'ai_pr_reviewer_prompt_tokens_saved_total', 'Estimated prompt tokens removed by minimization')
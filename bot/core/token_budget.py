@@ -0,0 +1,162 @@
+import math
+import re
+from dataclasses import dataclass
+from typing import Iterable, Iterator, List, Tuple, Union
+from bot.config import Config
+from bot.core.logger import ReviewLogger
+from bot.core.metrics_analyzer import MetricsAnalyzer
+from bot.core.utils import extract_file_path_from_diff_line
+
+# Average characters per token on diffs, per provider tokenizer. Code packs
+# fewer characters per token than prose, so these err towards overestimating.
+CHARS_PER_TOKEN = {
+    'gemini': 3.5,
+    'groq': 3.2,
+}
+_DEFAULT_CHARS_PER_TOKEN = min(CHARS_PER_TOKEN.values())
+
+_NOTE_CHARS = 400  # room kept for the omitted-hunks note
+_warned_max_diff_chars = False
+
+_TEST_PATH = re.compile(r'(^|/)(tests?|__tests__|spec)/|(^|/)test_[^/]*$|_test\.\w+$|\.(spec|test)\.\w+$')
+
+
+def estimate_tokens(text: Union[str, int], provider: str = None) -> int:
+    """Tokens ``text`` (or that many characters) costs with ``provider``'s tokenizer"""
+    chars = text if isinstance(text, int) else len(text)
+    return math.ceil(chars / CHARS_PER_TOKEN.get(provider, _DEFAULT_CHARS_PER_TOKEN))
+
+
+def prompt_budget(provider: str = None) -> int:
+    """Prompt tokens allowed for ``provider``; the smallest budget when unknown"""
+    budgets = {'gemini': Config.GEMINI_PROMPT_TOKENS, 'groq': Config.GROQ_PROMPT_TOKENS}
+    if Config.MAX_DIFF_CHARS:
+        # deprecated character limit, converted with each provider's ratio
+        budgets = {name: estimate_tokens(Config.MAX_DIFF_CHARS, name) for name in budgets}
+        _warn_max_diff_chars(budgets)
+    return budgets.get(provider, min(budgets.values()))
+
+
+def _warn_max_diff_chars(budgets) -> None:
+    global _warned_max_diff_chars
+    if not _warned_max_diff_chars:
+        _warned_max_diff_chars = True
+        ReviewLogger.get().warning(
+            f"MAX_DIFF_CHARS is deprecated; set GEMINI_PROMPT_TOKENS / GROQ_PROMPT_TOKENS instead "
+            f"(using {budgets['gemini']} / {budgets['groq']} tokens from MAX_DIFF_CHARS={Config.MAX_DIFF_CHARS})")
+
+
+def char_budget(provider: str = None, used_chars: int = 0) -> int:
+    """Characters left in ``provider``'s prompt budget after ``used_chars``"""
+    chars = int(prompt_budget(provider) * CHARS_PER_TOKEN.get(provider, _DEFAULT_CHARS_PER_TOKEN))
+    return max(0, chars - used_chars)
+
+
+def is_test_path(path: str) -> bool:
+    return bool(path and _TEST_PATH.search(path))
+
+
+@dataclass
+class Hunk:
+    """Where one hunk of a diff sits and what decides its place in the packing order
+
+    Only sizes and counts are kept; the text is read again from the diff
+    when the hunk is emitted.
+    """
+    index: int
+    file: int  # index of the file whose header precedes it
+    path: str
+    header_chars: int
+    chars: int
+    security_hits: int
+    changed_lines: int
+
+    @property
+    def priority(self):
+        # security hits, then source before tests, then larger changes
+        return (-self.security_hits, is_test_path(self.path), -self.changed_lines, self.index)
+
+
+def _owners(lines: Iterable[str]) -> Iterator[Tuple[int, int, bool, str]]:
+    """(file index, hunk index, is a header line, line) for each line of a diff
+
+    Splits files and hunks the way ``file_hunks`` does. Header lines carry
+    the index of their file's first hunk; a file without hunks (binary,
+    rename) still gets one, empty, so it can be chosen on its own.
+    """
+    file, hunk, in_hunk = -1, -1, False
+    for line in lines:
+        if line.startswith('diff --git') or file < 0:
+            file, hunk, in_hunk = file + 1, hunk + 1, False
+        if line.startswith('@@'):
+            if in_hunk:
+                hunk += 1
+            in_hunk = True
+        yield file, hunk, not in_hunk, line
+
+
+def parse_hunks(lines: Iterable[str]) -> List[Hunk]:
+    """Hunks of a unified diff in order, as sizes and counts without their text"""
+    hunks: List[Hunk] = []
+    keywords = set()
+    for file, index, is_header, line in _owners(lines):
+        if index == len(hunks):
+            previous = hunks[-1] if hunks and hunks[-1].file == file else None
+            hunks.append(Hunk(index, file, previous.path if previous else '',
+                              previous.header_chars if previous else 0, 0, 0, 0))
+            keywords = set()
+        hunk = hunks[-1]
+        if is_header:
+            if line.startswith('diff --git'):
+                hunk.path = extract_file_path_from_diff_line(line)
+            hunk.header_chars += len(line)
+            continue
+        hunk.chars += len(line)
+        if line[:1] in ('+', '-') and line[1:].strip():
+            hunk.changed_lines += 1
+            keywords.update(k for k in MetricsAnalyzer.SECURITY_KEYWORDS if k in line)
+            hunk.security_hits = len(keywords)
+    return hunks
+
+
+def pack_diff(diff, max_chars: int) -> str:
+    """The highest-priority hunks of ``diff`` (a str or DiffBuffer) that fit in ``max_chars``
+
+    Chosen hunks are emitted in diff order under their file headers; a note
+    at the end names the files whose hunks were left out. The diff is read
+    twice, once to size the hunks and once to copy the chosen ones, so only
+    the packed text is held in memory.
+    """
+    def lines():
+        return diff.splitlines(keepends=True) if isinstance(diff, str) else diff
+
+    hunks = parse_hunks(lines())
+    max_chars = max(0, max_chars - _NOTE_CHARS)
+    chosen, files, used = set(), set(), 0
+    for hunk in sorted(hunks, key=lambda h: h.priority):
+        cost = hunk.chars + (0 if hunk.file in files else hunk.header_chars)
+        if used + cost <= max_chars:
+            chosen.add(hunk.index)
+            files.add(hunk.file)
+            used += cost
+
+    if not chosen and hunks:
+        # not even one hunk fits: send the start of the most important one
+        top = min(hunks, key=lambda h: h.priority)
+        head, size = [], 0
+        for file, index, is_header, line in _owners(lines()):
+            if size >= max_chars:
+                break
+            if index == top.index or (is_header and file == top.file):
+                head.append(line[:max_chars - size])
+                size += len(head[-1])
+        return ''.join(head) + "\n...TRUNCATED...\n"
+
+    parts = [line for file, index, is_header, line in _owners(lines())
+             if (file in files if is_header else index in chosen)]
+    omitted = [h for h in hunks if h.index not in chosen]
+    if omitted:
+        names = list(dict.fromkeys(h.path or '(unknown)' for h in omitted))
+        parts.append(f"\n...{len(omitted)} of {len(hunks)} hunks omitted to fit the token budget "
+                     f"({', '.join(names[:5])}{', ...' if len(names) > 5 else ''})\n")
+    return ''.join(parts)
@@ -4,32 +4,17 @@ from bot.config import Config
 from bot.core.logger import ReviewLogger
 from bot.core.bitbucket_api import BitbucketAPI
 from bot.core.reviewer_engine import ReviewerEngine
-from bot.core.qa_issue_extractor import QAIssueExtractor
-from bot.core.qa_formatter import QAFormatter
+from bot.core.comment_poster import ReviewPublisher
+from bot.core.incremental_review import IncrementalReview, ReviewStateStore
 
-def _post_qa_inline_comments(api: BitbucketAPI, review: str) -> None:
-    """Extract and post QA inline comments"""
-    logger = ReviewLogger.get()
-    
-    if not (Config.QA_MODE and Config.ENABLE_QA_INLINE_COMMENTS):
-        return
-    
-    logger.info("Extracting QA issues for inline comments...")
-    extractor = QAIssueExtractor()
-    qa_issues = extractor.extract_issues(review)
-    high_medium_issues = extractor.extract_high_medium_issues(qa_issues)
-    
-    if not high_medium_issues:
-        logger.debug("No HIGH/MEDIUM issues with file locations for inline comments")
-        return
-    
-    logger.info(f"Posting {len(high_medium_issues)} inline QA comments...")
-    grouped = extractor.group_issues_by_location(high_medium_issues)
-    
-    for (file_path, line_num), issues in grouped.items():
-        for issue in issues:
-            comment = QAFormatter.format_inline_comment(issue)
-            api.post_inline_comment(file_path, line_num, comment)
+def _fetch_review_diff(api: BitbucketAPI, incremental: IncrementalReview):
+    """Interdiff since the last reviewed commit when possible, else the full PR diff"""
+    if incremental.base:
+        diff = api.get_interdiff(incremental.base, incremental.head)
+        if diff is not None:
+            return diff, True
+        ReviewLogger.get().info("Interdiff unavailable - reviewing the full PR")
+    return api.get_pr_diff(), False
 
 def run():
     """Main entry point for PR review"""
@@ -54,7 +39,21 @@ def run():
         # Fetch PR metadata and diff
         logger.info("Fetching PR metadata and diff...")
         title, desc = api.get_pr_metadata()
-        diff = api.get_pr_diff()
+        store = ReviewStateStore(Config.REVIEW_STATE_DB, ttl=Config.REVIEW_STATE_TTL)
+        head, destination = api.get_pr_commits()
+        merge_base = api.get_merge_base(head, destination) if Config.INCREMENTAL_REVIEW else None
+        incremental = IncrementalReview(store, f"{api.workspace}/{api.repo_slug}/{api.pr_id}",
+                                        head, merge_base)
+        if incremental.unchanged:
+            logger.info("Source commit already reviewed - nothing new to review")
+            return
+        
+        diff, is_incremental = _fetch_review_diff(api, incremental)
+        if is_incremental and not diff:
+            logger.info("No reviewable changes since the last reviewed commit")
+            incremental.advance()
+            incremental.save()
+            return
         
         if not diff:
             logger.error("Failed to fetch PR diff")
@@ -62,20 +61,21 @@ def run():
         
         # Generate review
         logger.info("Generating review...")
-        review = engine.generate_review(title, desc, diff)
+        with diff:
+            review = engine.generate_review(title, desc, diff)
+            summary = incremental.merge(review, diff, is_incremental)
         
-        # Post comment
-        logger.info("Posting review comment...")
-        success = api.post_comment(review)
+        # Post the summary comment and inline QA comments
+        logger.info("Posting review comments...")
+        success = ReviewPublisher().publish(api, summary, review, incremental.scope)
         
         if success:
+            incremental.save()
             logger.info("Review completed successfully")
         else:
             logger.warning("Review generated but failed to post")
             sys.exit(1)
     except Exception as e:
-        # Extract and post inline QA comments
-        _post_qa_inline_comments(api, review)
         logger.error(f"Unexpected error: {e}", exc_info=True)
         sys.exit(1)
 
@@ -0,0 +1,72 @@
+from typing import List, Union
+from bot.core.logger import ReviewLogger
+from bot.core.telemetry import LLM_FAILOVERS
+from bot.core.token_budget import estimate_tokens, prompt_budget
+from bot.models.hedged_client import is_good_review
+
+
+class FailoverClient:
+    """Try ``clients`` in order until one returns a usable review
+
+    A client fails by returning an error text or by raising. A fallback is
+    skipped when the prompt (built for the first client's budget) would not
+    fit its own. If every client fails, the first client's error is
+    returned, or re-raised if it was an exception.
+    """
+
+    def __init__(self, clients: List):
+        self.clients = clients
+        self.provider = clients[0].provider
+        self.logger = ReviewLogger.get()
+        if hasattr(clients[0], 'astream'):
+            # a failed stream falls back to areview, which fails over
+            self.astream = clients[0].astream
+
+    def review(self, prompt: str) -> str:
+        candidates = self._candidates(prompt)
+        errors = []
+        for i, client in enumerate(candidates):
+            try:
+                text = client.review(prompt)
+            except Exception as e:
+                text = e
+            else:
+                if is_good_review(text):
+                    return text
+            errors.append(text)
+            self._failed(client, text, candidates[i + 1:])
+        return self._first_error(errors)
+
+    async def areview(self, prompt: str) -> str:
+        candidates = self._candidates(prompt)
+        errors = []
+        for i, client in enumerate(candidates):
+            try:
+                text = await client.areview(prompt)
+            except Exception as e:
+                text = e
+            else:
+                if is_good_review(text):
+                    return text
+            errors.append(text)
+            self._failed(client, text, candidates[i + 1:])
+        return self._first_error(errors)
+
+    def _candidates(self, prompt: str) -> List:
+        fits = [c for c in self.clients[1:]
+                if estimate_tokens(prompt, c.provider) <= prompt_budget(c.provider)]
+        return self.clients[:1] + fits
+
+    def _failed(self, client, error: Union[str, Exception], remaining: List) -> None:
+        if remaining:
+            target = remaining[0].provider
+            detail = f"{type(error).__name__}: {error}" if isinstance(error, Exception) else (error or 'empty')
+            self.logger.warning(f"{client.provider} review failed ({detail[:120]}); "
+                                f"failing over to {target}")
+            LLM_FAILOVERS.inc(source=client.provider, target=target)
+
+    @staticmethod
+    def _first_error(errors: List[Union[str, Exception]]) -> str:
+        if isinstance(errors[0], Exception):
+            raise errors[0]
+        return errors[0]
@@ -1,20 +1,135 @@
+import json
 import os
+import time
+from typing import AsyncIterator
 import google.generativeai as genai
+import httpx
+from bot.config import Config
+from bot.core.http_pool import get_async_client
+from bot.core.provider_stats import PROVIDER_STATS
+from bot.core.rate_limiter import get_bucket, parse_retry_after
+from bot.core.resilience import RetryPolicy, get_breaker
+from bot.core.sse import aiter_sse_data
+from bot.core.telemetry import LLM_LATENCY, LLM_REQUESTS
+from bot.core.token_budget import estimate_tokens
 
 class GeminiClient:
+    provider = 'gemini'
+
     def __init__(self, api_key: str = None):
         key = api_key or os.getenv('GEMINI_API_KEY')
         if not key:
             raise RuntimeError('GEMINI_API_KEY not set for GeminiClient')
         genai.configure(api_key=key)
+        self.api_key = key
         # model name is configurable via ENV (defaults to gemini-2.0-flash)
         self.model_name = os.getenv('GEMINI_MODEL_NAME', 'gemini-2.0-flash')
+        # REST endpoint used by areview, which shares the async HTTP pool
+        self.api_url = os.getenv('GEMINI_API_URL', 'https://generativelanguage.googleapis.com/v1beta')
+        self.generation_config = {'max_output_tokens': Config.LLM_MAX_OUTPUT_TOKENS,
+                                  'temperature': Config.LLM_TEMPERATURE}
+        # one long-lived model handle; building it per call re-resolves the SDK client
+        self.model = genai.GenerativeModel(self.model_name, generation_config=self.generation_config)
+        self.bucket = get_bucket('gemini')
+        self.retry = RetryPolicy(get_breaker('gemini'))
 
     def review(self, prompt: str) -> str:
         try:
-            model = genai.GenerativeModel(self.model_name)
-            response = model.generate_content(prompt)
-            # .text property contains string output for many sdk versions
-            return getattr(response, 'text', str(response))
+            start = time.perf_counter()
+            text = self.retry.call(lambda: self._generate(prompt))
+            self._record(len(prompt) + len(text), time.perf_counter() - start)
+            LLM_REQUESTS.inc(provider='gemini', outcome='ok')
+            return text
+        except Exception as e:
+            PROVIDER_STATS.record_error(self.provider)
+            LLM_REQUESTS.inc(provider='gemini', outcome='error')
+            return f"[Gemini Error] {str(e)}"
+
+    async def areview(self, prompt: str) -> str:
+        """Async review over the Gemini REST API; cancelling the task aborts the request"""
+        try:
+            start = time.perf_counter()
+            text = await self.retry.acall(lambda: self._agenerate(prompt))
+            self._record(len(prompt) + len(text), time.perf_counter() - start)
+            LLM_REQUESTS.inc(provider='gemini', outcome='ok')
+            return text
         except Exception as e:
+            PROVIDER_STATS.record_error(self.provider)
+            LLM_REQUESTS.inc(provider='gemini', outcome='error')
             return f"[Gemini Error] {str(e)}"
+
+    def _generate(self, prompt: str) -> str:
+        self.bucket.acquire()
+        try:
+            with LLM_LATENCY.time(provider='gemini'):
+                response = self.model.generate_content(prompt, request_options={'timeout': Config.LLM_TIMEOUT})
+        except Exception as e:
+            if getattr(e, 'code', None) == 429:  # google.api_core ResourceExhausted
+                self.bucket.pause(Config.RETRY_DELAY)
+            raise
+        # .text property contains string output for many sdk versions
+        return getattr(response, 'text', str(response))
+
+    async def astream(self, prompt: str) -> AsyncIterator[str]:
+        """Stream the review over REST server-sent events, yielding text as it is generated
+
+        Not retried: a stream that fails part-way cannot be resumed, so the
+        caller falls back to ``areview``.
+        """
+        breaker = self.retry.breaker
+        breaker.check()
+        url = f"{self.api_url}/models/{self.model_name}:streamGenerateContent"
+        await self.bucket.acquire_async()
+        start, chars = time.perf_counter(), len(prompt)
+        try:
+            with LLM_LATENCY.time(provider='gemini'):
+                async with get_async_client().stream('POST', url, params={'alt': 'sse'},
+                                                     headers={'x-goog-api-key': self.api_key},
+                                                     json=self._body(prompt), timeout=Config.LLM_TIMEOUT) as r:
+                    if r.status_code == 429:
+                        await self._apause(r.headers.get('Retry-After'))
+                    breaker.record_status(r.status_code)
+                    r.raise_for_status()
+                    async for data in aiter_sse_data(r):
+                        text = self._text(json.loads(data))
+                        if text:
+                            chars += len(text)
+                            yield text
+            self._record(chars, time.perf_counter() - start)
+        except Exception as e:
+            if isinstance(e, httpx.TransportError):
+                breaker.record_failure()
+            PROVIDER_STATS.record_error(self.provider)
+            raise
+
+    async def _agenerate(self, prompt: str) -> str:
+        url = f"{self.api_url}/models/{self.model_name}:generateContent"
+        await self.bucket.acquire_async()
+        with LLM_LATENCY.time(provider='gemini'):
+            r = await get_async_client().post(url, headers={'x-goog-api-key': self.api_key},
+                                              json=self._body(prompt), timeout=Config.LLM_TIMEOUT)
+        if r.status_code == 429:
+            await self._apause(r.headers.get('Retry-After'))
+        r.raise_for_status()
+        return self._text(r.json())
+
+    def _body(self, prompt: str) -> dict:
+        return {
+            'contents': [{'role': 'user', 'parts': [{'text': prompt}]}],
+            'generationConfig': {'maxOutputTokens': self.generation_config['max_output_tokens'],
+                                 'temperature': self.generation_config['temperature']},
+        }
+
+    @staticmethod
+    def _text(j: dict) -> str:
+        parts = j.get('candidates', [{}])[0].get('content', {}).get('parts', [])
+        return ''.join(part.get('text', '') for part in parts)
+
+    def _record(self, chars: int, seconds: float) -> None:
+        """Feed a successful call (prompt + output characters) to the routing stats"""
+        PROVIDER_STATS.record(self.provider, seconds, estimate_tokens(chars, self.provider))
+
+    async def _apause(self, retry_after) -> None:
+        """Hold every worker's Gemini requests for the server's Retry-After"""
+        wait = parse_retry_after(retry_after)
+        await self.bucket.pause_async(Config.RETRY_DELAY if wait is None else wait)
@@ -1,23 +1,140 @@
+import json
 import os
-import requests
+import time
+from typing import AsyncIterator
+import httpx
+from bot.config import Config
+from bot.core.http_pool import get_async_client, get_session
+from bot.core.provider_stats import PROVIDER_STATS
+from bot.core.rate_limiter import get_bucket, parse_retry_after
+from bot.core.resilience import RetryPolicy, get_breaker
+from bot.core.sse import aiter_sse_data
+from bot.core.telemetry import LLM_LATENCY, LLM_REQUESTS
+from bot.core.token_budget import estimate_tokens
 
 class GroqClient:
+    provider = 'groq'
+
     def __init__(self, api_key: str = None):
         self.api_key = api_key or os.getenv('GROQ_API_KEY', '')
         self.url = os.getenv('GROQ_API_URL', 'https://api.groq.com/openai/v1/chat/completions')
+        self.model_name = os.getenv('GROQ_MODEL_NAME', 'mixtral-8x7b-32768')
+        self.headers = {'Authorization': f'Bearer {self.api_key}', 'Content-Type': 'application/json'}
+        self.bucket = get_bucket('groq')
+        self.retry = RetryPolicy(get_breaker('groq'))
+
+    def _request(self, prompt: str) -> dict:
+        return {
+            'model': self.model_name,
+            'messages': [{'role': 'user', 'content': prompt}],
+            'max_tokens': Config.LLM_MAX_OUTPUT_TOKENS,
+            'temperature': Config.LLM_TEMPERATURE,
+        }
+
+    def _record(self, chars: int, seconds: float) -> None:
+        """Feed a successful call (prompt + output characters) to the routing stats"""
+        PROVIDER_STATS.record(self.provider, seconds, estimate_tokens(chars, self.provider))
+
+    def _pause(self, retry_after) -> None:
+        """Hold every worker's Groq requests for the server's Retry-After"""
+        self.bucket.pause(self._pause_seconds(retry_after))
+
+    async def _apause(self, retry_after) -> None:
+        await self.bucket.pause_async(self._pause_seconds(retry_after))
+
+    @staticmethod
+    def _pause_seconds(retry_after) -> float:
+        wait = parse_retry_after(retry_after)
+        return Config.RETRY_DELAY if wait is None else wait
+
+    @staticmethod
+    def _content(j: dict) -> str:
+        return j.get('choices', [{}])[0].get('message', {}).get('content', '')
 
     def review(self, prompt: str) -> str:
         if not self.api_key:
             return '[Groq Client] GROQ_API_KEY not set - skipping'
-        headers = {'Authorization': f'Bearer {self.api_key}', 'Content-Type': 'application/json'}
-        body = {
-            'model': 'mixtral-8x7b-32768',
-            'messages': [{'role': 'user', 'content': prompt}]
-        }
         try:
-            r = requests.post(self.url, headers=headers, json=body)
-            r.raise_for_status()
-            j = r.json()
-            return j.get('choices', [{}])[0].get('message', {}).get('content', '')
+            start = time.perf_counter()
+            content = self.retry.call(lambda: self._complete(prompt))
+            self._record(len(prompt) + len(content), time.perf_counter() - start)
+            LLM_REQUESTS.inc(provider='groq', outcome='ok')
+            return content
         except Exception as e:
+            PROVIDER_STATS.record_error(self.provider)
+            LLM_REQUESTS.inc(provider='groq', outcome='error')
             return f'[Groq Error] {str(e)}'
+
+    async def areview(self, prompt: str) -> str:
+        """Async review over the shared HTTP pool; cancelling the task aborts the request"""
+        if not self.api_key:
+            return '[Groq Client] GROQ_API_KEY not set - skipping'
+        try:
+            start = time.perf_counter()
+            content = await self.retry.acall(lambda: self._acomplete(prompt))
+            self._record(len(prompt) + len(content), time.perf_counter() - start)
+            LLM_REQUESTS.inc(provider='groq', outcome='ok')
+            return content
+        except Exception as e:
+            PROVIDER_STATS.record_error(self.provider)
+            LLM_REQUESTS.inc(provider='groq', outcome='error')
+            return f'[Groq Error] {str(e)}'
+
+    def _complete(self, prompt: str) -> str:
+        body = self._request(prompt)
+        self.bucket.acquire()
+        with LLM_LATENCY.time(provider='groq'):
+            # pooled keep-alive session: no TCP/TLS handshake per review
+            r = get_session(self.api_key).post(self.url, headers=self.headers, json=body,
+                                               timeout=Config.LLM_TIMEOUT)
+        if r.status_code == 429:
+            self._pause(r.headers.get('Retry-After'))
+        r.raise_for_status()
+        return self._content(r.json())
+
+    async def _acomplete(self, prompt: str) -> str:
+        body = self._request(prompt)
+        await self.bucket.acquire_async()
+        with LLM_LATENCY.time(provider='groq'):
+            r = await get_async_client().post(self.url, headers=self.headers, json=body,
+                                              timeout=Config.LLM_TIMEOUT)
+        if r.status_code == 429:
+            await self._apause(r.headers.get('Retry-After'))
+        r.raise_for_status()
+        return self._content(r.json())
+
+    async def astream(self, prompt: str) -> AsyncIterator[str]:
+        """Stream the review as server-sent events, yielding text as it is generated
+
+        Not retried: a stream that fails part-way cannot be resumed, so the
+        caller falls back to ``areview``.
+        """
+        if not self.api_key:
+            raise RuntimeError('GROQ_API_KEY not set')
+        breaker = self.retry.breaker
+        breaker.check()
+        body = {**self._request(prompt), 'stream': True}
+        await self.bucket.acquire_async()
+        start, chars = time.perf_counter(), len(prompt)
+        try:
+            with LLM_LATENCY.time(provider='groq'):
+                async with get_async_client().stream('POST', self.url, headers=self.headers, json=body,
+                                                     timeout=Config.LLM_TIMEOUT) as r:
+                    if r.status_code == 429:
+                        await self._apause(r.headers.get('Retry-After'))
+                    breaker.record_status(r.status_code)
+                    r.raise_for_status()
+                    async for data in aiter_sse_data(r):
+                        if data == '[DONE]':
+                            break
+                        delta = json.loads(data).get('choices', [{}])[0].get('delta', {}).get('content')
+                        if delta:
+                            chars += len(delta)
+                            yield delta
+            self._record(chars, time.perf_counter() - start)
+        except Exception as e:
+            if isinstance(e, httpx.TransportError):
+                breaker.record_failure()
+            PROVIDER_STATS.record_error(self.provider)
+            raise
+
@@ -0,0 +1,108 @@
+import asyncio
+import queue
+import re
+import threading
+from bot.config import Config
+from bot.core.logger import ReviewLogger
+from bot.core.provider_stats import PROVIDER_STATS, ProviderStats
+from bot.core.telemetry import LLM_HEDGES
+
+# Clients report failures as text rather than raising: "[Gemini Error] ...", "[Groq Client] ...",
+# and "[Review Error] ..." for a failed chunk
+_ERROR_TEXT = re.compile(r'^\[\w+ (Error|Client)\]')
+
+
+def is_good_review(text: str) -> bool:
+    return bool(text) and not _ERROR_TEXT.match(text)
+
+
+class HedgedClient:
+    """Send the prompt to ``primary`` and, if it is slow, also to ``secondary``
+
+    The hedge fires once the primary has run longer than its recent
+    HEDGE_PERCENTILE latency (HEDGE_DELAY until HEDGE_MIN_SAMPLES calls have
+    been seen), or as soon as the primary fails. The first good answer wins
+    and the other call is cancelled.
+    """
+
+    def __init__(self, primary, secondary, stats: ProviderStats = None):
+        self.primary = primary
+        self.secondary = secondary
+        self.provider = primary.provider
+        self.stats = stats or PROVIDER_STATS
+        self.logger = ReviewLogger.get()
+
+    def hedge_delay(self) -> float:
+        delay = self.stats.percentile(self.primary.provider, Config.HEDGE_PERCENTILE,
+                                      min_samples=Config.HEDGE_MIN_SAMPLES)
+        return Config.HEDGE_DELAY if delay is None else delay
+
+    async def areview(self, prompt: str) -> str:
+        delay = self.hedge_delay()
+        first = asyncio.create_task(self.primary.areview(prompt))
+        pending = {first}
+        try:
+            done, _ = await asyncio.wait(pending, timeout=delay)
+            if done and is_good_review(first.result()):
+                LLM_HEDGES.inc(winner='not_hedged')
+                return first.result()
+
+            self._log_hedge(delay, first.result() if done else None)
+            second = asyncio.create_task(self.secondary.areview(prompt))
+            pending = {second} if done else {first, second}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if is_good_review(task.result()):
+                        LLM_HEDGES.inc(winner=(self.primary if task is first else self.secondary).provider)
+                        return task.result()
+            LLM_HEDGES.inc(winner='none')
+            return first.result()
+        finally:
+            for task in pending:
+                task.cancel()  # aborts the loser's in-flight HTTP request
+
+    def review(self, prompt: str) -> str:
+        """Blocking variant; a losing call cannot be interrupted and finishes in the background"""
+        delay = self.hedge_delay()
+        results: 'queue.Queue' = queue.Queue()
+        self._start(self.primary, prompt, results)
+        answers = {}
+        try:
+            _, text = results.get(timeout=delay)
+            if is_good_review(text):
+                LLM_HEDGES.inc(winner='not_hedged')
+                return text
+            answers[self.primary.provider] = text
+        except queue.Empty:
+            pass
+
+        self._log_hedge(delay, answers.get(self.primary.provider))
+        self._start(self.secondary, prompt, results)
+        for _ in range(2 - len(answers)):
+            client, text = results.get()
+            if is_good_review(text):
+                LLM_HEDGES.inc(winner=client.provider)
+                return text
+            answers[client.provider] = text
+        LLM_HEDGES.inc(winner='none')
+        return answers[self.primary.provider]
+
+    def _log_hedge(self, delay: float, failure: str = None) -> None:
+        if failure is None:
+            self.logger.info(f"{self.primary.provider} slower than {delay:.1f}s - "
+                             f"hedging with {self.secondary.provider}")
+        else:
+            self.logger.info(f"{self.primary.provider} failed ({(failure or 'empty')[:120]}) - "
+                             f"trying {self.secondary.provider}")
+
+    def _start(self, client, prompt: str, results: 'queue.Queue') -> None:
+        def run():
+            try:
+                results.put((client, client.review(prompt)))
+            except Exception as e:
+                self.logger.warning(f"{client.provider} review failed: {e}")
+                results.put((client, ''))
+
+        # daemon thread, so an abandoned loser never delays process exit
+        threading.Thread(target=run, daemon=True).start()
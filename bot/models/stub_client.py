@@ -0,0 +1,160 @@
+import asyncio
+import hashlib
+import random
+import re
+import time
+from typing import AsyncIterator, List, Tuple
+from bot.config import Config
+from bot.core.metrics_analyzer import MetricsAnalyzer
+from bot.core.provider_stats import PROVIDER_STATS
+from bot.core.qa_issue_extractor import SECTIONS
+from bot.core.telemetry import LLM_LATENCY, LLM_REQUESTS
+from bot.core.token_budget import estimate_tokens, is_test_path
+from bot.core.utils import extract_file_path_from_diff_line
+
+_DIFF_IN_PROMPT = re.compile(r'### CODE CHANGES TO REVIEW\s*```diff\n(.*)\n```\s*---\s*### REVIEW RULES', re.DOTALL)
+_HUNK_START = re.compile(r'^@@ -\d+(?:,\d+)? \+(\d+)')
+_SEVERITY = {'critical': 'HIGH', 'high': 'HIGH', 'medium': 'MEDIUM'}
+
+# (section, pattern on an added line, severity, finding) - checked in order, first match wins
+_CHECKS = [
+    ('Bugs Detected', re.compile(r'except\s*(Exception)?\s*:\s*(pass)?$'), 'MEDIUM',
+     "Exception is swallowed, hiding failures from callers"),
+    ('Bugs Detected', re.compile(r'[=!]=\s*None'), 'LOW', "Comparison to None should use `is`/`is not`"),
+    ('Missing Validations', re.compile(r'\b(request|input|args|params|payload|argv)\b'), 'MEDIUM',
+     "External input is used without validation"),
+    ('Logical Issues', re.compile(r'\bif\b.*\b(and|or)\b.*\b(and|or)\b'), 'MEDIUM',
+     "Compound condition mixes and/or without parentheses; intent is ambiguous"),
+    ('Edge Cases Not Handled', re.compile(r'\[0\]|\[-1\]|\s/\s'), 'MEDIUM',
+     "Indexing or division without guarding against empty input or zero"),
+    ('Code Improvements', re.compile(r'\bprint\(|TODO|FIXME'), 'LOW',
+     "Debug output or TODO left in the change"),
+]
+_FILLER = [
+    ('Edge Cases Not Handled', 'LOW', "Behaviour for empty or very large values is not specified"),
+    ('Code Improvements', 'LOW', "Name could describe the intent more precisely"),
+    ('Logical Issues', 'LOW', "Branch ordering makes the common path harder to follow"),
+    ('Missing Validations', 'LOW', "Value range is assumed rather than checked"),
+]
+
+
+def _added_lines(diff_text: str) -> List[Tuple[str, int, str]]:
+    """(path, new-file line number, text) of every added line"""
+    added = []
+    path, number = '', None
+    for line in diff_text.splitlines():
+        match = _HUNK_START.match(line)
+        if line.startswith('diff --git'):
+            path, number = extract_file_path_from_diff_line(line), None
+        elif match:
+            number = int(match.group(1))
+        elif number is None:
+            continue
+        elif line.startswith('+'):
+            added.append((path, number, line[1:]))
+            number += 1
+        elif not line.startswith('-'):
+            number += 1
+    return added
+
+
+class StubClient:
+    """Offline provider producing QA-format reviews of the diff in the prompt
+
+    Findings come from simple checks on the added lines, so sections,
+    severities and ``file:line`` locations match the diff. Latency, errors
+    and length are drawn from the STUB_* settings with a generator seeded by
+    STUB_SEED and the prompt: a rerun with the same inputs is identical.
+    """
+
+    provider = 'stub'
+    api_key = 'stub'
+
+    def review(self, prompt: str) -> str:
+        rng, delay = self._plan(prompt)
+        with LLM_LATENCY.time(provider=self.provider):
+            time.sleep(delay)
+        return self._finish(prompt, rng, delay)
+
+    async def areview(self, prompt: str) -> str:
+        rng, delay = self._plan(prompt)
+        with LLM_LATENCY.time(provider=self.provider):
+            await asyncio.sleep(delay)
+        return self._finish(prompt, rng, delay)
+
+    async def astream(self, prompt: str) -> AsyncIterator[str]:
+        """Yield the review in pieces spread over the simulated latency"""
+        rng, delay = self._plan(prompt)
+        if rng.random() < Config.STUB_ERROR_RATE:
+            await asyncio.sleep(delay / 2)
+            PROVIDER_STATS.record_error(self.provider)
+            raise ConnectionError("simulated stream failure")
+        text = self._render(prompt, rng)
+        pieces = [text[i:i + 200] for i in range(0, len(text), 200)]
+        for piece in pieces:
+            await asyncio.sleep(delay / len(pieces))
+            yield piece
+        PROVIDER_STATS.record(self.provider, delay, estimate_tokens(len(prompt) + len(text), self.provider))
+
+    def _plan(self, prompt: str) -> Tuple[random.Random, float]:
+        digest = hashlib.sha256(prompt.encode('utf-8', 'replace')).hexdigest()
+        rng = random.Random(f"{Config.STUB_SEED}:{digest}")
+        tokens = estimate_tokens(len(prompt) + Config.STUB_OUTPUT_CHARS, self.provider)
+        delay = rng.gauss(Config.STUB_LATENCY, Config.STUB_JITTER) + Config.STUB_SECONDS_PER_1K_TOKENS * tokens / 1000
+        return rng, max(0.0, delay)
+
+    def _finish(self, prompt: str, rng: random.Random, delay: float) -> str:
+        if rng.random() < Config.STUB_ERROR_RATE:
+            PROVIDER_STATS.record_error(self.provider)
+            LLM_REQUESTS.inc(provider=self.provider, outcome='error')
+            return "[Stub Error] simulated provider failure (STUB_ERROR_RATE)"
+        text = self._render(prompt, rng)
+        PROVIDER_STATS.record(self.provider, delay, estimate_tokens(len(prompt) + len(text), self.provider))
+        LLM_REQUESTS.inc(provider=self.provider, outcome='ok')
+        return text
+
+    def _render(self, prompt: str, rng: random.Random) -> str:
+        match = _DIFF_IN_PROMPT.search(prompt)
+        added = _added_lines(match.group(1) if match else prompt)
+        findings = {name: [] for name, _ in SECTIONS}
+        target = max(200, int(rng.gauss(Config.STUB_OUTPUT_CHARS, Config.STUB_OUTPUT_CHARS / 4)))
+        size = 0
+
+        def add(section, severity, path, number, text):
+            nonlocal size
+            item = f"- ({severity}) `{path}:{number}` {text}"
+            findings[section].append(item)
+            size += len(item)
+
+        for path, number, line in added:
+            if size >= target:
+                break
+            keyword = next((k for k in MetricsAnalyzer.SECURITY_KEYWORDS if k in line), None)
+            if keyword:
+                add('Security Concerns', _SEVERITY.get(MetricsAnalyzer.SECURITY_KEYWORDS[keyword], 'LOW'),
+                    path, number, f"Use of `{keyword.strip('(')}` on this line needs a security review")
+                continue
+            check = next((c for c in _CHECKS if c[1].search(line.strip())), None)
+            if check:
+                add(check[0], check[2], path, number, check[3])
+            elif re.match(r'\s*(async\s+)?def \w+', line) and not is_test_path(path):
+                name = re.search(r'def (\w+)', line).group(1)
+                add('Unit Test Gaps', 'LOW', path, number, f"No test covers `{name}`")
+
+        # pad to the sampled length with plausible low-severity findings on random added lines
+        while added and size < target:
+            path, number, _ = rng.choice(added)
+            section, severity, text = rng.choice(_FILLER)
+            add(section, severity, path, number, text)
+
+        high = sum(1 for items in findings.values() for item in items if '(HIGH)' in item)
+        total = sum(len(items) for items in findings.values())
+        risk = 'HIGH' if high else ('MEDIUM' if total > 3 else 'LOW')
+        parts = ["### QA Summary",
+                 f"Stub review of {len({p for p, _, _ in added})} files: {total} findings, risk {risk}."]
+        for name, _ in SECTIONS:
+            parts.append(f"\n### {name}")
+            parts.append('\n'.join(findings[name]) if findings[name] else "No issues found in this category.")
+        parts.append("\n### Final Recommendation")
+        parts.append("**Request Changes** - resolve the HIGH findings first." if high else "**Approve**")
+        return '\n'.join(parts) + '\n'
@@ -1,23 +1,77 @@
 from fastapi import FastAPI, Request, Header, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 import os
 import logging
 import asyncio
-from typing import Optional
+from contextlib import asynccontextmanager
+from typing import Optional, Tuple
 
 from bot.core.logger import ReviewLogger
 from bot.core.reviewer_engine import ReviewerEngine
-from bot.core.bitbucket_api import BitbucketAPI
-from bot.core.qa_issue_extractor import QAIssueExtractor
-from bot.core.qa_formatter import QAFormatter
+from bot.core.async_bitbucket_api import AsyncBitbucketAPI
+from bot.core.comment_poster import EarlyInlinePoster, ReviewPublisher
+from bot.core.job_queue import JobQueue, ReviewJob, QueueFullError
+from bot.core.job_store import JobStore
+from bot.core.delivery_dedup import DeliveryDeduplicator
+from bot.core.diff_buffer import DiffBuffer
+from bot.core.incremental_review import IncrementalReview, ReviewStateStore
+from bot.core.resilience import breaker_states
+from bot.core.provider_stats import PROVIDER_STATS
+from bot.core import telemetry, http_pool
 from bot.config import Config
 
-app = FastAPI(title="AI PR Reviewer - QA Mode Webhook")
 logger = ReviewLogger.setup(verbose=Config.VERBOSE_LOGGING)
+job_queue = JobQueue(JobStore(Config.JOB_DB), workers=Config.REVIEW_WORKERS, retention=Config.JOB_RETENTION,
+                     coalesce_window=Config.COALESCE_WINDOW,
+                     cancel_running=Config.COALESCE_CANCEL_RUNNING,
+                     max_queue_depth=Config.MAX_QUEUE_DEPTH,
+                     workspace_queue_depth=Config.WORKSPACE_MAX_QUEUE_DEPTH,
+                     workspace_concurrency=Config.WORKSPACE_MAX_CONCURRENCY,
+                     retry_after=Config.ADMISSION_RETRY_AFTER,
+                     poll_interval=Config.JOB_POLL_INTERVAL,
+                     lease_timeout=Config.JOB_LEASE_TIMEOUT,
+                     max_attempts=Config.JOB_MAX_ATTEMPTS)
+deduplicator = DeliveryDeduplicator(Config.DEDUP_DB, ttl=Config.DEDUP_TTL,
+                                    max_entries=Config.DEDUP_MAX_ENTRIES)
+review_state = ReviewStateStore(Config.REVIEW_STATE_DB, ttl=Config.REVIEW_STATE_TTL)
 
+# Process-wide engine, built once per worker by a warm-up task the lifespan hook
+# starts. Building it after the fork (rather than at import) keeps gunicorn
+# --preload safe for the model SDK clients, which must not be shared across
+# processes. Webhooks are accepted while it warms; jobs wait for it.
+_engine_task: Optional[asyncio.Task] = None
 
-def _make_api_with_context(workspace: str, repo_slug: str, pr_id: str, token: Optional[str] = None) -> BitbucketAPI:
-    api = BitbucketAPI()
+
+async def _get_engine() -> ReviewerEngine:
+    if _engine_task is None:
+        raise RuntimeError("ReviewerEngine is not initialized yet")
+    return await asyncio.shield(_engine_task)
+
+
+async def _warm_engine() -> ReviewerEngine:
+    engine = await asyncio.to_thread(ReviewerEngine)
+    logger.info("ReviewerEngine warmed up")
+    return engine
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global _engine_task
+    _engine_task = asyncio.create_task(_warm_engine())
+    await job_queue.start(_process_review)
+    telemetry.QUEUE_DEPTH.set_function(job_queue.depth)
+    telemetry.IN_FLIGHT.set_function(job_queue.in_flight)
+    yield
+    await job_queue.stop(grace=Config.SHUTDOWN_GRACE)
+    _engine_task.cancel()
+    await http_pool.aclose_all()
+
+
+app = FastAPI(title="AI PR Reviewer - QA Mode Webhook", lifespan=lifespan)
+
+
+def _make_api_with_context(workspace: str, repo_slug: str, pr_id: str, token: Optional[str] = None) -> AsyncBitbucketAPI:
+    api = AsyncBitbucketAPI()
     # override context from webhook payload
     api.workspace = workspace
     api.repo_slug = repo_slug
@@ -45,30 +99,134 @@ async def uninstalled(request: Request):
 
 
 @app.post('/webhook/pr')
-async def webhook_pr(request: Request, x_event_key: Optional[str] = Header(None)):
+async def webhook_pr(request: Request, x_event_key: Optional[str] = Header(None),
+                     x_request_uuid: Optional[str] = Header(None)):
     """Handle Bitbucket PR webhooks (pullrequest:created, updated, reopened)
 
-    This function is intentionally small and delegates work to helpers.
+    The payload is validated and queued; the review itself runs on the job
+    queue workers so Bitbucket gets a 202 before its delivery timeout.
     """
-    payload = await _parse_json_request(request)
-    repo, pr = _extract_repo_pr(payload)
-    workspace, repo_slug, pr_id = _extract_repo_info(repo, pr)
+    with telemetry.WEBHOOK_LATENCY.time():
+        return await _accept_webhook(request, x_event_key, x_request_uuid)
+
+
+async def _accept_webhook(request: Request, x_event_key: Optional[str],
+                          x_request_uuid: Optional[str]) -> JSONResponse:
+    try:
+        payload = await _parse_json_request(request)
+        repo, pr = _extract_repo_pr(payload)
+        workspace, repo_slug, pr_id = _extract_repo_info(repo, pr)
+    except HTTPException:
+        telemetry.WEBHOOK_REQUESTS.inc(result='invalid')
+        raise
     logger.info(f"Received PR webhook: {workspace}/{repo_slug} PR#{pr_id} event={x_event_key}")
 
-    api = _make_api_with_context(workspace, repo_slug, pr_id)
-    diff = await _resolve_diff_from_payload(api, payload)
+    delivery_key = DeliveryDeduplicator.delivery_key(x_request_uuid, workspace, repo_slug, pr_id,
+                                                     payload, x_event_key)
+    if delivery_key and await asyncio.to_thread(deduplicator.check_and_mark, delivery_key):
+        logger.info(f"Duplicate delivery ignored: {delivery_key}")
+        telemetry.WEBHOOK_REQUESTS.inc(result='duplicate')
+        return JSONResponse({"status": "duplicate"})
+
+    try:
+        job = await job_queue.submit(ReviewJob(workspace=workspace, repo_slug=repo_slug, pr_id=str(pr_id),
+                                         payload=payload, event_key=x_event_key))
+    except QueueFullError as e:
+        logger.warning(f"Rejecting webhook for {workspace}/{repo_slug} PR#{pr_id}: {e}")
+        await _forget_delivery(delivery_key)
+        telemetry.WEBHOOK_REQUESTS.inc(result='rejected')
+        return JSONResponse({"status": "rejected", "detail": str(e)}, status_code=429,
+                            headers={"Retry-After": str(e.retry_after)})
+    except BaseException:
+        # the job was not stored (e.g. the job DB is locked): a redelivery must not count as duplicate
+        await _forget_delivery(delivery_key)
+        raise
+    logger.info(f"Queued review job {job.id}")
+    telemetry.WEBHOOK_REQUESTS.inc(result='queued')
+
+    return JSONResponse({"status": "queued", "job_id": job.id, "status_url": f"/jobs/{job.id}"},
+                        status_code=202)
 
-    review_text = _run_qa_review(payload, pr_id, diff)
 
-    posted = api.post_comment(review_text)
-    _post_inline_comments(api, review_text)
+async def _forget_delivery(delivery_key: Optional[str]) -> None:
+    """Let Bitbucket's redelivery of a delivery that was not queued through"""
+    if delivery_key:
+        await asyncio.to_thread(deduplicator.forget, delivery_key)
 
-    return JSONResponse({"status": "review_posted" if posted else "review_generated"})
+
+@app.get('/jobs/{job_id}')
+async def job_status(job_id: str):
+    job = await job_queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail='Unknown job id')
+    return JSONResponse(job.to_dict())
 
 
 @app.get('/health')
 async def health():
-    return JSONResponse({"status": "ok", "service": "ai-pr-reviewer", "qa_mode": Config.QA_MODE})
+    """Liveness, plus this worker's circuit breaker states and LLM routing stats for monitoring"""
+    return JSONResponse({"status": "ok", "service": "ai-pr-reviewer", "qa_mode": Config.QA_MODE,
+                         "breakers": breaker_states(), "providers": PROVIDER_STATS.snapshot()})
+
+
+@app.get('/metrics')
+async def metrics():
+    """Prometheus scrape endpoint (values are per worker process)
+
+    Rendered in a worker thread: the queue-depth gauge queries the job DB.
+    """
+    body = await asyncio.to_thread(telemetry.REGISTRY.render)
+    return Response(body, media_type=telemetry.CONTENT_TYPE)
+
+
+@app.get('/ready')
+async def ready():
+    """Readiness probe - fails until this worker's ReviewerEngine is warm"""
+    if _engine_task is None or not _engine_task.done():
+        return JSONResponse({"status": "warming"}, status_code=503)
+    error = 'cancelled' if _engine_task.cancelled() else _engine_task.exception()
+    if error:
+        return JSONResponse({"status": "failed", "detail": str(error)}, status_code=503)
+    return JSONResponse({"status": "ready"})
+
+
+async def _process_review(job: ReviewJob) -> str:
+    """Run a queued review: fetch diff, generate the QA review, post comments"""
+    await job_queue.set_stage(job, 'fetching_diff')
+    api = _make_api_with_context(job.workspace, job.repo_slug, job.pr_id)
+    pr = job.payload.get('pullrequest', {})
+    head = pr.get('source', {}).get('commit', {}).get('hash')
+    destination = pr.get('destination', {}).get('commit', {}).get('hash')
+    merge_base = await api.get_merge_base(head, destination) if Config.INCREMENTAL_REVIEW else None
+    incremental = await asyncio.to_thread(IncrementalReview, review_state, job.key, head, merge_base)
+    if incremental.unchanged:
+        logger.info(f"{job.key} already reviewed at {head[:12]}; nothing new to review")
+        return "review_unchanged"
+
+    diff, is_incremental = await _resolve_review_diff(api, job.payload, incremental)
+    early = EarlyInlinePoster(api)
+    try:
+        with diff:
+            if is_incremental and not diff:
+                logger.info(f"No reviewable changes since {incremental.base[:12]}")
+                incremental.advance()
+                await asyncio.to_thread(incremental.save)
+                return "review_unchanged"
+            await job_queue.set_stage(job, 'reviewing')
+            review_text = await _run_qa_review(job.payload, job.pr_id, diff, early.on_issues)
+            summary = await asyncio.to_thread(incremental.merge, review_text, diff, is_incremental)
+
+        await job_queue.set_stage(job, 'posting_comments')
+        await early.drain()
+    except BaseException:
+        # superseded, cancelled or failed: this revision must not keep posting
+        await early.cancel()
+        raise
+    posted = await ReviewPublisher().apublish(api, summary, review_text, incremental.scope)
+    if posted:
+        await asyncio.to_thread(incremental.save)
+
+    return "review_posted" if posted else "review_generated"
 
 
 async def _parse_json_request(request: Request) -> dict:
@@ -97,31 +255,29 @@ def _extract_repo_info(repo: dict, pr: dict):
     return workspace, repo_slug, pr_id
 
 
-async def _resolve_diff_from_payload(api: BitbucketAPI, payload: dict) -> str:
+async def _resolve_review_diff(api: AsyncBitbucketAPI, payload: dict,
+                               incremental: IncrementalReview) -> Tuple[DiffBuffer, bool]:
+    """The interdiff since the last reviewed head when possible, else the full diff"""
+    if incremental.base and payload.get('pullrequest', {}).get('links', {}).get('diff'):
+        diff = await api.get_interdiff(incremental.base, incremental.head)
+        if diff is not None:
+            return diff, True
+        logger.info("Interdiff unavailable - reviewing the full PR")
+    return await _resolve_diff_from_payload(api, payload), False
+
+
+async def _resolve_diff_from_payload(api: AsyncBitbucketAPI, payload: dict) -> DiffBuffer:
     if 'pullrequest' in payload and payload['pullrequest'].get('links', {}).get('diff'):
         try:
-            # run blocking network call in threadpool to avoid blocking the event loop
-            return await asyncio.to_thread(api.get_pr_diff)
+            return await api.get_pr_diff()
         except Exception as e:
             logger.warning(f"Failed to fetch diff via API: {e}")
-            return ''
-    return payload.get('diff') or payload.get('pullrequest', {}).get('description', '')
+            return DiffBuffer()
+    return DiffBuffer.from_text(payload.get('diff') or payload.get('pullrequest', {}).get('description', ''))
 
 
-def _run_qa_review(payload: dict, pr_id, diff: str) -> str:
-    engine = ReviewerEngine()
+async def _run_qa_review(payload: dict, pr_id, diff: DiffBuffer, on_issues=None) -> str:
+    engine = await _get_engine()
     title = payload.get('pullrequest', {}).get('title', f'PR {pr_id}')
     desc = payload.get('pullrequest', {}).get('description', '')
-    return engine.generate_review(title, desc, diff)
-
-
-def _post_inline_comments(api: BitbucketAPI, review_text: str) -> None:
-    extractor = QAIssueExtractor()
-    issues = extractor.extract_issues(review_text)
-    actionable = extractor.extract_high_medium_issues(issues)
-    if actionable and Config.ENABLE_QA_INLINE_COMMENTS:
-        grouped = extractor.group_issues_by_location(actionable)
-        for (file_path, line_num), issues_bucket in grouped.items():
-            for issue in issues_bucket:
-                comment = QAFormatter.format_inline_comment(issue)
-                api.post_inline_comment(file_path, line_num, comment)
+    return await engine.agenerate_review(title, desc, diff, on_issues)
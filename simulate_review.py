@@ -5,11 +5,7 @@ from bot.config import Config
 from bot.core.logger import ReviewLogger
 from bot.core.reviewer_engine import ReviewerEngine
 from bot.core.metrics_analyzer import MetricsAnalyzer
-
-def load_diff(path):
-    """Load diff from file"""
-    with open(path, 'r', encoding='utf-8') as f:
-        return f.read()
+from bot.core.diff_buffer import load_diff_file
 
 def main():
     # Setup logging
@@ -27,7 +23,7 @@ def main():
         sys.exit(1)
     
     logger.info(f"Loading diff from {path}")
-    diff = load_diff(path)
+    diff = load_diff_file(path)
     
     logger.info("QA Mode: ALWAYS ACTIVE")
     
@@ -49,6 +45,7 @@ def main():
     
     print("\n=== GENERATED REVIEW ===")
     print(review)
+    diff.close()
     
     logger.info("Review complete")
 
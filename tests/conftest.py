@@ -0,0 +1,16 @@
+import os
+import tempfile
+
+# Config reads the environment at import time: point every on-disk store at a
+# scratch directory and keep the bot offline before anything imports it.
+_CACHE_DIR = tempfile.mkdtemp(prefix='pr-review-tests-')
+os.environ.update({
+    'CACHE_DIR': _CACHE_DIR,
+    'HTTP_CACHE_DB': os.path.join(_CACHE_DIR, 'http_cache.db'),
+    'RATE_LIMIT_DB': os.path.join(_CACHE_DIR, 'rate_limits.db'),
+    'REVIEW_STATE_DB': os.path.join(_CACHE_DIR, 'review_state.db'),
+    'JOB_DB': os.path.join(_CACHE_DIR, 'jobs.db'),
+    'DEDUP_DB': os.path.join(_CACHE_DIR, 'deliveries.db'),
+    'DRY_RUN': 'false',
+    'RETRY_DELAY': '0',
+})
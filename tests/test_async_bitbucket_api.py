@@ -0,0 +1,120 @@
+import asyncio
+import httpx
+from bot.config import Config
+from bot.core import http_pool
+from bot.core.async_bitbucket_api import AsyncBitbucketAPI
+
+BASE = 'https://bitbucket.test/2.0/repositories/ws/repo'
+
+
+def _run_with_transport(handler, coro_factory):
+    async def main():
+        http_pool._async_clients[asyncio.get_running_loop()] = httpx.AsyncClient(
+            transport=httpx.MockTransport(handler))
+        try:
+            return await coro_factory()
+        finally:
+            await http_pool.aclose_all()
+    return asyncio.run(main())
+
+
+def _api(monkeypatch):
+    monkeypatch.setattr(Config, 'HTTP_CACHE', False)
+    api = AsyncBitbucketAPI()
+    api.base, api.pr_id = BASE, '7'
+    return api
+
+
+def test_diffstat_follows_redirect(monkeypatch):
+    api = _api(monkeypatch)
+    failures_before = api.breaker.failures
+    seen = []
+
+    def handler(request):
+        seen.append(request.url.path)
+        if request.url.path.endswith('/pullrequests/7/diffstat'):
+            return httpx.Response(302, headers={'Location': f"{BASE}/diffstat/abc..def"})
+        return httpx.Response(200, json={'values': [{'new': {'path': 'app.py'}, 'status': 'modified'}]})
+
+    entries = _run_with_transport(handler, api.get_diffstat)
+
+    assert entries == [{'new': {'path': 'app.py'}, 'status': 'modified'}]
+    assert seen == ['/2.0/repositories/ws/repo/pullrequests/7/diffstat', '/2.0/repositories/ws/repo/diffstat/abc..def']
+    assert api.breaker.failures == failures_before
+
+
+def test_client_error_is_not_retried(monkeypatch):
+    api = _api(monkeypatch)
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.path)
+        return httpx.Response(404, text='not found')
+
+    assert _run_with_transport(handler, api.get_diffstat) is None
+    assert len(calls) == 1
+
+
+def test_conditional_get_serves_cached_body(monkeypatch, tmp_path):
+    import threading
+    from bot.core import http_cache
+    monkeypatch.setattr(Config, 'HTTP_CACHE', True)
+    cache = http_cache.HttpResponseCache(str(tmp_path / 'http.db'))
+    monkeypatch.setattr(http_cache, '_cache', cache)
+    monkeypatch.setattr('bot.core.async_bitbucket_api.get_response_cache', lambda: cache)
+    cache_threads = []
+    for name in ('lookup', 'store', 'touch'):
+        original = getattr(cache, name)
+
+        def spy(*args, _original=original):
+            cache_threads.append(threading.get_ident())
+            return _original(*args)
+        monkeypatch.setattr(cache, name, spy)
+
+    api = AsyncBitbucketAPI()
+    api.base, api.pr_id = BASE, '7'
+    requests = []
+
+    def handler(request):
+        requests.append(request.headers.get('If-None-Match'))
+        if request.headers.get('If-None-Match') == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(200, json={'title': 'T', 'description': 'D'}, headers={'ETag': '"v1"'})
+
+    async def twice():
+        return [await api.get_pr_metadata(), await api.get_pr_metadata()], threading.get_ident()
+
+    (first, second), loop_thread = _run_with_transport(handler, twice)
+    assert first == second == ('T', 'D')
+    assert requests == [None, '"v1"']
+    assert len(cache_threads) == 4 and loop_thread not in cache_threads
+
+
+def test_dry_run_does_not_resolve_comments(monkeypatch):
+    api = _api(monkeypatch)
+    monkeypatch.setattr(Config, 'DRY_RUN', True)
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.path)
+        return httpx.Response(200, json={})
+
+    assert _run_with_transport(handler, lambda: api.resolve_comment(5)) is True
+    assert calls == []
+
+
+def test_post_is_not_retried_after_a_server_error(monkeypatch):
+    from bot.core.rate_limiter import TokenBucket
+    monkeypatch.setattr(Config, 'DRY_RUN', False)
+    api = _api(monkeypatch)
+    api.bucket, api.retry_delay = TokenBucket(1e9, 1e9), 0
+    calls = []
+
+    def handler(request):
+        calls.append(request.method)
+        return httpx.Response(503 if len(calls) < 3 else 200, json={})
+
+    assert _run_with_transport(handler, lambda: api.resolve_comment(5)) is False
+    assert calls == ['POST']
+    assert _run_with_transport(handler, lambda: api.update_comment(5, 'summary')) is True
+    assert calls == ['POST', 'PUT', 'PUT']
@@ -0,0 +1,68 @@
+import pytest
+import requests
+from bot.config import Config
+from bot.core import bitbucket_api, resilience
+from bot.core.bitbucket_api import BitbucketAPI
+from bot.core.rate_limiter import TokenBucket
+
+BASE = 'https://bitbucket.test/2.0/repositories/ws/repo'
+
+
+class _Session:
+    """Answers every request with the next status code"""
+
+    def __init__(self, *statuses):
+        self.statuses = list(statuses)
+        self.calls = []
+
+    def _respond(self, method, url):
+        self.calls.append(method)
+        resp = requests.Response()
+        resp.status_code, resp.url, resp._content = self.statuses.pop(0), url, b'{}'
+        return resp
+
+    def get(self, url, **kwargs):
+        return self._respond('GET', url)
+
+    def post(self, url, **kwargs):
+        return self._respond('POST', url)
+
+    def put(self, url, **kwargs):
+        return self._respond('PUT', url)
+
+
+@pytest.fixture
+def api(monkeypatch):
+    monkeypatch.setattr(resilience, '_breakers', {})
+    for name, value in {'HTTP_CACHE': False, 'DRY_RUN': False, 'MAX_RETRIES': 3, 'RETRY_DELAY': 0}.items():
+        monkeypatch.setattr(Config, name, value)
+    api = BitbucketAPI()
+    api.base, api.pr_id = BASE, '7'
+    api.bucket = TokenBucket(1e9, 1e9)
+    return api
+
+
+def _serve(monkeypatch, *statuses):
+    session = _Session(*statuses)
+    monkeypatch.setattr(bitbucket_api, 'get_session', lambda token: session)
+    return session
+
+
+@pytest.mark.parametrize('method', ['GET', 'PUT'])
+def test_idempotent_requests_are_retried_after_a_server_error(api, monkeypatch, method):
+    session = _serve(monkeypatch, 502, 200)
+    assert api._make_request(method, f"{BASE}/pullrequests/7") == {}
+    assert session.calls == [method, method]
+
+
+def test_post_is_not_retried_after_a_server_error(api, monkeypatch):
+    session = _serve(monkeypatch, 500, 200)
+    assert api.resolve_comment(5) is False
+    assert session.calls == ['POST']
+    assert api.breaker.failures == 1
+
+
+def test_client_error_is_final(api, monkeypatch):
+    session = _serve(monkeypatch, 404, 200)
+    assert api._make_request('GET', f"{BASE}/pullrequests/7") is None
+    assert session.calls == ['GET']
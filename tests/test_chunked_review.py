@@ -0,0 +1,132 @@
+import asyncio
+import re
+import threading
+import types
+import pytest
+from bot.config import Config
+from bot.core.chunked_review import ReviewReducer, chunk_files, file_hunks, split_diff
+from bot.core import reviewer_engine
+from bot.core.reviewer_engine import ReviewerEngine
+
+
+def _file(name, hunks, lines=15):
+    text = f"diff --git a/{name} b/{name}\n--- a/{name}\n+++ b/{name}\n"
+    for h in range(hunks):
+        text += f"@@ -{h * 20 + 1},{lines} +{h * 20 + 1},{lines} @@\n"
+        text += ''.join(f"+line {h}-{i} of {name} xxxxxxxxxxxx\n" for i in range(lines))
+    return text
+
+
+DIFF = _file('a.py', 1) + _file('big.py', 12) + _file('c.py', 2) + _file('huge.py', 1, lines=120)
+
+
+def test_file_hunks_groups_by_file():
+    files = list(file_hunks(DIFF.splitlines(keepends=True)))
+    assert [len(hunks) for _, hunks in files] == [1, 12, 2, 1]
+    assert files[1][0].startswith('diff --git a/big.py')
+
+
+def test_split_diff_is_lazy():
+    consumed = []
+
+    def lines():
+        for line in DIFF.splitlines(keepends=True):
+            consumed.append(line)
+            yield line
+
+    chunks = split_diff(lines(), 2000)
+    first = next(chunks)
+    assert len(consumed) < len(DIFF.splitlines())
+    assert first.startswith('diff --git a/a.py')
+
+
+def test_split_diff_keeps_every_line_under_valid_headers():
+    chunks = list(split_diff(DIFF.splitlines(keepends=True), 2000))
+    assert len(chunks) > 3
+    assert all(c.startswith('diff --git') for c in chunks)
+    assert all(len(c) <= 2000 + 200 for c in chunks)  # a cut file repeats its header
+    assert ''.join(chunks).count('+line') == DIFF.count('+line')
+    assert chunk_files(chunks[-1]) == ['huge.py']
+
+
+def test_reducer_dedupes_findings_and_reports_failed_parts():
+    part = "### QA Summary\nok\n### Bugs Detected\n- (HIGH) `a.py:3` Null deref in handler\n" \
+           "### Final Recommendation\n{verdict}\n"
+    reviews = [part.format(verdict='Approve'), part.format(verdict='Request Changes'), '[Groq Error] 503']
+    merged = ReviewReducer().merge(reviews, [['a.py'], ['b.py'], ['c.py']])
+    assert merged.count('Null deref in handler') == 1
+    assert '**Part 3** could not be reviewed: [Groq Error] 503' in merged
+    assert '**Request Changes**' in merged
+
+
+class _PartModel:
+    provider = 'fake'
+
+    def __init__(self):
+        self.parts = []
+
+    def review(self, prompt):
+        part = re.search(r'\(part (\d+)\)', prompt).group(1)
+        self.parts.append(int(part))
+        return f"### QA Summary\nPart {part}\n### Bugs Detected\n- (MEDIUM) `big.py:{part}` Bug {part}\n"
+
+    async def areview(self, prompt):
+        await asyncio.sleep(0)
+        return self.review(prompt)
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    for name, value in {'GROQ_PROMPT_TOKENS': 1500, 'GEMINI_PROMPT_TOKENS': 1500, 'ENABLE_CACHING': False,
+                        'MINIMIZE_PROMPT': False, 'REVIEW_MAX_CHUNKS': 4}.items():
+        monkeypatch.setattr(Config, name, value)
+    engine = ReviewerEngine()
+    model = _PartModel()
+    engine.router.choose_model = lambda *args: model
+    engine.router.diff_capacity = types.MethodType(lambda self, overhead=0: 2000, engine.router)
+    return engine, model
+
+
+def test_parts_are_capped_and_merged(engine):
+    engine, model = engine
+    review = engine.generate_review('T', 'D', DIFF)
+    assert sorted(model.parts) == [1, 2, 3, 4]
+    assert '`big.py:4` Bug 4' in review and 'Large PR reviewed in 4 parts' in review
+
+
+def test_async_parts_report_issues_as_they_finish(engine):
+    engine, model = engine
+    seen = []
+
+    async def on_issues(issues):
+        seen.append(len(issues))
+
+    review = asyncio.run(engine.agenerate_review('T', 'D', DIFF, on_issues))
+    assert seen == [1, 1, 1, 1]
+    assert 'Large PR reviewed in 4 parts' in review
+
+
+def test_async_parts_are_split_and_prompted_off_the_loop(engine, monkeypatch):
+    engine, model = engine
+    threads = {'split': set(), 'prompt': set()}
+    split, chunk_prompt = reviewer_engine.split_diff, engine._chunk_prompt
+
+    def recording_split(*args):
+        for chunk in split(*args):
+            threads['split'].add(threading.get_ident())
+            yield chunk
+
+    def recording_prompt(*args):
+        threads['prompt'].add(threading.get_ident())
+        return chunk_prompt(*args)
+
+    monkeypatch.setattr(reviewer_engine, 'split_diff', recording_split)
+    monkeypatch.setattr(engine, '_chunk_prompt', recording_prompt)
+
+    async def main():
+        return threading.get_ident(), await engine.agenerate_review('T', 'D', DIFF)
+
+    loop_thread, review = asyncio.run(main())
+    assert 'Large PR reviewed in 4 parts' in review
+    assert threads['split'] and loop_thread not in threads['split']
+    assert threads['prompt'] and loop_thread not in threads['prompt']
@@ -0,0 +1,66 @@
+from bot.core.comment_fingerprint import (BotComments, finding_fingerprint, fingerprint_of, normalize_title,
+                                          tag_finding, tag_summary)
+from bot.core.incremental_review import ReviewScope
+from bot.core.qa_formatter import QAIssue
+
+DELTA = """diff --git a/app.py b/app.py
+--- a/app.py
++++ b/app.py
+@@ -10,3 +10,5 @@ def load():
+     data = read()
++    check(data)
++    log(data)
+     return data
+"""
+
+
+def _issue(title='Exception is swallowed', line=12):
+    return QAIssue(title=title, description='', severity='HIGH', category='bug', file_path='app.py', line_number=line)
+
+
+def _comment(cid, fingerprint, line, path='app.py', **extra):
+    return {'id': cid, 'content': {'raw': tag_finding('finding', fingerprint)},
+            'inline': {'path': path, 'to': line}, **extra}
+
+
+def test_fingerprint_ignores_rewording_punctuation():
+    assert normalize_title('Exception  is swallowed!') == 'exception is swallowed'
+    assert finding_fingerprint(_issue('Exception is swallowed.')) == finding_fingerprint(_issue('exception IS swallowed'))
+    assert finding_fingerprint(_issue(line=12)) != finding_fingerprint(_issue(line=13))
+
+
+def test_from_comments_finds_markers():
+    comments = [{'id': 1, 'content': {'raw': tag_summary('old summary')}},
+                {'id': 4, 'content': {'raw': tag_summary('new summary')}},
+                _comment(2, 'aa11', 12),
+                _comment(3, 'bb22', 30, resolution={'type': 'resolved'}),
+                {'id': 5, 'content': {'raw': 'a human comment'}},
+                {'id': 6, 'content': {'raw': tag_finding('gone', 'cc33')}, 'deleted': True}]
+    found = BotComments.from_comments(comments)
+    assert found.summary_id == 4
+    assert found.findings == {'aa11': 2, 'bb22': 3}
+    assert found.lines == {'aa11': 12, 'bb22': 30}
+    assert found.resolved == {'bb22'}
+    assert found.is_posted(tag_finding('x', 'aa11')) and fingerprint_of('no marker') is None
+
+
+def test_full_review_resolves_every_unreported_finding():
+    found = BotComments.from_comments([_comment(1, 'aa11', 11), _comment(2, 'bb22', 40)])
+    assert found.fixed({'bb22'}) == [1]
+
+
+def test_incremental_review_resolves_only_what_it_re_examined():
+    comments = [_comment(1, 'aa11', 11),  # inside the changed hunk
+                _comment(2, 'bb22', 40),  # same file, untouched
+                _comment(3, 'cc33', 45),  # untouched, but reported again at its moved line
+                _comment(4, 'dd44', 11, path='other.py')]
+    scope = ReviewScope.from_diff(DELTA.splitlines(keepends=True), [_issue('reworded', line=47)])
+    found = BotComments.from_comments(comments)
+    assert found.fixed(set(), scope.covers) == [1, 3]
+
+
+def test_scope_maps_lines_past_the_delta():
+    scope = ReviewScope.from_diff(DELTA.splitlines(keepends=True))
+    assert scope.moved('app.py', 5) == 5
+    assert scope.moved('app.py', 40) == 42
+    assert scope.covers('app.py', None) and not scope.covers('other.py', None)
@@ -0,0 +1,113 @@
+import asyncio
+import pytest
+from bot.config import Config
+from bot.core import resilience
+from bot.core.comment_fingerprint import tag_finding
+from bot.core.comment_poster import InlineCommentPoster
+
+TEXT = tag_finding("**MEDIUM** Null dereference", '0123456789abcdef')
+
+
+class _Bucket:
+    def __init__(self):
+        self.pauses = []
+
+    def pause(self, seconds):
+        self.pauses.append(seconds)
+
+    async def pause_async(self, seconds):
+        self.pauses.append(seconds)
+
+
+class _Api:
+    """Scripted Bitbucket: each POST returns the next (status, retry_after)"""
+
+    def __init__(self, *responses, listed=()):
+        self.responses = list(responses)
+        self.listed = list(listed)
+        self.posts = 0
+        self.listings = 0
+
+    def submit_inline_comment(self, file_path, line_number, text):
+        self.posts += 1
+        return self.responses.pop(0)
+
+    def list_comments(self):
+        self.listings += 1
+        return self.listed
+
+
+class _AsyncApi(_Api):
+    async def submit_inline_comment(self, *args):
+        return super().submit_inline_comment(*args)
+
+    async def list_comments(self):
+        return super().list_comments()
+
+
+@pytest.fixture(autouse=True)
+def fresh_breaker(monkeypatch):
+    monkeypatch.setattr(resilience, '_breakers', {})
+
+
+def _post(api, mode, bucket=None, max_retries=3):
+    poster = InlineCommentPoster(bucket=bucket or _Bucket(), concurrency=2, max_retries=max_retries,
+                                 retry_delay=0)
+    if mode == 'async':
+        api.__class__ = _AsyncApi
+        [result] = asyncio.run(poster.apost_all(api, [('app.py', 3, TEXT)]))
+    else:
+        [result] = poster.post_all(api, [('app.py', 3, TEXT)])
+    return result
+
+
+@pytest.mark.parametrize('mode', ['sync', 'async'])
+def test_429_pauses_the_bucket_then_retries(mode):
+    bucket, api = _Bucket(), _Api((429, 7.5), (201, None))
+    result = _post(api, mode, bucket)
+    assert result.posted and result.attempts == 2 and api.posts == 2
+    assert bucket.pauses == [7.5]
+    assert api.listings == 0  # a 429 created nothing; no need to look
+
+
+@pytest.mark.parametrize('mode', ['sync', 'async'])
+def test_gives_up_after_max_retries(mode):
+    api = _Api((503, None), (503, None), (503, None), (201, None))
+    result = _post(api, mode)
+    assert not result.posted and result.attempts == 3 and result.status_code == 503
+    assert api.posts == 3
+
+
+@pytest.mark.parametrize('mode', ['sync', 'async'])
+@pytest.mark.parametrize('status', [0, 502])
+def test_ambiguous_failure_that_created_the_comment_is_not_reposted(mode, status):
+    existing = [{'id': 9, 'content': {'raw': TEXT}, 'inline': {'path': 'app.py', 'to': 3}}]
+    api = _Api((status, None), (201, None), listed=existing)
+    result = _post(api, mode)
+    assert result.posted and api.posts == 1 and api.listings == 1
+
+
+@pytest.mark.parametrize('mode', ['sync', 'async'])
+def test_ambiguous_failure_that_created_nothing_is_retried(mode):
+    api = _Api((0, None), (201, None), listed=[])
+    result = _post(api, mode)
+    assert result.posted and api.posts == 2
+
+
+@pytest.mark.parametrize('mode', ['sync', 'async'])
+def test_client_errors_are_final(mode):
+    api = _Api((400, None), (201, None))
+    result = _post(api, mode)
+    assert not result.posted and api.posts == 1 and api.listings == 0
+
+
+def test_open_breaker_stops_retrying():
+    breaker = resilience.get_breaker('bitbucket')
+    breaker.failure_threshold = 1
+    breaker.record_failure()
+    api = _Api((503, None), (201, None), listed=[])
+    assert not _post(api, 'sync').posted and api.posts == 1
+
+
+def test_default_bitbucket_rate_fits_the_hourly_quota():
+    assert Config.BITBUCKET_RATE_PER_SEC * 3600 <= Config.BITBUCKET_HOURLY_LIMIT
@@ -0,0 +1,62 @@
+import threading
+import time
+from bot.core.delivery_dedup import DeliveryDeduplicator
+
+
+def test_second_delivery_is_duplicate(tmp_path):
+    dedup = DeliveryDeduplicator(str(tmp_path / 'd.db'))
+    assert dedup.check_and_mark('uuid:1') is False
+    assert dedup.check_and_mark('uuid:1') is True
+    assert dedup.check_and_mark('uuid:2') is False
+
+
+def test_expired_delivery_is_processed_again(tmp_path):
+    dedup = DeliveryDeduplicator(str(tmp_path / 'd.db'), ttl=60)
+    assert dedup.check_and_mark('uuid:1') is False
+    real = time.time
+    try:
+        time.time = lambda: real() + 120
+        assert dedup.check_and_mark('uuid:1') is False
+        assert dedup.check_and_mark('uuid:1') is True
+    finally:
+        time.time = real
+
+
+def test_forget_lets_redelivery_through(tmp_path):
+    dedup = DeliveryDeduplicator(str(tmp_path / 'd.db'))
+    dedup.check_and_mark('uuid:1')
+    dedup.forget('uuid:1')
+    assert dedup.check_and_mark('uuid:1') is False
+
+
+def test_concurrent_workers_process_once(tmp_path):
+    db = str(tmp_path / 'd.db')
+    workers = [DeliveryDeduplicator(db) for _ in range(8)]
+    results, barrier = [], threading.Barrier(len(workers))
+
+    def receive(dedup):
+        barrier.wait()
+        results.append(dedup.check_and_mark('uuid:race'))
+
+    threads = [threading.Thread(target=receive, args=(d,)) for d in workers]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sorted(results) == [False] + [True] * 7
+
+
+def test_cap_evicts_least_recently_seen(tmp_path):
+    dedup = DeliveryDeduplicator(str(tmp_path / 'd.db'), max_entries=2)
+    for key in ('a', 'b', 'c'):
+        dedup.check_and_mark(key)
+        time.sleep(0.01)
+    assert dedup.check_and_mark('a') is False
+
+
+def test_delivery_key_falls_back_to_head_commit():
+    payload = {'pullrequest': {'source': {'commit': {'hash': 'abc'}}}}
+    assert DeliveryDeduplicator.delivery_key('u-1', 'ws', 'repo', 7, payload, 'pullrequest:updated') == 'uuid:u-1'
+    assert (DeliveryDeduplicator.delivery_key(None, 'ws', 'repo', 7, payload, 'pullrequest:updated')
+            == 'pr:ws/repo/7:abc:pullrequest:updated')
+    assert DeliveryDeduplicator.delivery_key(None, 'ws', 'repo', 7, {}, None) is None
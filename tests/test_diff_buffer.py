@@ -0,0 +1,69 @@
+import asyncio
+import httpx
+import pytest
+from bot.config import Config
+from bot.core import http_pool
+from bot.core.async_bitbucket_api import AsyncBitbucketAPI
+from bot.core.diff_buffer import DiffBuffer, DiffTooLargeError, check_content_length, load_diff_file
+
+
+def test_buffer_spills_to_disk_past_the_memory_limit():
+    with DiffBuffer(memory_limit=16, max_bytes=1024) as buf:
+        buf.write(b"+line one\n")
+        assert not buf.spilled
+        buf.write(b"+line two\n")
+        assert buf.spilled and len(buf) == 20
+        assert list(buf) == ["+line one\n", "+line two\n"]
+        assert (buf.head(5), buf.tail(9)) == ("+line", "line two\n")
+
+
+def test_write_past_the_cap_raises_and_keeps_what_fit():
+    with DiffBuffer(memory_limit=8, max_bytes=10) as buf:
+        buf.write(b"0123456789")
+        with pytest.raises(DiffTooLargeError):
+            buf.write(b"x")
+        assert buf.text() == "0123456789"
+
+
+def test_announced_length_is_checked_before_download():
+    check_content_length(None, 10)
+    check_content_length('10', 10)
+    check_content_length('chunked', 10)
+    with pytest.raises(DiffTooLargeError):
+        check_content_length('11', 10)
+
+
+def test_load_diff_file_reads_in_chunks(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, 'DIFF_CHUNK_SIZE', 4)
+    path = tmp_path / 'pr.diff'
+    path.write_text("diff --git a/x b/x\n+é\n", encoding='utf-8')
+    with load_diff_file(str(path)) as buf:
+        assert buf.text() == "diff --git a/x b/x\n+é\n"
+
+    monkeypatch.setattr(Config, 'DIFF_MAX_BYTES', 8)
+    with pytest.raises(DiffTooLargeError):
+        load_diff_file(str(path))
+
+
+def test_oversized_diff_is_rejected_from_its_content_length(monkeypatch):
+    monkeypatch.setattr(Config, 'SELECTIVE_DIFF', False)
+    monkeypatch.setattr(Config, 'DIFF_MAX_BYTES', 100)
+    monkeypatch.setattr(Config, 'HTTP_CACHE', False)
+    api = AsyncBitbucketAPI()
+    api.base, api.pr_id = 'https://bitbucket.test/2.0/repositories/ws/repo', '7'
+    streamed = []
+
+    async def body():
+        streamed.append(1)
+        yield b"+" * 200
+
+    async def main():
+        http_pool._async_clients[asyncio.get_running_loop()] = httpx.AsyncClient(transport=httpx.MockTransport(
+            lambda request: httpx.Response(200, headers={'Content-Length': '200'}, content=body())))
+        try:
+            return await api.get_pr_diff()
+        finally:
+            await http_pool.aclose_all()
+
+    buf = asyncio.run(main())
+    assert len(buf) == 0 and streamed == []
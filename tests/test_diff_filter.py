@@ -0,0 +1,51 @@
+from bot.config import Config
+from bot.core.diff_filter import DiffPathFilter, matches_globs, parse_globs
+
+
+def _entry(path, added=1, removed=0, status='modified'):
+    side = {'path': path}
+    if status == 'removed':
+        return {'old': side, 'new': None, 'status': status, 'lines_added': 0, 'lines_removed': removed}
+    return {'new': side, 'status': status, 'lines_added': added, 'lines_removed': removed}
+
+
+def test_globs_match_the_path_or_the_file_name():
+    assert parse_globs(' *.lock, ,vendor/* ') == ['*.lock', 'vendor/*']
+    assert parse_globs('') == []
+    assert matches_globs('web/yarn.lock', ['*.lock'])
+    assert matches_globs('vendor/lib/x.go', ['vendor/*'])
+    assert not matches_globs('src/vendor.py', ['vendor/*'])
+
+
+def test_include_and_exclude_globs():
+    entries = [_entry('src/app.py'), _entry('src/app_pb2.py'), _entry('docs/guide.md'),
+               _entry('src/old.py', removed=3, status='removed')]
+    selection = DiffPathFilter(include=['src/*'], exclude=['*_pb2.py'], max_file_lines=0).select(entries)
+    assert selection.paths == ['src/app.py', 'src/old.py']
+    assert selection.skipped == [('src/app_pb2.py', 'excluded'), ('docs/guide.md', 'not included')]
+
+
+def test_bulk_changes_and_pathless_entries_are_skipped():
+    entries = [_entry('big.sql', added=1500, removed=600), _entry('small.py'), {'status': 'modified'},
+               _entry('small.py')]
+    selection = DiffPathFilter(include=[], exclude=[], max_file_lines=2000).select(entries)
+    assert selection.paths == ['small.py']
+    assert selection.skipped == [('big.sql', '2100 lines changed'), ('', 'no path')]
+
+
+def test_default_excludes_drop_lockfiles_and_vendored_code():
+    paths = ['package-lock.json', 'web/dist/app.js', 'app.min.js', 'pkg/vendor/x.go', 'app.py']
+    assert DiffPathFilter().select([_entry(p) for p in paths]).paths == ['app.py']
+
+
+def test_nothing_filtered_fetches_the_full_diff():
+    assert DiffPathFilter(include=[], exclude=['*.lock']).request_batches([_entry('a.py'), _entry('b.py')]) == [None]
+
+
+def test_selected_paths_are_batched_per_request(monkeypatch):
+    monkeypatch.setattr(Config, 'DIFF_PATHS_PER_REQUEST', 2)
+    entries = [_entry(f"f{i}.py") for i in range(5)] + [_entry('poetry.lock')]
+    batches = DiffPathFilter(include=[], exclude=['*.lock']).request_batches(entries)
+    assert batches == [[('path', 'f0.py'), ('path', 'f1.py')], [('path', 'f2.py'), ('path', 'f3.py')],
+                       [('path', 'f4.py')]]
+    assert len(DiffPathFilter(include=[], exclude=['*.lock']).request_batches(entries, batch_size=10)) == 1
@@ -0,0 +1,105 @@
+from bot.core.diff_buffer import DiffBuffer
+from bot.core.diff_minimizer import DiffMinimizer
+from bot.core.reviewer_engine import ReviewerEngine
+
+CHANGE = """diff --git a/app.py b/app.py
+index 1111111..2222222 100644
+--- a/app.py
++++ b/app.py
+@@ -1,9 +1,9 @@ def main():
+ one
+ two
+ three
+-name = 'café'
++name = 'naïve café'
+ five
+ six
+ seven
+ eight
+"""
+WHITESPACE = """diff --git a/style.js b/style.js
+--- a/style.js
++++ b/style.js
+@@ -1,2 +1,2 @@
+-if (x) { y(); }
++if (x)  {  y();  }
+"""
+RENAME = """diff --git a/old.py b/new.py
+similarity index 100%
+rename from old.py
+rename to new.py
+"""
+BINARY = """diff --git a/logo.png b/logo.png
+Binary files a/logo.png and b/logo.png differ
+"""
+GENERATED = """diff --git a/package-lock.json b/package-lock.json
+--- a/package-lock.json
++++ b/package-lock.json
+@@ -1 +1 @@
+-{"v": 1}
++{"v": 2}
+"""
+DIFF = CHANGE + WHITESPACE + RENAME + BINARY + GENERATED
+
+
+def test_minimize_trims_context_and_drops_noise():
+    text, stats = DiffMinimizer(context_lines=1).minimize(DIFF)
+    assert 'index 1111111' not in text
+    assert '@@ -3,3 +3,3 @@ def main():\n three\n' in text
+    assert ' one\n' not in text and ' six\n' not in text
+    assert 'style.js' not in text.split('# omitted:')[0]
+    assert '# binary file changed; contents omitted' in text
+    assert '# generated file changed; contents omitted' in text
+    assert text.endswith('# omitted: style.js (whitespace-only), old.py -> new.py (rename-only)\n')
+    assert stats.dropped == {'binary': 1, 'generated': 1, 'rename-only': 1, 'whitespace-only hunks': 1}
+
+
+def test_minimize_keeps_indentation_changes_where_it_is_syntax():
+    reindent = CHANGE.replace("-name = 'café'\n+name = 'naïve café'\n", "-    x = 1\n+        x = 1\n")
+    text, stats = DiffMinimizer(context_lines=1).minimize(reindent)
+    assert '+        x = 1' in text
+    assert not stats.dropped
+
+
+def test_minimize_streams_a_buffer_into_a_new_buffer():
+    minimizer = DiffMinimizer(context_lines=1)
+    expected, str_stats = minimizer.minimize(DIFF)
+    with DiffBuffer(memory_limit=64) as source:
+        source.write(DIFF.encode('utf-8'))
+        assert source.spilled
+        minimized, stats = minimizer.minimize(source)
+        with minimized:
+            assert isinstance(minimized, DiffBuffer) and minimized is not source
+            assert minimized.text() == expected
+    # non-ASCII lines: both sizes are characters, whatever the input type
+    assert (stats.chars_before, stats.chars_after) == (len(DIFF), len(expected))
+    assert (stats.chars_before, stats.chars_after) == (str_stats.chars_before, str_stats.chars_after)
+    assert 'chars (-' in stats.describe()
+
+
+def test_engine_closes_the_minimized_buffer(monkeypatch):
+    engine = ReviewerEngine()
+    engine.minimizer = DiffMinimizer(context_lines=1)
+    engine.cache = None
+    made = []
+    minimize = engine.minimizer.minimize
+
+    def spy(diff):
+        result = minimize(diff)
+        made.append(result[0])
+        return result
+
+    monkeypatch.setattr(engine.minimizer, 'minimize', spy)
+    monkeypatch.setattr(engine, '_chunks', lambda *a: None)
+    monkeypatch.setattr(engine, '_prepare', lambda *a: (_Model(), 'prompt'))
+    with DiffBuffer.from_text(DIFF) as diff:
+        engine.generate_review('T', 'D', diff)
+        assert made and made[0]._file.closed
+        assert not diff._file.closed
+
+
+class _Model:
+    provider = 'fake'
+
+    def review(self, prompt):
+        return "### QA Summary\nFine\n### Final Recommendation\nApprove\n"
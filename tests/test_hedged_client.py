@@ -0,0 +1,91 @@
+import asyncio
+import time
+import pytest
+from bot.config import Config
+from bot.core.model_router import ModelRouter
+from bot.models.hedged_client import HedgedClient, is_good_review
+
+
+class FakeClient:
+    def __init__(self, provider, text, seconds=0.0):
+        self.provider, self.text, self.seconds, self.calls = provider, text, seconds, 0
+        self.api_key = 'key'
+
+    def review(self, prompt):
+        self.calls += 1
+        time.sleep(self.seconds)
+        return self.text
+
+    async def areview(self, prompt):
+        self.calls += 1
+        await asyncio.sleep(self.seconds)
+        return self.text
+
+
+@pytest.fixture(autouse=True)
+def short_delay(monkeypatch):
+    monkeypatch.setattr(Config, 'HEDGE_DELAY', 0.05)
+    monkeypatch.setattr(Config, 'HEDGE_MIN_SAMPLES', 10 ** 6)
+
+
+def _run(client, mode):
+    return client.review('p') if mode == 'sync' else asyncio.run(client.areview('p'))
+
+
+@pytest.mark.parametrize('mode', ['sync', 'async'])
+def test_fast_primary_is_not_hedged(mode):
+    primary, secondary = FakeClient('groq', 'good'), FakeClient('gemini', 'other')
+    assert _run(HedgedClient(primary, secondary), mode) == 'good'
+    assert secondary.calls == 0
+
+
+@pytest.mark.parametrize('mode', ['sync', 'async'])
+def test_slow_primary_is_hedged(mode):
+    primary, secondary = FakeClient('groq', 'slow', 0.5), FakeClient('gemini', 'fast')
+    assert _run(HedgedClient(primary, secondary), mode) == 'fast'
+
+
+@pytest.mark.parametrize('mode', ['sync', 'async'])
+def test_primary_failing_fast_falls_over_to_secondary(mode):
+    primary, secondary = FakeClient('groq', '[Groq Error] 503'), FakeClient('gemini', 'rescued')
+    assert _run(HedgedClient(primary, secondary), mode) == 'rescued'
+
+
+@pytest.mark.parametrize('mode', ['sync', 'async'])
+def test_both_failing_returns_primary_error(mode):
+    primary, secondary = FakeClient('groq', '[Groq Error] 503'), FakeClient('gemini', '[Gemini Error] 500')
+    assert _run(HedgedClient(primary, secondary), mode) == '[Groq Error] 503'
+
+
+def test_is_good_review():
+    assert is_good_review('### QA Summary')
+    assert not is_good_review('') and not is_good_review('[Stub Error] x') and not is_good_review('[Review Error] x')
+
+
+def test_router_hedges_only_where_the_prompt_fits(monkeypatch):
+    monkeypatch.setenv('MODEL_PROVIDER', 'gemini')
+    for name, value in {'HEDGE_REQUESTS': True, 'LLM_FAILOVER': False,
+                        'GEMINI_PROMPT_TOKENS': 32000, 'GROQ_PROMPT_TOKENS': 6000}.items():
+        monkeypatch.setattr(Config, name, value)
+    router = ModelRouter()
+    router.gemini, router.groq = FakeClient('gemini', 'g'), FakeClient('groq', 'q')
+
+    small = router.choose_model('x' * 1000)
+    assert isinstance(small, HedgedClient) and small.secondary is router.groq
+    assert router.choose_model('x' * 60000) is router.gemini
+
+
+def test_failover_skips_the_provider_the_hedge_already_tried(monkeypatch):
+    monkeypatch.setenv('MODEL_PROVIDER', 'auto')
+    for name, value in {'HEDGE_REQUESTS': True, 'LLM_FAILOVER': True, 'ADAPTIVE_ROUTING': True,
+                        'ROUTING_MIN_SAMPLES': 10 ** 6, 'MAX_DIFF_CHARS': 0,
+                        'GEMINI_PROMPT_TOKENS': 32000, 'GROQ_PROMPT_TOKENS': 6000}.items():
+        monkeypatch.setattr(Config, name, value)
+    router = ModelRouter()
+    router.groq = FakeClient('groq', '[Groq Error] 503')
+    router.gemini = FakeClient('gemini', '[Gemini Error] 500')
+
+    model = router.choose_model('x' * 1000)
+    assert isinstance(model, HedgedClient) and model.secondary is router.gemini
+    assert model.review('p') == '[Groq Error] 503'
+    assert (router.groq.calls, router.gemini.calls) == (1, 1)
@@ -0,0 +1,100 @@
+import pytest
+from bot.config import Config
+from bot.core.comment_builder import FailedReview
+from bot.core.incremental_review import IncrementalReview, ReviewState, ReviewStateStore
+from bot.core.qa_formatter import QAIssue
+
+REVIEW = """### Bugs Detected
+- (HIGH) `app.py:12` Exception is swallowed
+"""
+
+DELTA = """diff --git a/app.py b/app.py
+--- a/app.py
++++ b/app.py
+@@ -10,3 +10,5 @@ def load():
+     data = read()
++    check(data)
++    log(data)
+     return data
+"""
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, 'INCREMENTAL_REVIEW', True)
+    return ReviewStateStore(str(tmp_path / 'state.db'))
+
+
+def _issue(path, line, title='Old finding'):
+    return QAIssue(title=title, description='', severity='MEDIUM', category='bug', file_path=path, line_number=line)
+
+
+def _seed(store, issues, merge_base='mb1'):
+    store.save('ws/repo/1', ReviewState(head='old', issues=issues, merge_base=merge_base))
+
+
+def test_first_review_records_head_and_findings(store):
+    review = IncrementalReview(store, 'ws/repo/1', 'new', 'mb1')
+    assert review.base is None
+    assert review.merge(REVIEW, None, False) == REVIEW
+    review.save()
+    state = store.get('ws/repo/1')
+    assert (state.head, state.merge_base) == ('new', 'mb1')
+    assert [(i.file_path, i.line_number) for i in state.issues] == [('app.py', 12)]
+
+
+def test_same_head_is_unchanged(store):
+    _seed(store, [])
+    review = IncrementalReview(store, 'ws/repo/1', 'old', 'mb1')
+    assert review.unchanged and review.base is None
+
+
+def test_incremental_merge_carries_findings_outside_the_delta(store):
+    _seed(store, [_issue('app.py', 11), _issue('app.py', 40), _issue('other.py', 5)])
+    review = IncrementalReview(store, 'ws/repo/1', 'new', 'mb1')
+    assert review.base == 'old'
+
+    summary = review.merge(REVIEW, DELTA.splitlines(keepends=True), True)
+    review.save()
+
+    assert "`app.py:42` Old finding" in summary and "`other.py:5` Old finding" in summary
+    assert "`app.py:11`" not in summary
+    state = store.get('ws/repo/1')
+    assert sorted((i.file_path, i.line_number) for i in state.issues) == [('app.py', 12), ('app.py', 42),
+                                                                          ('other.py', 5)]
+
+
+@pytest.mark.parametrize('text', [FailedReview("Error generating review: boom"),
+                                  FailedReview("## Automated AI Code Review\n[Gemini Error] quota")])
+def test_failed_review_keeps_previous_state(store, text):
+    _seed(store, [_issue('app.py', 40)])
+    review = IncrementalReview(store, 'ws/repo/1', 'new', 'mb1')
+    assert review.merge(text, DELTA.splitlines(keepends=True), True) == text
+    review.save()
+    assert store.get('ws/repo/1').head == 'old'
+
+
+@pytest.mark.parametrize('merge_base', ['mb2', None])
+def test_moved_or_unknown_merge_base_forces_full_review(store, merge_base):
+    _seed(store, [_issue('app.py', 40)])
+    assert IncrementalReview(store, 'ws/repo/1', 'new', merge_base).base is None
+
+
+def test_advance_keeps_findings(store):
+    _seed(store, [_issue('app.py', 40)])
+    review = IncrementalReview(store, 'ws/repo/1', 'new', 'mb1')
+    review.advance()
+    review.save()
+    state = store.get('ws/repo/1')
+    assert state.head == 'new' and len(state.issues) == 1
+
+
+def test_store_adds_merge_base_column_to_old_databases(tmp_path):
+    import sqlite3
+    db = str(tmp_path / 'old.db')
+    with sqlite3.connect(db) as conn:
+        conn.execute("CREATE TABLE review_state (pr_key TEXT PRIMARY KEY, head TEXT NOT NULL, "
+                     "issues TEXT NOT NULL, reviewed_at REAL NOT NULL)")
+    store = ReviewStateStore(db)
+    store.save('k', ReviewState(head='h', merge_base='mb'))
+    assert store.get('k').merge_base == 'mb'
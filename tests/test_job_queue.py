@@ -0,0 +1,171 @@
+import asyncio
+import time
+import pytest
+from bot.core.job_queue import JobQueue, QueueFullError
+from bot.core.job_store import JobStore, ReviewJob
+
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(str(tmp_path / 'jobs.db'))
+
+
+def _job(pr_id='1', workspace='ws'):
+    return ReviewJob(workspace=workspace, repo_slug='repo', pr_id=pr_id, payload={'pr': pr_id})
+
+
+def _queue(store, **kwargs):
+    kwargs.setdefault('workers', 1)
+    return JobQueue(store, poll_interval=0.05, lease_timeout=60, **kwargs)
+
+
+async def _until(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+def test_submit_returns_before_the_review_runs(store):
+    async def main():
+        gate = asyncio.Event()
+
+        async def handler(job):
+            await gate.wait()
+            return 'review_posted'
+
+        queue = _queue(store)
+        await queue.start(handler)
+        job = await queue.submit(_job())
+        assert job.status == 'pending'
+        await _until(lambda: queue.in_flight() == 1)
+        assert (await queue.get(job.id)).status == 'running'
+        gate.set()
+        await _until(lambda: store.get(job.id).status == 'done')
+        await queue.stop()
+        return job
+
+    job = asyncio.run(main())
+    done = store.get(job.id)
+    assert (done.result, done.stage, done.attempts) == ('review_posted', 'finished', 1)
+
+
+def test_a_failing_review_is_recorded_and_the_worker_moves_on(store):
+    async def handler(job):
+        if job.pr_id == '1':
+            raise RuntimeError('diff fetch failed')
+        return 'review_posted'
+
+    async def main():
+        queue = _queue(store)
+        await queue.start(handler)
+        failed = await queue.submit(_job('1'))
+        ok = await queue.submit(_job('2'))
+        await _until(lambda: store.get(ok.id).status == 'done')
+        await queue.stop()
+        return failed
+
+    failed = store.get(asyncio.run(main()).id)
+    assert (failed.status, failed.error) == ('failed', 'diff fetch failed')
+
+
+def test_submit_before_start_is_refused(store):
+    with pytest.raises(RuntimeError):
+        asyncio.run(_queue(store).submit(_job()))
+
+
+def test_newer_event_supersedes_pending_and_flags_running(store):
+    running = _job()
+    store.enqueue(running)
+    assert store.claim('w1').id == running.id
+    older, newer = _job(), _job()
+    store.enqueue(older)
+    store.enqueue(newer)
+
+    assert store.get(older.id).status == 'superseded'
+    assert store.get(older.id).superseded_by == newer.id
+    assert store.heartbeat('w1', [running.id]) == [running.id]
+    assert store.depth() == 1
+
+
+def test_events_within_the_window_coalesce_to_the_latest(store):
+    ran = []
+
+    async def handler(job):
+        ran.append(job.payload['push'])
+        return 'review_posted'
+
+    async def main():
+        queue = _queue(store, coalesce_window=0.2)
+        await queue.start(handler)
+        jobs = []
+        for push in range(3):
+            job = _job()
+            job.payload['push'] = push
+            jobs.append(await queue.submit(job))
+        await _until(lambda: store.get(jobs[-1].id).status == 'done')
+        await queue.stop()
+        return jobs
+
+    jobs = asyncio.run(main())
+    assert ran == [2]
+    assert [store.get(j.id).status for j in jobs] == ['superseded', 'superseded', 'done']
+
+
+def test_newer_event_cancels_the_running_review(store):
+    started = []
+
+    async def handler(job):
+        started.append(job.id)
+        if len(started) == 1:
+            await asyncio.sleep(30)
+        return 'review_posted'
+
+    async def main():
+        queue = _queue(store)
+        await queue.start(handler)
+        first = await queue.submit(_job())
+        await _until(lambda: started)
+        second = await queue.submit(_job())
+        await _until(lambda: store.get(second.id).status == 'done')
+        await queue.stop()
+        return first, second
+
+    first, second = asyncio.run(main())
+    assert store.get(first.id).status == 'superseded'
+    assert started == [first.id, second.id]
+
+
+def test_queue_depth_limits_admit_replacements(store):
+    store.enqueue(_job('1'))
+    assert store.enqueue(_job('2'), max_depth=1) == "Review queue is full"
+    assert store.enqueue(_job('1'), max_depth=1) is None
+    assert 'workspace ws' in store.enqueue(_job('3'), workspace_depth=1)
+    assert store.enqueue(_job('3', workspace='other'), workspace_depth=1) is None
+
+
+def test_full_queue_rejects_with_retry_after(store):
+    async def main():
+        queue = _queue(store, coalesce_window=60, workspace_queue_depth=1, retry_after=17)
+        await queue.start(lambda job: None)
+        await queue.submit(_job('1'))
+        try:
+            with pytest.raises(QueueFullError) as rejected:
+                await queue.submit(_job('2'))
+            await queue.submit(_job('3', workspace='other'))
+        finally:
+            await queue.stop()
+        return rejected.value
+
+    assert asyncio.run(main()).retry_after == 17
+
+
+def test_claim_is_fair_across_workspaces_and_capped(store):
+    for pr_id in ('1', '2', '3'):
+        store.enqueue(_job(pr_id))
+    store.enqueue(_job('4', workspace='other'))
+    first = store.claim('w1', workspace_concurrency=1)
+    second = store.claim('w1', workspace_concurrency=1)
+    assert {first.workspace, second.workspace} == {'ws', 'other'}
+    assert store.claim('w1', workspace_concurrency=1) is None
+    assert store.claim('w1').workspace == 'ws'
@@ -0,0 +1,135 @@
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+import pytest
+from bot.core.job_queue import JobQueue
+from bot.core.job_store import JobStore, ReviewJob
+
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(str(tmp_path / 'jobs.db'))
+
+
+def _job(pr_id='1', workspace='ws', **kwargs):
+    return ReviewJob(workspace=workspace, repo_slug='repo', pr_id=pr_id, payload={'pr': pr_id}, **kwargs)
+
+
+def test_jobs_survive_a_restart_and_wait_for_their_delay(store):
+    store.enqueue(_job('1', available_at=time.time() + 60))
+    store.enqueue(_job('2'))
+    reopened = JobStore(store.db_path)
+    assert reopened.depth() == 2
+    job = reopened.claim('w1')
+    assert (job.pr_id, job.status, job.attempts) == ('2', 'running', 1)
+    assert reopened.claim('w1') is None
+
+
+def test_only_the_owner_finishes_a_job(store):
+    store.enqueue(_job())
+    job = store.claim('w1')
+    store.finish('w2', job.id, 'done')
+    assert store.get(job.id).status == 'running'
+    store.finish('w1', job.id, 'done', result='review_posted')
+    assert (store.get(job.id).status, store.get(job.id).result) == ('done', 'review_posted')
+
+
+def test_release_hands_jobs_back_without_counting_an_attempt(store):
+    store.enqueue(_job())
+    job = store.claim('w1')
+    assert store.release('w1') == 1
+    released = store.get(job.id)
+    assert (released.status, released.attempts) == ('pending', 0)
+    assert store.claim('w2').id == job.id
+
+
+def test_recover_requeues_expired_leases_and_fails_exhausted_jobs(store):
+    store.enqueue(_job('1'))
+    store.enqueue(_job('2'))
+    fresh = store.claim('w1')
+    assert store.recover(lease_timeout=60, max_attempts=3) == []
+
+    stale = store.claim('w1')
+    assert sorted(store.recover(lease_timeout=-1, max_attempts=3)) == sorted([fresh.id, stale.id])
+    assert store.get(stale.id).status == 'pending'
+
+    for _ in range(2):
+        store.claim('w1')
+        store.claim('w1')
+        store.recover(lease_timeout=-1, max_attempts=3)
+    failed = store.get(stale.id)
+    assert (failed.status, failed.attempts) == ('failed', 3)
+    assert 'abandoned after 3 attempts' in failed.error
+
+
+def test_recover_requeues_jobs_of_a_dead_local_worker(store):
+    process = subprocess.Popen([sys.executable, '-c', 'pass'])
+    process.wait()
+    store.enqueue(_job('1'))
+    store.enqueue(_job('2'))
+    dead = store.claim(f"{socket.gethostname()}:{process.pid}")
+    alive = store.claim(f"{socket.gethostname()}:{os.getpid()}")
+    assert store.recover(lease_timeout=60, max_attempts=3) == [dead.id]
+    assert store.get(alive.id).status == 'running'
+
+
+def test_prune_deletes_only_old_finished_jobs(store):
+    store.enqueue(_job('1'))
+    store.enqueue(_job('2'))
+    job = store.claim('w1')
+    store.finish('w1', job.id, 'done')
+    assert store.prune(retention=60) == 0
+    assert store.prune(retention=-1) == 1
+    assert store.get(job.id) is None and store.depth() == 1
+
+
+def _queue(store, **kwargs):
+    return JobQueue(store, workers=1, poll_interval=0.05, lease_timeout=60, **kwargs)
+
+
+async def _until(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+def test_queue_start_recovers_an_abandoned_job(store):
+    store.enqueue(_job())
+    orphan = store.claim('gone-host:1')
+    with store._transaction() as conn:
+        conn.execute("UPDATE jobs SET heartbeat_at = 0")  # lease long expired
+    ran = []
+
+    async def handler(job):
+        ran.append(job.id)
+        return 'review_posted'
+
+    async def main():
+        queue = _queue(store)
+        await queue.start(handler)
+        await _until(lambda: store.get(orphan.id).status == 'done')
+        await queue.stop()
+
+    asyncio.run(main())
+    assert ran == [orphan.id]
+    assert (store.get(orphan.id).attempts, store.get(orphan.id).result) == (2, 'review_posted')
+
+
+def test_queue_stop_requeues_unfinished_jobs(store):
+    async def handler(job):
+        await asyncio.sleep(30)
+
+    async def main():
+        queue = _queue(store)
+        await queue.start(handler)
+        job = await queue.submit(_job())
+        await _until(lambda: queue.in_flight())
+        await queue.stop(grace=0.05)
+        return job
+
+    job = asyncio.run(main())
+    assert (store.get(job.id).status, store.get(job.id).attempts) == ('pending', 0)
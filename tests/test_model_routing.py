@@ -0,0 +1,132 @@
+import asyncio
+import types
+import pytest
+from bot.config import Config
+from bot.core import model_router, provider_stats, resilience
+from bot.core.model_router import ModelRouter
+from bot.core.provider_stats import ProviderStats
+from bot.models.failover_client import FailoverClient
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = types.SimpleNamespace(now=500.0)
+    clock.monotonic = lambda: clock.now
+    monkeypatch.setattr(provider_stats, 'time', clock)
+    return clock
+
+
+def test_latency_and_token_ewma(clock):
+    stats = ProviderStats(alpha=0.5)
+    stats.record('groq', 10, tokens=1000)
+    stats.record('groq', 20, tokens=4000)
+    assert stats.predicted_seconds('groq') == 15
+    assert stats.predicted_seconds('groq', tokens=2000) == pytest.approx(2 * (0.5 * 5 + 0.5 * 10))
+    assert stats.percentile('groq', 0.95) == 20 and stats.percentile('groq', 0.5, min_samples=3) is None
+    assert stats.predicted_seconds('gemini') is None
+
+
+def test_error_rate_decays_while_idle(clock, monkeypatch):
+    monkeypatch.setattr(Config, 'ROUTING_ERROR_HALF_LIFE', 10)
+    stats = ProviderStats(alpha=0.5)
+    stats.record_error('groq')
+    stats.record_error('groq')
+    assert stats.error_rate('groq') == pytest.approx(0.75)
+    clock.now += 10
+    assert stats.error_rate('groq') == pytest.approx(0.375)
+    stats.record('groq', 1)
+    assert stats.error_rate('groq') == pytest.approx(0.1875)
+    assert stats.calls('groq') == 3
+
+
+class _Client:
+    def __init__(self, provider, outcome='### QA Summary\nok\n'):
+        self.provider = provider
+        self.api_key = 'key'
+        self.outcome = outcome
+        self.calls = 0
+
+    def review(self, prompt):
+        self.calls += 1
+        if isinstance(self.outcome, Exception):
+            raise self.outcome
+        return self.outcome
+
+    async def areview(self, prompt):
+        return self.review(prompt)
+
+
+@pytest.fixture
+def router(monkeypatch, clock):
+    stats = ProviderStats(alpha=0.5)
+    monkeypatch.setattr(model_router, 'PROVIDER_STATS', stats)
+    monkeypatch.setattr(resilience, '_breakers', {})
+    for name, value in {'ROUTING_MIN_SAMPLES': 2, 'ROUTING_MAX_ERROR_RATE': 0.5, 'ROUTING_ERROR_HALF_LIFE': 0,
+                        'GROQ_PROMPT_TOKENS': 6000, 'GEMINI_PROMPT_TOKENS': 32000, 'MAX_DIFF_CHARS': 0}.items():
+        monkeypatch.setattr(Config, name, value)
+    router = ModelRouter.__new__(ModelRouter)
+    router.provider, router.stub, router.logger = 'auto', None, model_router.ReviewLogger.get()
+    router.groq, router.gemini = _Client('groq'), _Client('gemini')
+    return router, stats
+
+
+def _order(router, diff_chars=1000):
+    return [c.provider for c in router._rank('x' * diff_chars)]
+
+
+def test_size_rule_until_every_provider_has_samples(router):
+    router, stats = router
+    assert _order(router) == ['groq', 'gemini']
+    assert _order(router, diff_chars=60000) == ['gemini']
+    stats.record('gemini', 1)
+    stats.record('gemini', 1)
+    assert _order(router) == ['groq', 'gemini']
+
+
+def test_fastest_predicted_provider_wins(router):
+    router, stats = router
+    for _ in range(2):
+        stats.record('groq', 12, tokens=1000)
+        stats.record('gemini', 3, tokens=1000)
+    assert _order(router) == ['gemini', 'groq']
+
+
+def test_unhealthy_provider_is_kept_only_as_failover(router):
+    router, stats = router
+    for _ in range(2):
+        stats.record_error('groq')
+    assert _order(router) == ['gemini', 'groq']
+
+    resilience.get_breaker('gemini').failure_threshold = 1
+    resilience.get_breaker('gemini').record_failure()
+    assert _order(router) == ['gemini', 'groq']  # both unhealthy: lowest error rate first
+
+
+def test_open_breaker_demotes_a_provider(router):
+    router, _ = router
+    breaker = resilience.get_breaker('groq')
+    breaker.failure_threshold = 1
+    breaker.record_failure()
+    assert _order(router) == ['gemini', 'groq']
+
+
+@pytest.mark.parametrize('mode', ['sync', 'async'])
+def test_failover_moves_on_after_an_exception(mode):
+    first, second = _Client('groq', ConnectionError('reset')), _Client('gemini')
+    client = FailoverClient([first, second])
+    review = client.review('p') if mode == 'sync' else asyncio.run(client.areview('p'))
+    assert review.startswith('### QA Summary') and (first.calls, second.calls) == (1, 1)
+
+
+@pytest.mark.parametrize('mode', ['sync', 'async'])
+def test_failover_reraises_when_every_provider_fails(mode):
+    first, second = _Client('groq', ConnectionError('reset')), _Client('gemini', '[Gemini Error] 500')
+    client = FailoverClient([first, second])
+    with pytest.raises(ConnectionError):
+        client.review('p') if mode == 'sync' else asyncio.run(client.areview('p'))
+    assert second.calls == 1
+
+
+def test_failover_returns_the_first_error_text():
+    client = FailoverClient([_Client('groq', '[Groq Error] 503'), _Client('gemini', TimeoutError())])
+    assert client.review('p') == '[Groq Error] 503'
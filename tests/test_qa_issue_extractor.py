@@ -0,0 +1,47 @@
+import pytest
+from bot.core.qa_issue_extractor import QAIssueExtractor, StreamingIssueExtractor
+
+REVIEW = """### QA Summary
+Two findings.
+
+{h} Bugs Detected
+- (HIGH) `app.py:12` Exception is swallowed
+
+{h} Security Concerns
+- (MEDIUM) `auth.py:40` Token compared with ==
+
+{h} Final Recommendation
+**Request Changes**
+"""
+
+
+@pytest.mark.parametrize('header', ['##', '###'])
+def test_stream_closes_section_on_next_header(header):
+    review = REVIEW.format(h=header)
+    stream = StreamingIssueExtractor()
+    bugs_end = review.index(f"{header} Security Concerns")
+
+    assert stream.feed(review[:bugs_end]) == []
+    early = stream.feed(review[bugs_end:bugs_end + len(header) + 1])
+    assert [(i.file_path, i.line_number) for i in early] == [('app.py', 12)]
+
+    rest = stream.feed(review[bugs_end + len(header) + 1:]) + stream.close()
+    assert [(i.file_path, i.line_number) for i in rest] == [('auth.py', 40)]
+
+
+@pytest.mark.parametrize('header', ['##', '###'])
+def test_stream_matches_batch_extraction(header):
+    review = REVIEW.format(h=header)
+    stream = StreamingIssueExtractor()
+    streamed = []
+    for i in range(0, len(review), 7):
+        streamed.extend(stream.feed(review[i:i + 7]))
+    streamed.extend(stream.close())
+    batch = QAIssueExtractor().extract_issues(review)
+    assert [(i.category, i.file_path, i.line_number) for i in streamed] == \
+        [(i.category, i.file_path, i.line_number) for i in batch]
+
+
+def test_subsection_header_does_not_close_section():
+    stream = StreamingIssueExtractor()
+    assert stream.feed("## Bugs Detected\n- (HIGH) `a.py:1` x\n#### Detail\n") == []
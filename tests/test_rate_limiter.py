@@ -0,0 +1,78 @@
+import asyncio
+import threading
+import pytest
+from bot.core.rate_limiter import SharedTokenBucket, TokenBucket, parse_retry_after
+
+
+def test_bucket_bursts_then_waits():
+    bucket = TokenBucket(rate=1, capacity=2)
+    assert bucket._reserve() == 0
+    assert bucket._reserve() == 0
+    assert 0 < bucket._reserve() <= 1
+
+
+def test_pause_empties_bucket():
+    bucket = TokenBucket(rate=100, capacity=5)
+    bucket.pause(30)
+    assert bucket._reserve() > 29
+
+
+@pytest.mark.parametrize('rate', [0, -1])
+def test_rejects_non_positive_rate(rate):
+    with pytest.raises(ValueError):
+        TokenBucket(rate=rate, capacity=1)
+
+
+def test_shared_bucket_is_shared_between_instances(tmp_path):
+    db = str(tmp_path / 'rl.db')
+    first = SharedTokenBucket(db, 'svc', rate=0.01, capacity=1)
+    second = SharedTokenBucket(db, 'svc', rate=0.01, capacity=1)
+    assert first._reserve() == 0
+    assert second._reserve() > 0
+
+
+def test_shared_pause_reaches_other_instances(tmp_path):
+    db = str(tmp_path / 'rl.db')
+    first = SharedTokenBucket(db, 'svc', rate=100, capacity=5)
+    second = SharedTokenBucket(db, 'svc', rate=100, capacity=5)
+    asyncio.run(first.pause_async(30))
+    assert second._reserve() > 29
+
+
+def test_shared_async_acquire_runs_off_the_event_loop(tmp_path):
+    bucket = SharedTokenBucket(str(tmp_path / 'rl.db'), 'svc', rate=100, capacity=5)
+    threads = []
+    reserve = bucket._reserve
+
+    def spy():
+        threads.append(threading.get_ident())
+        return reserve()
+
+    bucket._reserve = spy
+    asyncio.run(bucket.acquire_async())
+    assert threads and threading.get_ident() not in threads
+
+
+def test_parse_retry_after():
+    assert parse_retry_after('2.5') == 2.5
+    assert parse_retry_after('-3') == 0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT') is None
+
+
+def test_async_poster_pauses_bucket_on_429():
+    from bot.core.comment_poster import InlineCommentPoster
+
+    class Api:
+        statuses = [429, 201]
+
+        async def submit_inline_comment(self, path, line, text):
+            return self.statuses.pop(0), 0.0
+
+    bucket = TokenBucket(rate=100, capacity=5)
+    paused = []
+    bucket.pause_async = lambda seconds: asyncio.sleep(0, paused.append(seconds))
+    poster = InlineCommentPoster(bucket=bucket, concurrency=1, max_retries=3, retry_delay=0)
+    [result] = asyncio.run(poster.apost_all(Api(), [('app.py', 3, 'text')]))
+    assert result.posted and result.attempts == 2
+    assert paused == [0.0]
@@ -0,0 +1,161 @@
+import asyncio
+import types
+import pytest
+import requests
+from bot.core import resilience
+from bot.core.resilience import CircuitBreaker, CircuitOpenError, RetryPolicy, backoff_delay, is_transient
+
+
+class _Clock:
+    """Stands in for the ``time`` module: monotonic() is set by hand, sleep() advances it"""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(resilience, 'time', clock)
+    return clock
+
+
+def _http_error(status):
+    return requests.HTTPError(response=types.SimpleNamespace(status_code=status))
+
+
+def test_breaker_opens_half_opens_and_closes(clock):
+    breaker = CircuitBreaker('svc', failure_threshold=3, reset_timeout=30)
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+
+    clock.now += 29
+    assert breaker.state == CircuitBreaker.OPEN and breaker.retry_in() == pytest.approx(1)
+    clock.now += 1
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow()
+    assert not breaker.allow()  # one trial at a time
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.failures == 0
+
+
+def test_failed_trial_reopens_and_lost_trial_expires(clock):
+    breaker = CircuitBreaker('svc', failure_threshold=1, reset_timeout=10)
+    breaker.record_failure()
+    clock.now += 10
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN and breaker.retry_in() == 10
+
+    clock.now += 10
+    assert breaker.allow()
+    clock.now += 11  # the trial never reported back
+    assert breaker.allow()
+
+
+def test_record_status_counts_only_5xx(clock):
+    breaker = CircuitBreaker('svc', failure_threshold=2, reset_timeout=10)
+    breaker.record_status(503)
+    breaker.record_status(404)
+    breaker.record_status(502)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_backoff_is_capped_full_jitter(monkeypatch):
+    bounds = []
+    monkeypatch.setattr(resilience.random, 'uniform', lambda low, high: bounds.append((low, high)) or high)
+    assert [backoff_delay(attempt, base=2, cap=20) for attempt in (0, 3, 10)] == [2, 16, 20]
+    assert all(low == 0 for low, _ in bounds)
+
+
+def test_retry_gives_up_after_max_retries(clock):
+    breaker = CircuitBreaker('svc', failure_threshold=10, reset_timeout=30)
+    policy = RetryPolicy(breaker, max_retries=3, base_delay=1, max_delay=4)
+    calls = []
+
+    def flaky():
+        calls.append(clock.now)
+        raise requests.ConnectionError('down')
+
+    with pytest.raises(requests.ConnectionError):
+        policy.call(flaky)
+    assert len(calls) == 3 and len(clock.sleeps) == 2
+    assert all(0 <= s <= 4 for s in clock.sleeps)
+    assert breaker.failures == 3
+
+
+def test_retry_stops_once_the_breaker_opens(clock):
+    breaker = CircuitBreaker('svc', failure_threshold=2, reset_timeout=30)
+    policy = RetryPolicy(breaker, max_retries=5, base_delay=1, max_delay=4)
+    calls = []
+
+    def down():
+        calls.append(1)
+        raise _http_error(503)
+
+    with pytest.raises(CircuitOpenError):
+        policy.call(down)
+    assert len(calls) == 2
+    with pytest.raises(CircuitOpenError):
+        policy.call(down)
+    assert len(calls) == 2  # short-circuited without calling
+
+
+def test_retry_does_not_retry_client_errors_or_count_429(clock):
+    breaker = CircuitBreaker('svc', failure_threshold=1, reset_timeout=30)
+    policy = RetryPolicy(breaker, max_retries=3, base_delay=0, max_delay=0)
+    attempts = []
+
+    def bad_request():
+        attempts.append(1)
+        raise _http_error(400)
+
+    with pytest.raises(requests.HTTPError):
+        policy.call(bad_request)
+    assert len(attempts) == 1 and breaker.state == CircuitBreaker.CLOSED
+
+    results = iter([_http_error(429), 'ok'])
+
+    def throttled():
+        result = next(results)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    assert policy.call(throttled) == 'ok'
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_async_retry_recovers(clock):
+    breaker = CircuitBreaker('svc', failure_threshold=5, reset_timeout=30)
+    policy = RetryPolicy(breaker, max_retries=3, base_delay=0, max_delay=0)
+    outcomes = iter([TimeoutError(), TimeoutError(), 'review'])
+
+    async def call():
+        outcome = next(outcomes)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    assert asyncio.run(policy.acall(call)) == 'review'
+    assert next(outcomes, None) is None and breaker.failures == 0
+
+
+def test_transient_errors():
+    assert is_transient(requests.Timeout())
+    assert is_transient(_http_error(429)) and is_transient(_http_error(502))
+    assert not is_transient(_http_error(404)) and not is_transient(ValueError())
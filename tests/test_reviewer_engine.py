@@ -0,0 +1,64 @@
+import asyncio
+import threading
+import pytest
+from bot.config import Config
+from bot.core.comment_builder import FailedReview
+from bot.core.reviewer_engine import ReviewerEngine
+
+DIFF = """diff --git a/app.py b/app.py
+--- a/app.py
++++ b/app.py
+@@ -1,3 +1,6 @@
+ import os
++def load(path):
++    data = open(path).read()
++    print(data)
+ def main():
+     pass
+"""
+
+
+@pytest.fixture
+def stub(monkeypatch, tmp_path):
+    monkeypatch.setenv('MODEL_PROVIDER', 'stub')
+    for name, value in {'STUB_LATENCY': 0.0, 'STUB_JITTER': 0.0, 'STUB_ERROR_RATE': 0.0,
+                        'CACHE_DIR': str(tmp_path / 'cache')}.items():
+        monkeypatch.setattr(Config, name, value)
+
+
+def test_stub_review_is_cached(stub):
+    engine = ReviewerEngine()
+    review = engine.generate_review('Load files', '', DIFF)
+    assert not isinstance(review, FailedReview)
+    assert '`app.py:4`' in review
+    assert engine.cache.get(engine._get_cache_key('Load files', '', DIFF)) == review
+
+
+def test_failed_model_review_is_flagged_and_not_cached(stub, monkeypatch):
+    monkeypatch.setattr(Config, 'STUB_ERROR_RATE', 1.0)
+    engine = ReviewerEngine()
+    review = asyncio.run(engine.agenerate_review('Load files', '', DIFF))
+    assert isinstance(review, FailedReview) and '[Stub Error]' in review
+    assert engine.cache.get(engine._get_cache_key('Load files', '', DIFF)) is None
+
+
+def test_tiny_diff_is_a_failed_review(stub):
+    assert isinstance(ReviewerEngine().generate_review('t', '', '+x'), FailedReview)
+
+
+def test_async_review_keeps_local_work_off_the_loop(stub, monkeypatch):
+    engine = ReviewerEngine()
+    threads = {}
+    for name in ('_precheck', '_metrics', '_minimize', '_chunks', '_prepare', '_finalize'):
+        def recording(*args, _name=name, _step=getattr(engine, name)):
+            threads[_name] = threading.get_ident()
+            return _step(*args)
+        monkeypatch.setattr(engine, name, recording)
+
+    async def main():
+        return threading.get_ident(), await engine.agenerate_review('Load files', '', DIFF)
+
+    loop_thread, review = asyncio.run(main())
+    assert not isinstance(review, FailedReview)
+    assert set(threads) == {'_precheck', '_metrics', '_minimize', '_chunks', '_prepare', '_finalize'}
+    assert loop_thread not in threads.values()
@@ -0,0 +1,177 @@
+import time
+import threading
+from fastapi.testclient import TestClient
+from bot import server
+
+
+def test_ready_reports_warming_until_engine_is_built(monkeypatch):
+    release = threading.Event()
+
+    class SlowEngine:
+        def __init__(self):
+            release.wait(5)
+
+    monkeypatch.setattr(server, 'ReviewerEngine', SlowEngine)
+    with TestClient(server.app) as client:
+        response = client.get('/ready')
+        assert response.status_code == 503 and response.json()['status'] == 'warming'
+        release.set()
+        for _ in range(100):
+            response = client.get('/ready')
+            if response.status_code == 200:
+                break
+            time.sleep(0.01)
+        assert response.json() == {'status': 'ready'}
+
+
+def test_ready_reports_failed_warm_up(monkeypatch):
+    class BrokenEngine:
+        def __init__(self):
+            raise RuntimeError('no model')
+
+    monkeypatch.setattr(server, 'ReviewerEngine', BrokenEngine)
+    with TestClient(server.app) as client:
+        for _ in range(100):
+            response = client.get('/ready')
+            if response.json()['status'] != 'warming':
+                break
+            time.sleep(0.01)
+        assert response.status_code == 503
+        assert response.json() == {'status': 'failed', 'detail': 'no model'}
+
+
+STUB_DIFF = """diff --git a/app.py b/app.py
+--- a/app.py
++++ b/app.py
+@@ -1,3 +1,6 @@
+ import os
++def load(path):
++    data = open(path).read()
++    print(data)
+ def main():
+     pass
+"""
+
+
+def test_dry_run_stub_review_stays_offline(monkeypatch):
+    import asyncio
+    import httpx
+    from bot.config import Config
+    from bot.core import http_pool
+    from bot.core.job_store import ReviewJob
+    from bot.core.resilience import get_breaker
+
+    monkeypatch.setenv('MODEL_PROVIDER', 'stub')
+    for name, value in {'DRY_RUN': True, 'STUB_LATENCY': 0.0, 'STUB_JITTER': 0.0, 'STUB_ERROR_RATE': 0.0,
+                        'ENABLE_QA_INLINE_COMMENTS': True, 'RESOLVE_FIXED_COMMENTS': True}.items():
+        monkeypatch.setattr(Config, name, value)
+    network = []
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        http_pool._async_clients[loop] = httpx.AsyncClient(
+            transport=httpx.MockTransport(lambda request: network.append(request.url) or httpx.Response(500)))
+        engine = loop.create_future()
+        engine.set_result(server.ReviewerEngine())
+        monkeypatch.setattr(server, '_engine_task', engine)
+        payload = {'repository': {'full_name': 'ws/repo'},
+                   'pullrequest': {'id': 7, 'title': 'Load files', 'source': {'commit': {'hash': 'abc123'}}},
+                   'diff': STUB_DIFF}
+        job = ReviewJob(workspace='ws', repo_slug='repo', pr_id='7', payload=payload)
+        try:
+            return await server._process_review(job)
+        finally:
+            await http_pool.aclose_all()
+
+    assert asyncio.run(main()) == 'review_posted'
+    assert network == []
+    assert get_breaker('bitbucket').state == 'closed'
+
+
+def test_failed_enqueue_lets_the_redelivery_through(monkeypatch):
+    import sqlite3
+    import uuid
+    calls = []
+
+    async def submit(job):
+        calls.append(job)
+        if len(calls) == 1:
+            raise sqlite3.OperationalError('database is locked')
+        return job
+
+    monkeypatch.setattr(server.job_queue, 'submit', submit)
+    client = TestClient(server.app, raise_server_exceptions=False)
+    payload = {'repository': {'full_name': 'ws/repo'}, 'pullrequest': {'id': 7}}
+    headers = {'X-Event-Key': 'pullrequest:updated', 'X-Request-UUID': uuid.uuid4().hex}
+
+    assert client.post('/webhook/pr', json=payload, headers=headers).status_code == 500
+    retry = client.post('/webhook/pr', json=payload, headers=headers)
+    assert retry.status_code == 202 and retry.json()['status'] == 'queued'
+    assert client.post('/webhook/pr', json=payload, headers=headers).json() == {'status': 'duplicate'}
+
+
+def test_metrics_gauges_are_computed_off_the_event_loop(monkeypatch):
+    import asyncio
+    from bot.core import telemetry
+    loops = []
+
+    def depth():
+        try:
+            loops.append(asyncio.get_running_loop())
+        except RuntimeError:
+            loops.append(None)
+        return 3
+
+    monkeypatch.setattr(telemetry.QUEUE_DEPTH, '_function', depth)
+    response = TestClient(server.app).get('/metrics')
+    assert 'ai_pr_reviewer_queue_depth 3' in response.text
+    assert loops == [None]
+
+
+def test_cancelled_review_stops_its_early_inline_comments(monkeypatch):
+    import asyncio
+    from bot.config import Config
+    from bot.core.diff_buffer import DiffBuffer
+    from bot.core.job_store import ReviewJob
+    from bot.core.qa_formatter import QAIssue
+
+    monkeypatch.setattr(Config, 'ENABLE_QA_INLINE_COMMENTS', True)
+    monkeypatch.setattr(Config, 'INCREMENTAL_REVIEW', False)
+    posted = []
+
+    class Api:
+        def __init__(self):
+            self.listing = asyncio.Event()
+            self.release = asyncio.Event()
+
+        async def list_comments(self):
+            self.listing.set()
+            await self.release.wait()
+            return []
+
+        async def submit_inline_comment(self, file_path, line_number, text):
+            posted.append((file_path, line_number))
+            return 201, None
+
+    async def review(payload, pr_id, diff, on_issues):
+        await on_issues([QAIssue('Unclosed file', 'leaks a handle', 'HIGH', 'bug', 'app.py', 3)])
+        await asyncio.sleep(30)
+
+    async def resolve(api, payload, incremental):
+        return DiffBuffer.from_text(STUB_DIFF), False
+
+    async def main():
+        api = Api()
+        monkeypatch.setattr(server, '_make_api_with_context', lambda *args: api)
+        monkeypatch.setattr(server, '_resolve_review_diff', resolve)
+        monkeypatch.setattr(server, '_run_qa_review', review)
+        job = ReviewJob(workspace='ws', repo_slug='repo', pr_id='7', payload={'pullrequest': {'id': 7}})
+        task = asyncio.create_task(server._process_review(job))
+        await asyncio.wait_for(api.listing.wait(), 5)
+        task.cancel()  # a newer push superseded this revision
+        await asyncio.gather(task, return_exceptions=True)
+        api.release.set()
+        await asyncio.sleep(0.05)
+
+    asyncio.run(main())
+    assert posted == []
@@ -0,0 +1,74 @@
+import asyncio
+import pytest
+from bot.config import Config
+from bot.models.stub_client import StubClient, _added_lines
+from bot.core.reviewer_engine import ReviewerEngine
+
+DIFF = """diff --git a/app.py b/app.py
+--- a/app.py
++++ b/app.py
+@@ -10,3 +10,6 @@ def main():
+ import os
++def load(path):
+-    old = 1
++    data = eval(open(path).read())
++    print(data)
+ done()
+diff --git a/tests/test_app.py b/tests/test_app.py
+--- a/tests/test_app.py
++++ b/tests/test_app.py
+@@ -1 +1,2 @@
+ import app
++def helper(): pass
+"""
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    for name, value in {'STUB_LATENCY': 0.0, 'STUB_JITTER': 0.0, 'STUB_ERROR_RATE': 0.0,
+                        'STUB_SEED': '0', 'STUB_OUTPUT_CHARS': 200}.items():
+        monkeypatch.setattr(Config, name, value)
+    return StubClient()
+
+
+def _prompt(diff=DIFF):
+    return ReviewerEngine()._render('Load files', '', diff)
+
+
+def test_added_lines_carry_new_file_line_numbers():
+    assert _added_lines(DIFF) == [
+        ('app.py', 11, 'def load(path):'),
+        ('app.py', 12, '    data = eval(open(path).read())'),
+        ('app.py', 13, '    print(data)'),
+        ('tests/test_app.py', 2, 'def helper(): pass'),
+    ]
+
+
+def test_findings_point_at_added_lines(stub):
+    review = stub.review(_prompt())
+    assert '### Security Concerns\n- (HIGH) `app.py:12` Use of `eval`' in review
+    assert '`app.py:13` Debug output or TODO left in the change' in review
+    assert '`app.py:11` No test covers `load`' in review
+    assert 'No test covers `helper`' not in review
+    assert review.rstrip().endswith('**Request Changes** - resolve the HIGH findings first.')
+
+
+def test_same_seed_and_prompt_give_the_same_review(stub, monkeypatch):
+    monkeypatch.setattr(Config, 'STUB_JITTER', 0.3)
+    monkeypatch.setattr(Config, 'STUB_OUTPUT_CHARS', 2000)
+    first = stub._plan(_prompt())[1], stub.review(_prompt())
+    again = stub._plan(_prompt())[1], asyncio.run(stub.areview(_prompt()))
+    assert first == again
+    monkeypatch.setattr(Config, 'STUB_SEED', '1')
+    assert stub._plan(_prompt())[1] != first[0]
+
+
+def test_error_rate_produces_a_provider_error(stub, monkeypatch):
+    monkeypatch.setattr(Config, 'STUB_ERROR_RATE', 1.0)
+    assert stub.review(_prompt()).startswith('[Stub Error]')
+
+    async def stream():
+        return [piece async for piece in stub.astream(_prompt())]
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(stream())
@@ -0,0 +1,92 @@
+import logging
+from dataclasses import fields
+from bot.config import Config
+from bot.core import token_budget
+from bot.core.diff_buffer import DiffBuffer
+from bot.core.token_budget import char_budget, estimate_tokens, pack_diff, parse_hunks, prompt_budget
+
+
+def _file(name, hunks, added=3, prefix='line'):
+    text = f"diff --git a/{name} b/{name}\nindex 1111111..2222222 100644\n--- a/{name}\n+++ b/{name}\n"
+    for h in range(hunks):
+        text += f"@@ -{h * 10 + 1},2 +{h * 10 + 1},{added + 2} @@\n ctx\n"
+        text += ''.join(f"+{prefix} {h}-{i} of {name}\n" for i in range(added)) + " ctx\n"
+    return text
+
+
+DIFF = (_file('src/app.py', 2) + _file('tests/test_app.py', 2, added=8)
+        + "diff --git a/logo.png b/logo.png\nBinary files a/logo.png and b/logo.png differ\n"
+        + _file('src/auth.py', 1, prefix='eval(token)') + _file('src/big.py', 1, added=10))
+
+
+def test_estimate_tokens_uses_the_provider_ratio():
+    assert estimate_tokens('x' * 35, 'gemini') == 10
+    assert estimate_tokens(32, 'groq') == 10
+    assert estimate_tokens(33, 'unknown') == 11
+
+
+def test_prompt_budget_defaults_to_the_smallest(monkeypatch):
+    monkeypatch.setattr(Config, 'GEMINI_PROMPT_TOKENS', 32000)
+    monkeypatch.setattr(Config, 'GROQ_PROMPT_TOKENS', 6000)
+    assert prompt_budget('gemini') == 32000
+    assert prompt_budget(None) == 6000
+    assert char_budget('groq', 200) == int(6000 * 3.2) - 200
+
+
+def test_max_diff_chars_is_a_deprecated_alias(monkeypatch, caplog):
+    monkeypatch.setattr(Config, 'MAX_DIFF_CHARS', 14000)
+    monkeypatch.setattr(token_budget, '_warned_max_diff_chars', False)
+    with caplog.at_level(logging.WARNING, logger='ai_pr_reviewer'):
+        assert prompt_budget('gemini') == 4000
+        assert prompt_budget('groq') == 4375
+    warnings = [r for r in caplog.records if 'MAX_DIFF_CHARS is deprecated' in r.getMessage()]
+    assert len(warnings) == 1
+
+
+def test_max_diff_chars_minimum_is_validated(monkeypatch):
+    monkeypatch.setattr(Config, 'MAX_DIFF_CHARS', 50)
+    assert 'MAX_DIFF_CHARS' in Config.validate()
+
+
+def test_parse_hunks_keeps_sizes_not_text():
+    hunks = parse_hunks(DIFF.splitlines(keepends=True))
+    assert 'text' not in {f.name for f in fields(token_budget.Hunk)}
+    assert [h.path for h in hunks] == ['src/app.py', 'src/app.py', 'tests/test_app.py', 'tests/test_app.py',
+                                       'logo.png', 'src/auth.py', 'src/big.py']
+    headers = {h.file: h.header_chars for h in hunks}
+    assert sum(headers.values()) + sum(h.chars for h in hunks) == len(DIFF)
+    assert hunks[4].chars == 0  # binary file: header only
+    assert hunks[5].security_hits == 1
+
+
+def test_pack_diff_prefers_security_then_source_then_size():
+    hunks = parse_hunks(DIFF.splitlines(keepends=True))
+    order = [h.path for h in sorted(hunks, key=lambda h: h.priority)]
+    assert order[:2] == ['src/auth.py', 'src/big.py']
+    assert order.index('tests/test_app.py') > order.index('src/app.py')
+
+    packed = pack_diff(DIFF, 400 + 260)
+    assert 'eval(token)' in packed and 'of src/big.py' not in packed
+    assert 'hunks omitted to fit the token budget' in packed
+    assert 'tests/test_app.py' in packed.rsplit('...', 1)[-1]
+
+
+def test_pack_diff_keeps_diff_order_under_headers():
+    packed = pack_diff(DIFF, len(DIFF) - 300)
+    kept = [line for line in packed.splitlines() if line.startswith('diff --git')]
+    assert kept == [line for line in DIFF.splitlines() if line.startswith('diff --git') and line in kept]
+    assert packed.count('diff --git a/src/app.py') <= 1
+
+
+def test_pack_diff_streams_a_spilled_buffer():
+    with DiffBuffer(memory_limit=64) as buffer:
+        buffer.write(DIFF.encode())
+        assert buffer.spilled
+        assert pack_diff(buffer, 1200) == pack_diff(DIFF, 1200)
+
+
+def test_pack_diff_cuts_the_top_hunk_when_nothing_fits():
+    packed = pack_diff(DIFF, 450)
+    assert packed.startswith('diff --git a/src/auth.py')
+    assert packed.endswith('...TRUNCATED...\n')
+    assert len(packed) <= 50 + len('\n...TRUNCATED...\n')